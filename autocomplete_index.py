@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Autocomplete index for the search-as-you-type box.
+
+Normalized subject lines and their words are kept in two sorted-prefix arrays. A prefix maps
+to a contiguous range of each array (two bisects), and the best entries in that range by
+open_rate come from a sparse table of range maxima, so a lookup costs O(log n + k log k)
+no matter how many rows share the prefix. The shortest prefixes (the first keystrokes,
+which cover the largest ranges) have their top-k precomputed at build time.
+
+Usage:
+  python3 autocomplete_index.py --build autocomplete-index.pkl     # build from the database
+  python3 autocomplete_index.py --index autocomplete-index.pkl "cred"
+  python3 autocomplete_index.py --index autocomplete-index.pkl --serve 8787
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import heapq
+import pickle
+import bisect
+import argparse
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv('.env.local')
+
+INDEX_VERSION = 1
+
+# Prefixes up to this length get their top-k stored at build time
+PRECOMPUTED_DEPTH = 3
+
+DEFAULT_TOP_K = 10
+
+_NON_WORD_RE = re.compile(r'[^\w\s]+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """Casefold, drop punctuation/emoji and collapse whitespace"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = _NON_WORD_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+class PrefixArray:
+    """Sorted unique keys with a score per key and a range-argmax sparse table"""
+
+    def __init__(self, keys: List[str], scores: np.ndarray, top_k: int):
+        self.keys = keys
+        self.scores = scores.astype(np.float64)
+        self.top_k = top_k
+        self.table = self._build_sparse_table(self.scores)
+        self.precomputed: Dict[str, Tuple[int, ...]] = {}
+
+        # The first keystrokes hit the widest ranges, so store their answers
+        prefixes = {key[:depth] for key in keys for depth in range(1, PRECOMPUTED_DEPTH + 1) if len(key) >= depth}
+        for prefix in prefixes:
+            lo, hi = self.range(prefix)
+            self.precomputed[prefix] = tuple(self._top_in_range(lo, hi, top_k))
+
+    @staticmethod
+    def _build_sparse_table(scores: np.ndarray) -> List[np.ndarray]:
+        """table[j][i] is the index of the max score in [i, i + 2**j)"""
+        n = len(scores)
+        table = [np.arange(n, dtype=np.int32)]
+        j = 1
+        while (1 << j) <= n:
+            prev = table[-1]
+            half = 1 << (j - 1)
+            width = n - (1 << j) + 1
+            left = prev[:width]
+            right = prev[half:half + width]
+            table.append(np.where(scores[left] >= scores[right], left, right).astype(np.int32))
+            j += 1
+        return table
+
+    def _argmax(self, lo: int, hi: int) -> int:
+        """Index of the best score in [lo, hi)"""
+        j = (hi - lo).bit_length() - 1
+        a = int(self.table[j][lo])
+        b = int(self.table[j][hi - (1 << j)])
+        return a if self.scores[a] >= self.scores[b] else b
+
+    def _top_in_range(self, lo: int, hi: int, k: int) -> List[int]:
+        """Best k indexes in [lo, hi), best first, by splitting around each range maximum"""
+        if lo >= hi:
+            return []
+        best = self._argmax(lo, hi)
+        heap = [(-self.scores[best], best, lo, hi)]
+        result = []
+        while heap and len(result) < k:
+            _, idx, left, right = heapq.heappop(heap)
+            result.append(idx)
+            if left < idx:
+                m = self._argmax(left, idx)
+                heapq.heappush(heap, (-self.scores[m], m, left, idx))
+            if idx + 1 < right:
+                m = self._argmax(idx + 1, right)
+                heapq.heappush(heap, (-self.scores[m], m, idx + 1, right))
+        return result
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        """[lo, hi) of the keys starting with prefix"""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def top(self, prefix: str, k: int) -> List[int]:
+        """Indexes of the best k keys starting with prefix"""
+        if k <= self.top_k:
+            cached = self.precomputed.get(prefix)
+            if cached is not None:
+                return list(cached[:k])
+        lo, hi = self.range(prefix)
+        return self._top_in_range(lo, hi, k)
+
+
+class AutocompleteIndex:
+    """Ranked completions over whole subject lines and individual words"""
+
+    def __init__(self, rows: List[Dict[str, Any]], top_k: int = DEFAULT_TOP_K):
+        self.top_k = top_k
+        self.built_at = time.time()
+
+        # One entry per normalized subject line, keeping its best-performing original
+        lines: Dict[str, Dict[str, Any]] = {}
+        words: Dict[str, Tuple[float, int]] = {}
+        for row in rows:
+            key = normalize(row.get('subject_line', ''))
+            if not key:
+                continue
+            open_rate = float(row.get('open_rate') or 0.0)
+            current = lines.get(key)
+            if current is None or open_rate > current['open_rate']:
+                lines[key] = {
+                    'subject_line': row['subject_line'],
+                    'open_rate': open_rate,
+                    'company': row.get('company'),
+                }
+            for word in set(key.split(' ')):
+                if len(word) < 2:
+                    continue
+                best, count = words.get(word, (0.0, 0))
+                words[word] = (max(best, open_rate), count + 1)
+
+        line_keys = sorted(lines)
+        self.line_entries = [lines[k] for k in line_keys]
+        self.lines = PrefixArray(
+            line_keys, np.asarray([e['open_rate'] for e in self.line_entries], dtype=np.float64), top_k
+        )
+
+        word_keys = sorted(words)
+        self.word_counts = [words[w][1] for w in word_keys]
+        self.words = PrefixArray(
+            word_keys, np.asarray([words[w][0] for w in word_keys], dtype=np.float64), top_k
+        )
+
+    def suggest(self, prefix: str, k: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Top subject lines starting with prefix and top completions of its last word"""
+        k = k or self.top_k
+        normalized = normalize(prefix)
+        if not normalized:
+            return {'lines': [], 'words': []}
+
+        lines = [
+            dict(self.line_entries[i]) for i in self.lines.top(normalized, k)
+        ]
+
+        last_word = normalized.rsplit(' ', 1)[-1]
+        words = [
+            {
+                'word': self.words.keys[i],
+                'best_open_rate': float(self.words.scores[i]),
+                'line_count': self.word_counts[i],
+            }
+            for i in self.words.top(last_word, k)
+        ]
+        return {'lines': lines, 'words': words}
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump({'version': INDEX_VERSION, 'index': self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> 'AutocompleteIndex':
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported autocomplete index version: {payload.get('version')}")
+        return payload['index']
+
+
+def fetch_rows(page_size: int = 1000) -> List[Dict[str, Any]]:
+    """Page through subject_lines using the Supabase service role"""
+    from supabase import create_client
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("Error: Missing Supabase environment variables")
+        print("Please set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        sys.exit(1)
+
+    supabase = create_client(supabase_url, supabase_key)
+    rows = []
+    offset = 0
+    while True:
+        response = supabase.table('subject_lines').select('id, subject_line, open_rate, company').order('id').range(
+            offset, offset + page_size - 1
+        ).execute()
+        if not response.data:
+            break
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            break
+        offset += page_size
+    return rows
+
+
+def serve(index: AutocompleteIndex, port: int):
+    """Serve GET /autocomplete?q=<prefix>&k=<n> from memory"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/autocomplete':
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            prefix = params.get('q', [''])[0]
+            try:
+                k = min(int(params.get('k', [index.top_k])[0]), 50)
+            except ValueError:
+                k = index.top_k
+
+            started = time.perf_counter()
+            result = index.suggest(prefix, k)
+            result['took_us'] = round((time.perf_counter() - started) * 1e6, 1)
+
+            body = json.dumps(result).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"Serving autocomplete on http://127.0.0.1:{port}/autocomplete?q=...")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the subject line autocomplete index')
+    parser.add_argument('prefix', nargs='?', help='Prefix to complete')
+    parser.add_argument('--build', metavar='PATH', help='Build from the database and save to PATH')
+    parser.add_argument('--index', metavar='PATH', default='autocomplete-index.pkl', help='Saved index to load')
+    parser.add_argument('--serve', metavar='PORT', type=int, help='Serve lookups over HTTP')
+    parser.add_argument('-k', type=int, default=DEFAULT_TOP_K, help='Suggestions per list')
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.time()
+        rows = fetch_rows()
+        index = AutocompleteIndex(rows, top_k=args.k)
+        index.save(args.build)
+        print(f"✅ Indexed {len(index.line_entries)} unique subject lines and {len(index.words.keys)} words "
+              f"in {time.time() - started:.1f}s -> {args.build}")
+        return
+
+    index = AutocompleteIndex.load(args.index)
+
+    if args.serve:
+        serve(index, args.serve)
+        return
+
+    if not args.prefix:
+        parser.print_help()
+        sys.exit(1)
+
+    started = time.perf_counter()
+    result = index.suggest(args.prefix, args.k)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    for line in result['lines']:
+        print(f"{line['open_rate']:.4f}  {line['subject_line']}")
+    print("Words: " + ', '.join(w['word'] for w in result['words']))
+    print(f"({elapsed_us:.0f}µs)")
+
+
+if __name__ == "__main__":
+    main()
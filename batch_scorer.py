@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Batch subject-line scorer for bulk A/B candidate evaluation.
+
+Scores a list of candidate subject lines in one pass instead of a /api/search or /api/rag
+round trip (plus an embedding call) per candidate:
+  1. candidates are embedded in batched OpenAI requests, a few batches in parallel
+  2. each candidate's top-k neighbors among the stored subject line embeddings are found
+     with a chunked matrix product against the (cached) embedding corpus
+  3. the neighbors' open rates give a similarity-weighted predicted open rate, its spread
+     and the same A-F grade as /api/search
+
+The corpus is cached to disk (--corpus-cache). Each run re-reads every row's line and open
+rate, drops deleted rows, and downloads only the embeddings the cache does not have yet.
+
+Usage:
+  python3 batch_scorer.py candidates.txt                     # one candidate per line
+  python3 batch_scorer.py candidates.csv --output scores.csv # CSV with a subject_line column
+  python3 batch_scorer.py --line "Your bonus is waiting" --line "Last chance: 2x points"
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from embedding_models import active_model, embed_texts, parse_vector
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# OpenAI accepts up to 2048 inputs per request; smaller batches parallelize better
+EMBED_BATCH_SIZE = 500
+EMBED_WORKERS = 4
+
+# Candidates per matrix product; bounds the (chunk x corpus) similarity block in memory
+SEARCH_CHUNK_SIZE = 512
+
+# Softmax temperature over neighbor similarities: lower trusts the closest neighbors more
+DEFAULT_TEMPERATURE = 0.02
+
+CORPUS_CACHE_VERSION = 2
+
+
+def grade(open_rate: float) -> str:
+    """Same cutoffs as getOpenRateGrade() in /api/search"""
+    if open_rate >= 0.15:
+        return 'A'
+    if open_rate >= 0.10:
+        return 'B'
+    if open_rate >= 0.05:
+        return 'C'
+    if open_rate >= 0.02:
+        return 'D'
+    return 'F'
+
+
+class EmbeddingCorpus:
+    """Stored subject line embeddings as one L2-normalized float32 matrix"""
+
+    def __init__(self, ids: np.ndarray, subject_line_ids: np.ndarray, subject_lines: List[str],
+                 open_rates: np.ndarray, matrix: np.ndarray, model: str):
+        self.ids = ids
+        self.subject_line_ids = subject_line_ids
+        self.subject_lines = subject_lines
+        self.open_rates = open_rates
+        self.matrix = matrix
+        self.model = model
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
+
+    @classmethod
+    def load(cls, supabase, model: str, cache_path: Optional[str] = None,
+             page_size: int = 1000) -> 'EmbeddingCorpus':
+        """Load the cached corpus, re-sync its lines and open rates, and fetch missing embeddings
+
+        Lines and rates change in place (import-time merges rewrite open_rate) and rows get
+        deleted (deduplication), so every load re-reads the small per-row fields of every
+        embedding row. Only vectors not in the cache are downloaded.
+        """
+        ids, lines, rates = np.zeros(0, dtype=np.int64), [], np.zeros(0, dtype=np.float32)
+        line_ids, matrix = np.zeros(0, dtype=np.int64), None
+        if cache_path and os.path.exists(cache_path):
+            cached = np.load(cache_path, allow_pickle=False)
+            if int(cached['version']) == CORPUS_CACHE_VERSION and str(cached['model']) == model:
+                ids = cached['ids']
+                line_ids = cached['subject_line_ids']
+                lines = cached['subject_lines'].tolist()
+                rates = cached['open_rates']
+                matrix = cached['matrix']
+                print(f"📦 Loaded {len(ids)} cached embeddings from {cache_path}")
+            else:
+                print(f"⚠️  Ignoring {cache_path}: built for a different model or format")
+
+        # Current (subject_line_id, subject_line, open_rate) of every embedding row
+        current: Dict[int, Tuple[int, str, float]] = {}
+        last_id = 0
+        while True:
+            response = supabase.table('subject_line_embeddings').select(
+                'id, subject_line_id, subject_lines(subject_line, open_rate)'
+            ).gt('id', last_id).order('id').limit(page_size).execute()
+            if not response.data:
+                break
+            for row in response.data:
+                line = row.get('subject_lines')
+                if line:
+                    current[row['id']] = (row['subject_line_id'], line['subject_line'],
+                                          float(line['open_rate'] or 0.0))
+            last_id = response.data[-1]['id']
+            if len(response.data) < page_size:
+                break
+
+        # Drop cached rows that no longer exist and refresh the rest
+        keep = np.asarray([int(i) in current for i in ids], dtype=bool)
+        dropped = int(len(ids) - keep.sum())
+        ids, line_ids, rates = ids[keep], line_ids[keep].copy(), rates[keep].copy()
+        lines = [line for line, kept in zip(lines, keep) if kept]
+        if matrix is not None:
+            matrix = matrix[keep]
+        updated = 0
+        for pos, row_id in enumerate(ids):
+            line_id, line, rate = current[int(row_id)]
+            if line_ids[pos] != line_id or lines[pos] != line or not np.isclose(rates[pos], rate):
+                line_ids[pos], lines[pos], rates[pos] = line_id, line, rate
+                updated += 1
+
+        cached_ids = set(ids.tolist())
+        missing = sorted(row_id for row_id in current if row_id not in cached_ids)
+        new_vectors: Dict[int, List[float]] = {}
+        for i in range(0, len(missing), page_size):
+            response = supabase.table('subject_line_embeddings').select('id, embedding').in_(
+                'id', missing[i:i + page_size]
+            ).execute()
+            for row in response.data or []:
+                new_vectors[row['id']] = parse_vector(row['embedding'])
+        fetched = [row_id for row_id in missing if row_id in new_vectors]
+
+        if dropped or updated:
+            print(f"🔄 Re-synced cache: {dropped} deleted rows dropped, {updated} lines or rates updated")
+        blocks = [matrix] if matrix is not None and len(matrix) else []
+        if fetched:
+            print(f"📥 Fetched {len(fetched)} new embeddings")
+            ids = np.concatenate([ids, np.asarray(fetched, dtype=np.int64)])
+            line_ids = np.concatenate([line_ids, np.asarray([current[i][0] for i in fetched], dtype=np.int64)])
+            lines = lines + [current[i][1] for i in fetched]
+            rates = np.concatenate([rates, np.asarray([current[i][2] for i in fetched], dtype=np.float32)])
+            blocks.append(cls._normalize(np.asarray([new_vectors[i] for i in fetched], dtype=np.float32)))
+
+        if not blocks:
+            raise ValueError("No subject line embeddings found; run generate-embeddings.py first")
+
+        corpus = cls(ids, line_ids, lines, rates, np.vstack(blocks), model)
+        if cache_path and (fetched or dropped or updated):
+            corpus.save(cache_path)
+        return corpus
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            version=CORPUS_CACHE_VERSION,
+            model=self.model,
+            ids=self.ids,
+            subject_line_ids=self.subject_line_ids,
+            subject_lines=np.asarray(self.subject_lines, dtype=str),
+            open_rates=self.open_rates,
+            matrix=self.matrix
+        )
+        os.replace(tmp_path, path)
+
+    def top_k(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(indexes, similarities) of the k nearest corpus rows per query, best first"""
+        queries = self._normalize(queries)
+        k = min(k, len(self))
+        indexes = np.empty((len(queries), k), dtype=np.int64)
+        similarities = np.empty((len(queries), k), dtype=np.float32)
+
+        for start in range(0, len(queries), SEARCH_CHUNK_SIZE):
+            block = queries[start:start + SEARCH_CHUNK_SIZE] @ self.matrix.T
+            if k < block.shape[1]:
+                part = np.argpartition(block, -k, axis=1)[:, -k:]
+            else:
+                part = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+            part_sims = np.take_along_axis(block, part, axis=1)
+            order = np.argsort(-part_sims, axis=1)
+            indexes[start:start + len(block)] = np.take_along_axis(part, order, axis=1)
+            similarities[start:start + len(block)] = np.take_along_axis(part_sims, order, axis=1)
+
+        return indexes, similarities
+
+
+class BatchScorer:
+    """Embeds candidates in bulk and predicts open-rate stats from their nearest neighbors"""
+
+    def __init__(self, corpus: EmbeddingCorpus, api_key: str, k: int = 20,
+                 temperature: float = DEFAULT_TEMPERATURE):
+        self.corpus = corpus
+        self.api_key = api_key
+        self.k = k
+        self.temperature = temperature
+        self.timings: Dict[str, float] = {}
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in EMBED_BATCH_SIZE requests, EMBED_WORKERS at a time, in input order"""
+        batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as pool:
+            results = list(pool.map(lambda batch: embed_texts(self.api_key, self.corpus.model, batch), batches))
+        return np.asarray([vector for batch in results for vector in batch], dtype=np.float32)
+
+    def score_embeddings(self, embeddings: np.ndarray, neighbors: int = 3) -> List[Dict[str, Any]]:
+        """Predicted open-rate stats for each embedded candidate"""
+        indexes, similarities = self.corpus.top_k(embeddings, self.k)
+
+        rates = self.corpus.open_rates[indexes]
+        logits = (similarities - similarities[:, :1]) / self.temperature
+        weights = np.exp(logits)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        means = np.sum(weights * rates, axis=1)
+        spreads = np.sqrt(np.sum(weights * (rates - means[:, None]) ** 2, axis=1))
+
+        scores = []
+        for row in range(len(embeddings)):
+            scores.append({
+                'predicted_open_rate': round(float(means[row]), 4),
+                'spread': round(float(spreads[row]), 4),
+                'grade': grade(float(means[row])),
+                'mean_similarity': round(float(similarities[row].mean()), 4),
+                'neighbors': [
+                    {
+                        'subject_line': self.corpus.subject_lines[i],
+                        'open_rate': round(float(self.corpus.open_rates[i]), 4),
+                        'similarity': round(float(s), 4),
+                    }
+                    for i, s in zip(indexes[row, :neighbors], similarities[row, :neighbors])
+                ],
+            })
+        return scores
+
+    def score(self, candidates: List[str]) -> List[Dict[str, Any]]:
+        """Score every candidate, embedding each distinct text once"""
+        unique = list(dict.fromkeys(c.strip() for c in candidates if c.strip()))
+        if not unique:
+            return []
+
+        started = time.perf_counter()
+        embeddings = self.embed(unique)
+        self.timings['embed_s'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        by_text = dict(zip(unique, self.score_embeddings(embeddings)))
+        self.timings['search_s'] = time.perf_counter() - started
+
+        return [
+            {'candidate': c, **by_text[c.strip()]}
+            for c in candidates if c.strip()
+        ]
+
+
+def read_candidates(path: str) -> List[str]:
+    """One candidate per line, or a CSV with a subject_line (or Subject) column"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            column = next((c for c in ('subject_line', 'Subject', 'Subject Line') if c in (reader.fieldnames or [])), None)
+            if column is None:
+                raise ValueError(f"{path} needs a subject_line, Subject or Subject Line column")
+            return [row[column] for row in reader if row.get(column)]
+        return [line.strip() for line in f if line.strip()]
+
+
+def write_scores(path: str, scores: List[Dict[str, Any]]):
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['candidate', 'predicted_open_rate', 'spread', 'grade', 'mean_similarity', 'nearest_subject_line'])
+            for s in scores:
+                nearest = s['neighbors'][0]['subject_line'] if s['neighbors'] else ''
+                writer.writerow([s['candidate'], s['predicted_open_rate'], s['spread'], s['grade'],
+                                 s['mean_similarity'], nearest])
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(scores, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score candidate subject lines in bulk')
+    parser.add_argument('file', nargs='?', help='Candidates: .txt (one per line) or .csv')
+    parser.add_argument('--line', action='append', default=[], help='Candidate subject line (repeatable)')
+    parser.add_argument('-k', type=int, default=20, help='Neighbors per candidate')
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument('--output', help='Write scores to .csv or .json instead of printing')
+    parser.add_argument('--corpus-cache', default='embedding-corpus.npz', help='Local copy of stored embeddings')
+    args = parser.parse_args()
+
+    # Whitespace-only candidates have nothing to embed
+    candidates = [c for c in (read_candidates(args.file) if args.file else []) + args.line if c.strip()]
+    if not candidates:
+        parser.print_help()
+        sys.exit(1)
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+
+    if not all([supabase_url, supabase_key, openai_api_key]):
+        print("Error: Missing required environment variables")
+        print("Required: NEXT_PUBLIC_SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, OPENAI_API_KEY")
+        sys.exit(1)
+
+    from supabase import create_client
+
+    started = time.perf_counter()
+    corpus = EmbeddingCorpus.load(create_client(supabase_url, supabase_key), active_model()['name'], args.corpus_cache)
+    load_s = time.perf_counter() - started
+
+    scorer = BatchScorer(corpus, openai_api_key, k=args.k, temperature=args.temperature)
+    scores = scorer.score(candidates)
+
+    if args.output:
+        write_scores(args.output, scores)
+        print(f"✅ Wrote {len(scores)} scores to {args.output}")
+    else:
+        for s in scores:
+            print(f"{s['grade']}  {s['predicted_open_rate'] * 100:5.1f}% ±{s['spread'] * 100:4.1f}  {s['candidate']}")
+
+    print(f"⏱️  {len(scores)} candidates against {len(corpus)} stored lines: corpus {load_s:.1f}s, "
+          f"embed {scorer.timings['embed_s']:.1f}s, neighbor search {scorer.timings['search_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark of the import scripts, on synthetic files of any size.
+
+Synthetic campaign, subject-line and spend-summary CSVs are generated with the vendor
+export headers the importers read (10k to 10M rows; seeded, so a given size is always the
+same file and is reused from --data-dir). Each import path then runs unchanged, as its own
+process, against the databases in .env.local:
+  psycopg2 importers   DB_HOST, DB_NAME, ... (a local Postgres)
+  Supabase importers   NEXT_PUBLIC_SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY (a local stack
+                       from `supabase start`, whose Postgres DB_* should point at)
+
+For every run the child process records wall time, peak RSS and its database round-trips:
+statements and commits sent through psycopg2, and HTTP requests sent through the Supabase
+client. The rows imported are the growth of the path's table, counted through DB_* before
+and after the run, and rows/sec is based on them. A run that exits non-zero or adds no
+rows is reported as failed (some importers log errors and exit 0), so run with --truncate
+when a path would only update existing rows. Results go to a JSON file; pass the previous file as --baseline to print the change
+in rows/sec. subject_lines and spend_summary must exist (rag-schema.sql,
+create-spend-summary-table.sql); the campaign importers create their own table.
+
+Usage:
+  python3 benchmark-imports.py --rows 10000 100000 --truncate
+  python3 benchmark-imports.py --rows 1000000 --paths campaigns-csv campaigns-simple --truncate
+  python3 benchmark-imports.py --rows 100000 --baseline import-benchmark.json --results new.json
+  python3 benchmark-imports.py --rows 10000000 --generate-only
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import runpy
+import argparse
+import platform
+import resource
+import subprocess
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional
+from dotenv import load_dotenv
+import logging
+from campaign_cleaning import COLUMN_SPECS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CAMPAIGN_HEADER = list(dict.fromkeys(csv_header for _, csv_header, _ in COLUMN_SPECS))
+
+# Columns import-subject-lines.py reads
+SUBJECT_LINE_HEADER = ['Subject', 'Date', 'Company', 'Sub-Industry', 'Mailing Type', 'Inbox Rate',
+                       'Spam Rate', 'Read Rate', 'Read & Delete Rate', 'Delete Without Read Rate',
+                       'Projected Volume']
+
+# Company columns of the spend summary, in export order (import-spend-summary-*.py)
+SPEND_COMPANIES = ['Chime', 'Credit Karma', 'Self Financial, Inc.', 'American Express', 'Capital One',
+                   'Discover', 'Dave', 'Earnin', 'Empower Finance, Inc.', 'MoneyLion', 'Ally', 'Current',
+                   'One Finance', 'Varo', 'Rocket Money', 'SoFI', 'CashApp', 'PayPal', 'Venmo',
+                   'Bank of America', 'Chase', 'Wells Fargo']
+SPEND_HEADER = ['DATE (Coded)'] + SPEND_COMPANIES + ['YEAR', 'Grand Total', 'Category']
+
+CHANNELS = ['email', 'paid instagram', 'paid facebook', 'display', 'direct mail', 'tv']
+INDUSTRIES = {
+    'Financial Services': ['Banking', 'Credit Cards', 'Lending', 'Payments'],
+    'Insurance': ['Auto Insurance', 'Life Insurance'],
+    'Telecom': ['Wireless', 'Broadband'],
+}
+MAILING_TYPES = ['Promotional', 'Newsletter', 'Transactional', 'Event']
+DAY_PARTS = ['Morning', 'Daytime', 'Prime Time', 'Late Night']
+
+OPENERS = ['Last chance:', 'Your', 'Exclusive:', 'Hurry!', 'Good news -', 'Reminder:', 'New:', '']
+OFFERS = ['0% APR for 18 months', '$200 cash back', 'credit limit increase', 'early direct deposit',
+          'no annual fee', 'pre-approved offer', 'free credit score', 'savings bonus', 'account update',
+          'rewards statement']
+ENDINGS = ['inside', 'ends tonight', 'is waiting', '- apply now', 'for you', '', '🎉', '!']
+
+START_DATE = date(2023, 1, 1)
+
+
+def campaign_rows(count: int, rng: random.Random) -> Iterator[List[str]]:
+    """Rows shaped like the marketing campaigns export; a few per cent miss a required field"""
+    companies = SPEND_COMPANIES
+    for i in range(count):
+        day = START_DATE + timedelta(days=rng.randrange(1000))
+        industry = rng.choice(list(INDUSTRIES))
+        channel = rng.choice(CHANNELS)
+        company = rng.choice(companies)
+        is_email = channel == 'email'
+        values = {
+            'Campaign ID': f"PAT:{channel[:3].upper()}/{1000000000 + i}",
+            'Campaign Observation Date': day.isoformat() if rng.random() < 0.98 else '',
+            'Media Channel': channel,
+            'Marketing Company': company,
+            'Industry': industry,
+            'Subindustry': rng.choice(INDUSTRIES[industry]),
+            'Product Type': rng.choice(['Credit Card', 'Checking Account', 'Loan', 'Payment Service']),
+            'Brand': company,
+            'Product': f"{company} {rng.choice(['Card', 'Checking', 'Savings', 'App'])}",
+            'Properties': rng.choice(['Consumer', 'Small Business']),
+            'Affiliated Company': company,
+            'Post Link': f"https://example.com/p/{rng.getrandbits(40):x}" if not is_email else 'None',
+            'Landing Page': f"https://www.example.com/offers/{rng.randrange(500)}",
+            'Campaign Observation Country': 'us',
+            'Estimated Volume': str(rng.randrange(100, 5000000)),
+            'Estimated Spend': f"{rng.uniform(50, 250000):.2f}" if rng.random() < 0.8 else 'None',
+            'Email - Inbox Rate': f"{rng.uniform(50, 99):.1f}%" if is_email else 'None',
+            'Email - Spam Rate': f"{rng.uniform(0, 0.2):.3f}" if is_email else 'None',
+            'Email - Read Rate': f"{rng.uniform(0, 45):.1f}%" if is_email else 'None',
+            'Email - Delete Rate': f"{rng.uniform(0, 0.3):.3f}" if is_email else 'None',
+            'Email - Delete Without Read Rate': f"{rng.uniform(0, 30):.1f}%" if is_email else 'None',
+            'Subject Line': subject_line(rng) if is_email else 'None',
+            'Email- Sender Domain': f"{company.split()[0].lower()}.com" if is_email else 'None',
+            'Metro Area': rng.choice(['New York', 'Los Angeles', 'Chicago', 'Dallas', 'None']),
+            'Is General Branding': rng.choice(['true', 'false']),
+            'Day Part': rng.choice(DAY_PARTS) if channel == 'tv' else 'None',
+            'Ad Duration (seconds)': rng.choice(['15', '30', '60']) if channel == 'tv' else '',
+        }
+        yield [values.get(name, 'None') for name in CAMPAIGN_HEADER]
+
+
+def subject_line(rng: random.Random) -> str:
+    return ' '.join(part for part in (rng.choice(OPENERS), rng.choice(OFFERS), rng.choice(ENDINGS)) if part)
+
+
+def subject_line_rows(count: int, rng: random.Random) -> Iterator[List[str]]:
+    """Rows shaped like the subject-line export; repeats exercise the import-time dedup"""
+    for i in range(count):
+        day = START_DATE + timedelta(days=rng.randrange(1000))
+        # Mostly distinct lines; about one in ten repeats a common template
+        subject = subject_line(rng) if rng.random() < 0.1 else f"{subject_line(rng)} #{i}"
+        read_rate = rng.uniform(0.01, 0.6)
+        yield [
+            subject,
+            f"{day.month}/{day.day}/{day.year} {rng.randrange(24)}:{rng.randrange(60):02d}",
+            rng.choice(SPEND_COMPANIES),
+            rng.choice(INDUSTRIES['Financial Services']),
+            rng.choice(MAILING_TYPES),
+            f"{rng.uniform(0.5, 0.99):.4f}",
+            f"{rng.uniform(0, 0.2):.4f}",
+            f"{read_rate:.4f}",
+            f"{rng.uniform(0, read_rate):.4f}",
+            f"{rng.uniform(0, 0.3):.4f}",
+            str(rng.randrange(1000, 20000000)),
+        ]
+
+
+def spend_rows(count: int, rng: random.Random) -> Iterator[List[str]]:
+    """Rows shaped like the spend summary; DATE (Coded) is unique so every row is a new upsert"""
+    for i in range(count):
+        year = 2015 + (i // 12) % 11
+        spends = [rng.uniform(0, 5000000) if rng.random() < 0.9 else None for _ in SPEND_COMPANIES]
+        yield ([f"{year}-{i % 12 + 1:02d} #{i}"] +
+               [f"${spend:,.2f}" if spend is not None else '' for spend in spends] +
+               [str(year), f"${sum(s for s in spends if s):,.2f}", rng.choice(['Digital', 'TV', 'Total'])])
+
+
+# Kind -> (header, row generator)
+DATASETS: Dict[str, Any] = {
+    'campaigns': (CAMPAIGN_HEADER, campaign_rows),
+    'subject-lines': (SUBJECT_LINE_HEADER, subject_line_rows),
+    'spend-summary': (SPEND_HEADER, spend_rows),
+}
+
+# Import path -> script, dataset, backend, table it writes, and what to type at its prompts
+IMPORT_PATHS: Dict[str, Dict[str, Any]] = {
+    'campaigns-csv': {'script': 'import-campaigns-csv.py', 'dataset': 'campaigns', 'backend': 'postgres',
+                      'table': 'marketing_campaigns', 'stdin': '{path}\n1000\n'},
+    'campaigns-simple': {'script': 'import-campaigns-simple.py', 'dataset': 'campaigns', 'backend': 'postgres',
+                         'table': 'marketing_campaigns', 'stdin': '{path}\n'},
+    'campaigns-supabase': {'script': 'import-csv-supabase.py', 'dataset': 'campaigns', 'backend': 'supabase',
+                           'table': 'marketing_campaigns', 'args': ['{path}']},
+    'subject-lines': {'script': 'import-subject-lines.py', 'dataset': 'subject-lines', 'backend': 'supabase',
+                      'table': 'subject_lines', 'args': ['{path}']},
+    'spend-summary': {'script': 'import-spend-summary-supabase.py', 'dataset': 'spend-summary',
+                      'backend': 'supabase', 'table': 'spend_summary', 'args': ['{path}'], 'stdin': 'y\n'},
+}
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+def dataset_path(data_dir: str, kind: str, rows: int, seed: int) -> str:
+    return os.path.join(data_dir, f"{kind}-{rows}-seed{seed}.csv")
+
+
+def generate(data_dir: str, kind: str, rows: int, seed: int) -> str:
+    """Write (or reuse) the synthetic file for kind/rows/seed; returns its path"""
+    path = dataset_path(data_dir, kind, rows, seed)
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    header, row_factory = DATASETS[kind]
+    started = time.perf_counter()
+    partial_path = path + '.partial'
+    with open(partial_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(row_factory(rows, random.Random(f"{kind}:{seed}")))
+    os.replace(partial_path, path)
+    logger.info(f"Generated {path} ({rows:,} rows, {os.path.getsize(path) / 1e6:,.1f} MB) "
+                f"in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+# --- Child process: runs one import script with round-trip counters installed ---
+
+ROUND_TRIPS = {'sql': 0, 'commits': 0, 'http': 0}
+
+
+def install_counters():
+    """Count statements/commits through psycopg2 and requests through httpx (Supabase)"""
+    try:
+        import psycopg2
+        import psycopg2.extensions
+    except ImportError:
+        psycopg2 = None
+    if psycopg2 is not None:
+        class CountingCursor(psycopg2.extensions.cursor):
+            def execute(self, query, vars=None):
+                ROUND_TRIPS['sql'] += 1
+                return super().execute(query, vars)
+
+            def executemany(self, query, vars_list):
+                ROUND_TRIPS['sql'] += 1
+                return super().executemany(query, vars_list)
+
+            def copy_expert(self, sql, file, size=8192):
+                ROUND_TRIPS['sql'] += 1
+                return super().copy_expert(sql, file, size)
+
+        class CountingConnection(psycopg2.extensions.connection):
+            def cursor(self, *args, **kwargs):
+                kwargs.setdefault('cursor_factory', CountingCursor)
+                return super().cursor(*args, **kwargs)
+
+            def commit(self):
+                ROUND_TRIPS['commits'] += 1
+                return super().commit()
+
+            def rollback(self):
+                ROUND_TRIPS['commits'] += 1
+                return super().rollback()
+
+        psycopg2.connect = partial(psycopg2.connect, connection_factory=CountingConnection)
+
+    try:
+        import httpx
+    except ImportError:
+        return
+    send = httpx.Client.send
+
+    def counting_send(self, request, *args, **kwargs):
+        ROUND_TRIPS['http'] += 1
+        return send(self, request, *args, **kwargs)
+
+    httpx.Client.send = counting_send
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_child(script: str, report_path: str, script_args: List[str]):
+    """Run script as __main__ in this process and write its measurements to report_path"""
+    install_counters()
+    sys.argv = [script] + script_args
+    exit_code = 0
+    started = time.perf_counter()
+    try:
+        runpy.run_path(os.path.join(REPO_DIR, script), run_name='__main__')
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception as e:
+        logger.error(f"{script} failed: {e}")
+        exit_code = 1
+    finally:
+        seconds = time.perf_counter() - started
+        with open(report_path, 'w') as f:
+            json.dump({'exit_code': exit_code, 'seconds': seconds, 'peak_rss_mb': peak_rss_mb(),
+                       'round_trips': dict(ROUND_TRIPS)}, f)
+
+
+# --- Parent process ---
+
+def db_config() -> Dict[str, str]:
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+
+def truncate(table: str):
+    """Empty the table a path writes to, so every run inserts rather than updates"""
+    import psycopg2
+    config = db_config()
+    if config['host'] not in LOCAL_HOSTS:
+        raise RuntimeError(f"Refusing to truncate {table} on {config['host']}; --truncate is for a local database")
+    connection = psycopg2.connect(**config)
+    try:
+        with connection.cursor() as cursor:
+            # CASCADE: subject_line_embeddings references subject_lines
+            cursor.execute(f"TRUNCATE {table} RESTART IDENTITY CASCADE")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def count_rows(table: str) -> Optional[int]:
+    """Rows in table, or None if it does not exist or the database is unreachable"""
+    try:
+        import psycopg2
+    except ImportError:
+        logger.warning(f"Could not count {table}: psycopg2 is not installed")
+        return None
+    try:
+        connection = psycopg2.connect(**db_config())
+    except psycopg2.Error as e:
+        logger.warning(f"Could not count {table}: {e}")
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            return cursor.fetchone()[0]
+    except psycopg2.Error:
+        # A table the importer creates itself may not exist yet
+        return None
+    finally:
+        connection.close()
+
+
+def backend_ready(backend: str) -> bool:
+    if backend == 'supabase':
+        return bool(os.getenv('NEXT_PUBLIC_SUPABASE_URL') and os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+    return True
+
+
+def run_path(name: str, csv_path: str, rows: int, log_dir: str, reset: bool) -> Dict[str, Any]:
+    """One import of csv_path through path `name`, in a child process"""
+    spec = IMPORT_PATHS[name]
+    if reset:
+        try:
+            truncate(spec['table'])
+        except Exception as e:
+            # A table the importer creates itself may not exist yet
+            logger.warning(f"Could not truncate {spec['table']}: {e}")
+    before = count_rows(spec['table']) or 0
+
+    stem = f"{name}-{rows}"
+    report_path = os.path.join(log_dir, stem + '.report.json')
+    log_path = os.path.join(log_dir, stem + '.log')
+    args = [arg.format(path=csv_path) for arg in spec.get('args', [])]
+    stdin = spec.get('stdin', '').format(path=csv_path)
+    command = [sys.executable, os.path.abspath(__file__), '--child', spec['script'], report_path, '--'] + args
+
+    logger.info(f"Running {name} on {rows:,} rows (log: {log_path})")
+    with open(log_path, 'w') as log:
+        subprocess.run(command, input=stdin, text=True, stdout=log, stderr=subprocess.STDOUT, cwd=REPO_DIR)
+
+    try:
+        with open(report_path) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {'exit_code': None, 'seconds': None, 'peak_rss_mb': None, 'round_trips': {}}
+    after = count_rows(spec['table'])
+    imported = after - before if after is not None else None
+    # A failed run's time says nothing about throughput
+    ok = report['exit_code'] == 0 and bool(imported and imported > 0)
+    seconds = report['seconds'] if ok else None
+    total_trips = sum(report['round_trips'].values())
+    result = {
+        'path': name,
+        'script': spec['script'],
+        'backend': spec['backend'],
+        'rows': rows,
+        'exit_code': report['exit_code'],
+        'imported_rows': imported,
+        'ok': ok,
+        'seconds': round(report['seconds'], 3) if report['seconds'] else None,
+        'rows_per_sec': round(imported / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(report['peak_rss_mb'], 1) if report['peak_rss_mb'] else None,
+        'round_trips': report['round_trips'],
+        'round_trips_per_1k_rows': round(total_trips * 1000 / rows, 2) if rows else None,
+        'log': log_path,
+    }
+    if report['exit_code'] != 0:
+        logger.warning(f"{name} exited with {report['exit_code']}; see {log_path}")
+    elif not ok:
+        logger.warning(f"{name} added {imported if imported is not None else 'an unknown number of'} rows "
+                       f"to {spec['table']}; counted as failed, see {log_path}")
+    elif imported < rows:
+        logger.info(f"{name} imported {imported:,} of {rows:,} rows")
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(runs: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None):
+    previous = {(run['path'], run['rows']): run for run in (baseline or {}).get('runs', [])}
+    print(f"\n{'path':<20} {'rows':>10} {'imported':>10} {'seconds':>9} {'rows/sec':>11} {'peak MB':>8} "
+          f"{'trips/1k':>9} {'vs base':>8}")
+    for run in runs:
+        before = previous.get((run['path'], run['rows']))
+        change = ''
+        if before and before.get('rows_per_sec') and run['rows_per_sec']:
+            change = f"{(run['rows_per_sec'] / before['rows_per_sec'] - 1) * 100:+.0f}%"
+        imported = f"{run['imported_rows']:,}" if run.get('imported_rows') is not None else '?'
+        rate = f"{run['rows_per_sec']:,.0f}" if run['rows_per_sec'] else 'FAILED'
+        print(f"{run['path']:<20} {run['rows']:>10,} {imported:>10} {run['seconds'] or 0:>9.2f} {rate:>11} "
+              f"{run['peak_rss_mb'] or 0:>8.1f} {run['round_trips_per_1k_rows'] or 0:>9.2f} {change:>8}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        # --child <script> <report.json> -- <script args>
+        run_child(sys.argv[2], sys.argv[3], sys.argv[5:])
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmark import throughput on synthetic files')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000], help='File sizes to run (default: 10000)')
+    parser.add_argument('--paths', nargs='+', choices=list(IMPORT_PATHS), default=list(IMPORT_PATHS),
+                        help='Import paths to run (default: all whose database is configured)')
+    parser.add_argument('--data-dir', default='benchmark-data', help='Where synthetic files are written and reused')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--results', default='import-benchmark.json', help='JSON results file to write')
+    parser.add_argument('--baseline', help='Earlier results file to compare rows/sec against')
+    parser.add_argument('--truncate', action='store_true',
+                        help="Empty each path's table before it runs (local databases only)")
+    parser.add_argument('--generate-only', action='store_true', help='Write the synthetic files and stop')
+    args = parser.parse_args()
+
+    if any(rows <= 0 for rows in args.rows):
+        parser.error('--rows must be positive')
+
+    data_dir = os.path.abspath(args.data_dir)
+    datasets = {IMPORT_PATHS[name]['dataset'] for name in args.paths}
+    files = {(kind, rows): generate(data_dir, kind, rows, args.seed)
+             for rows in args.rows for kind in sorted(datasets)}
+    if args.generate_only:
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    log_dir = os.path.join(data_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    runs = []
+    for rows in args.rows:
+        for name in args.paths:
+            spec = IMPORT_PATHS[name]
+            if not backend_ready(spec['backend']):
+                logger.warning(f"Skipping {name}: set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+                continue
+            runs.append(run_path(name, files[(spec['dataset'], rows)], rows, log_dir, args.truncate))
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'runs': runs,
+    }
+    with open(args.results, 'w') as f:
+        json.dump(results, f, indent=2)
+    print_results(runs, baseline)
+    logger.info(f"Results written to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of campaign row cleaning: the per-row clean_data() the importers used
+before campaign_cleaning.py, against CampaignRowCleaner.
+
+Both run over the same rows in memory (no database), so the numbers are pure cleaning
+throughput. The outputs are compared row by row before timing.
+
+Usage:
+  python3 benchmark-row-cleaning.py                        # 100k synthetic rows
+  python3 benchmark-row-cleaning.py --rows 500000 --repeats 5
+  python3 benchmark-row-cleaning.py --csv /path/to/campaigns.csv
+"""
+
+import csv
+import sys
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+import logging
+from campaign_rates import rate_values
+from campaign_cleaning import CampaignRowCleaner, COLUMN_SPECS, DATE_SAMPLE_ROWS, cached_parse_rate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COMPANIES = ['Acme Bank', 'Globex', 'Initech Mobile', 'Umbrella Insurance', 'Stark Telecom']
+INDUSTRIES = ['Banking', 'Telecom', 'Insurance', 'Retail']
+CHANNELS = ['Email', 'Social', 'Digital', 'TV']
+
+
+def legacy_clean_data(row, rate_units=None):
+    """clean_data() as it was in import-csv-supabase.py"""
+    def clean_value(value, default=None):
+        if value is None or value == '' or value == 'None':
+            return default
+        return str(value).strip()
+
+    def parse_int(value):
+        if value is None or value == '' or value == 'None':
+            return None
+        try:
+            return int(float(value))
+        except (ValueError, TypeError):
+            return None
+
+    def parse_decimal(value):
+        if value is None or value == '' or value == 'None':
+            return None
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return None
+
+    def parse_date(value):
+        if value is None or value == '' or value == 'None':
+            return None
+        try:
+            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
+                try:
+                    return datetime.strptime(str(value), fmt).strftime('%Y-%m-%d')
+                except ValueError:
+                    continue
+            return None
+        except (ValueError, TypeError):
+            return None
+
+    def parse_boolean(value):
+        if value is None or value == '' or value == 'None':
+            return False
+        return str(value).lower() in ['true', '1', 'yes', 't']
+
+    # Clean the data
+    cleaned = {
+        'campaign_id': clean_value(row.get('Campaign ID')),
+        'campaign_observation_date': parse_date(row.get('Campaign Observation Date')),
+        'media_channel': clean_value(row.get('Media Channel')),
+        'marketing_company': clean_value(row.get('Marketing Company')),
+        'industry': clean_value(row.get('Industry')),
+        'subindustry': clean_value(row.get('Subindustry')),
+        'product_type': clean_value(row.get('Product Type')),
+        'brand': clean_value(row.get('Brand')),
+        'product': clean_value(row.get('Product')),
+        'bundled_products': clean_value(row.get('Bundled Products')),
+        'properties': clean_value(row.get('Properties')),
+        'affiliated_company': clean_value(row.get('Affiliated Company')),
+        'post_link': clean_value(row.get('Post Link')),
+        'landing_page': clean_value(row.get('Landing Page')),
+        'campaign_observation_country': clean_value(row.get('Campaign Observation Country')),
+        'estimated_volume': parse_int(row.get('Estimated Volume')),
+        'estimated_spend': parse_decimal(row.get('Estimated Spend')),
+        'email_inbox_rate': clean_value(row.get('Email - Inbox Rate')),
+        'email_spam_rate': clean_value(row.get('Email - Spam Rate')),
+        'email_read_rate': clean_value(row.get('Email - Read Rate')),
+        'email_delete_rate': clean_value(row.get('Email - Delete Rate')),
+        'email_delete_without_read_rate': clean_value(row.get('Email - Delete Without Read Rate')),
+        'subject_line': clean_value(row.get('Subject Line')),
+        'email_sender_domain': clean_value(row.get('Email- Sender Domain')),
+        'social_post_type': clean_value(row.get('Social - Post Type')),
+        'social_engagement': clean_value(row.get('Social - Engagement')),
+        'digital_domain_ad_seen_on': clean_value(row.get('Digital - Domain Ad Seen On')),
+        'panelist_location': clean_value(row.get('Panelist Location')),
+        'metro_area': clean_value(row.get('Metro Area')),
+        'is_general_branding': parse_boolean(row.get('Is General Branding')),
+        'text_content': clean_value(row.get('Text Content')),
+        'day_part': clean_value(row.get('Day Part')),
+        'ad_duration_seconds': parse_int(row.get('Ad Duration (seconds)')),
+        'channel': clean_value(row.get('Channel')),
+        'program': clean_value(row.get('Program')),
+    }
+    cleaned.update(rate_values(cleaned, rate_units))
+
+    # Generate thumbnail URL
+    company = cleaned.get('marketing_company', 'Unknown')
+    if company and company != 'None':
+        cleaned['thumbnail_url'] = f"https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={company.replace(' ', '+')}"
+    else:
+        cleaned['thumbnail_url'] = "https://via.placeholder.com/150x100/6B7280/FFFFFF?text=Unknown"
+
+    return cleaned
+
+
+def is_complete(cleaned: Dict[str, Any]) -> bool:
+    return bool(cleaned.get('campaign_id') and cleaned.get('campaign_observation_date') and
+                cleaned.get('media_channel') and cleaned.get('marketing_company') and
+                cleaned.get('industry'))
+
+
+def synthetic_rows(count: int, seed: int = 42):
+    """A header and `count` rows shaped like the vendor export"""
+    rng = random.Random(seed)
+    header = list(dict.fromkeys(csv_header for _, csv_header, _ in COLUMN_SPECS))
+    start = date(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        day = start + timedelta(days=rng.randrange(365))
+        values = {
+            'Campaign ID': f"C{i:08d}",
+            'Campaign Observation Date': day.isoformat() if rng.random() < 0.7 else day.strftime('%m/%d/%Y'),
+            'Media Channel': rng.choice(CHANNELS),
+            'Marketing Company': rng.choice(COMPANIES),
+            'Industry': rng.choice(INDUSTRIES),
+            'Estimated Volume': str(rng.randrange(100, 5000000)),
+            'Estimated Spend': f"{rng.uniform(100, 100000):.2f}" if rng.random() < 0.8 else 'None',
+            'Email - Inbox Rate': f"{rng.uniform(50, 99):.1f}%",
+            'Email - Read Rate': f"{rng.uniform(0, 0.6):.3f}",
+            'Email - Spam Rate': rng.choice(['', 'None', '2.5%', '0.01']),
+            'Subject Line': f"Offer {rng.randrange(1000)} ends soon",
+            'Is General Branding': rng.choice(['true', 'false', '']),
+            'Ad Duration (seconds)': rng.choice(['', '15', '30.0']),
+        }
+        rows.append([values.get(name, rng.choice(['', 'None', 'value'])) for name in header])
+    return header, rows
+
+
+def read_csv_rows(path: str, limit: int):
+    with open(path, 'r', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if limit and len(rows) >= limit:
+                break
+    return header, rows
+
+
+def time_legacy(header: List[str], rows: List[List[str]]) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        is_complete(legacy_clean_data(dict(zip(header, row))))
+    return time.perf_counter() - started
+
+
+def time_compiled(header: List[str], rows: List[List[str]]) -> float:
+    # Fresh caches, so every run pays for its own date and rate parsing
+    started = time.perf_counter()
+    cleaner = CampaignRowCleaner(header, iso_dates=True)
+    cleaner.detect_dates(rows[:DATE_SAMPLE_ROWS])
+    cleaner.detect_rates(rows[:DATE_SAMPLE_ROWS])
+    clean = cleaner.clean
+    for row in rows:
+        clean(row)
+    return time.perf_counter() - started
+
+
+def clear_caches():
+    # Date caches belong to each cleaner; rate parsing is cached module-wide
+    cached_parse_rate.cache_clear()
+
+
+def check_outputs(header: List[str], rows: List[List[str]]) -> int:
+    """Number of rows where the two cleaners disagree"""
+    cleaner = CampaignRowCleaner(header, iso_dates=True)
+    cleaner.detect_dates(rows[:DATE_SAMPLE_ROWS])
+    # The reference parses rates with the same detected units
+    rate_units = cleaner.detect_rates(rows[:DATE_SAMPLE_ROWS])
+    mismatches = 0
+    for row in rows:
+        legacy = legacy_clean_data(dict(zip(header, row)), rate_units)
+        compiled = cleaner.clean(row)
+        expected = legacy if is_complete(legacy) else None
+        actual = cleaner.as_dict(compiled) if compiled is not None else None
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 3:
+                logger.warning(f"Mismatch for {row[:1]}: {expected} != {actual}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark campaign row cleaning')
+    parser.add_argument('--csv', help='Campaign export to clean (default: synthetic rows)')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows to clean (synthetic, or the first N of --csv)')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per implementation (best is reported)')
+    args = parser.parse_args()
+
+    if args.csv:
+        header, rows = read_csv_rows(args.csv, args.rows)
+    else:
+        header, rows = synthetic_rows(args.rows)
+    if not rows:
+        logger.error("No rows to clean")
+        sys.exit(1)
+
+    mismatches = check_outputs(header, rows)
+    if mismatches:
+        logger.error(f"{mismatches} of {len(rows)} rows clean differently")
+        sys.exit(1)
+    logger.info(f"Outputs match for all {len(rows)} rows")
+
+    legacy = min(time_legacy(header, rows) for _ in range(args.repeats))
+    compiled = []
+    for _ in range(args.repeats):
+        clear_caches()
+        compiled.append(time_compiled(header, rows))
+    compiled = min(compiled)
+
+    print(f"\n{'implementation':<16} {'seconds':>8} {'rows/sec':>12}")
+    print(f"{'clean_data':<16} {legacy:>8.2f} {len(rows) / legacy:>12,.0f}")
+    print(f"{'compiled':<16} {compiled:>8.2f} {len(rows) / compiled:>12,.0f}")
+    print(f"speedup: {legacy / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
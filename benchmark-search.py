@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Load test of the subject-line search functions: latency percentiles, throughput and recall.
+
+A query corpus is replayed against each SQL function at a fixed concurrency, one
+connection per worker:
+  search_subject_lines                     trigram/ILIKE search on the query text
+  find_similar_subject_lines               vector search (ivfflat)
+  find_hybrid_similar_subject_lines        vector search blended with keyword matches
+  find_similar_subject_lines_with_filters  vector search within the query's company
+
+The corpus is either sampled stored subject lines, searched with their own stored
+embeddings so no OpenAI calls are made, or a file of queries embedded once up front with the
+active model (OPENAI_API_KEY). For each function the report gives p50/p95/p99 latency and
+QPS. It also gives recall@k against an exact baseline, which is the same call on a
+connection with index scans disabled, so approximate vector indexes fall back to a
+sequential scan. The slowest calls are re-run under auto_explain, which shows the plans of
+the statements inside the plpgsql function. Without permission to LOAD auto_explain, only
+the outer EXPLAIN ANALYZE is kept.
+
+Usage:
+  python3 benchmark-search.py --sample 200 --concurrency 1 4 16
+  python3 benchmark-search.py --queries queries.txt --company Chime --functions find_similar_subject_lines
+  python3 benchmark-search.py --sample 500 --repeats 3 --explain 5 --results search-benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import platform
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import psycopg2
+from dotenv import load_dotenv
+import logging
+from embedding_models import active_model, embed_texts
+from latency_stats import percentile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Function -> SQL returning the result key (id, or the line for search_subject_lines) first
+FUNCTIONS = {
+    'search_subject_lines':
+        "SELECT subject_line FROM search_subject_lines(%(text)s)",
+    'find_similar_subject_lines':
+        "SELECT subject_line_id FROM find_similar_subject_lines(%(embedding)s::vector, %(threshold)s, %(k)s)",
+    'find_hybrid_similar_subject_lines':
+        "SELECT subject_line_id FROM find_hybrid_similar_subject_lines("
+        "%(text)s, %(embedding)s::vector, %(threshold)s, %(k)s)",
+    'find_similar_subject_lines_with_filters':
+        "SELECT subject_line_id FROM find_similar_subject_lines_with_filters("
+        "%(embedding)s::vector, %(threshold)s, %(k)s, %(companies)s, NULL)",
+}
+
+# Settings of the exact-baseline connection: no index (ivfflat/hnsw) scans
+EXACT_SETTINGS = ["SET enable_indexscan = off", "SET enable_bitmapscan = off"]
+
+# auto_explain reports at LOG level; client_min_messages = log sends it to this session
+AUTO_EXPLAIN_SETTINGS = [
+    "LOAD 'auto_explain'",
+    "SET auto_explain.log_min_duration = 0",
+    "SET auto_explain.log_analyze = on",
+    "SET auto_explain.log_buffers = on",
+    "SET auto_explain.log_nested_statements = on",
+    "SET client_min_messages = log",
+]
+
+EMBED_BATCH_SIZE = 100
+
+
+class Query:
+    """One corpus entry: text, its embedding literal, and the companies to filter on"""
+
+    def __init__(self, text: str, embedding: str, companies: Optional[List[str]] = None):
+        self.text = text
+        self.embedding = embedding
+        self.companies = companies
+
+    def params(self, threshold: float, k: int) -> Dict[str, Any]:
+        return {'text': self.text, 'embedding': self.embedding, 'threshold': threshold, 'k': k,
+                'companies': self.companies}
+
+
+class SearchBenchmark:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+        self.auto_explain = True  # until LOAD 'auto_explain' is refused
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            self.connection.autocommit = True
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def _open(self, settings: Sequence[str] = ()):
+        connection = psycopg2.connect(**self.db_config)
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                for statement in settings:
+                    cursor.execute(statement)
+        except psycopg2.Error:
+            connection.close()
+            raise
+        return connection
+
+    def sample_queries(self, count: int) -> List[Query]:
+        """Stored subject lines with their own embeddings, filtered to their own company"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT sl.subject_line, sle.embedding::text, sl.company
+                FROM subject_line_embeddings sle
+                JOIN subject_lines sl ON sl.id = sle.subject_line_id
+                ORDER BY random()
+                LIMIT %s
+            """, (count,))
+            return [Query(line, embedding, [company] if company else None)
+                    for line, embedding, company in cursor.fetchall()]
+
+    @staticmethod
+    def file_queries(path: str, companies: Optional[List[str]]) -> List[Query]:
+        """Queries from a file, one per line, embedded with the active model"""
+        with open(path, 'r', encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY is needed to embed a query file; use --sample instead")
+        model = active_model()['name']
+        queries = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[i:i + EMBED_BATCH_SIZE]
+            for text, vector in zip(batch, embed_texts(api_key, model, batch)):
+                queries.append(Query(text, '[' + ','.join(map(str, vector)) + ']', companies))
+        logger.info(f"Embedded {len(queries)} queries with {model}")
+        return queries
+
+    def exact_results(self, function: str, queries: List[Query], threshold: float, k: int) -> List[set]:
+        """Result keys of each query with index scans disabled"""
+        connection = self._open(EXACT_SETTINGS)
+        results = []
+        try:
+            with connection.cursor() as cursor:
+                for query in queries:
+                    cursor.execute(FUNCTIONS[function], query.params(threshold, k))
+                    results.append({row[0] for row in cursor.fetchall()})
+        finally:
+            connection.close()
+        return results
+
+    def load_test(self, function: str, queries: List[Query], threshold: float, k: int, concurrency: int,
+                  repeats: int) -> Dict[str, Any]:
+        """Every query `repeats` times on `concurrency` connections; latencies in ms"""
+        pool: 'queue.Queue' = queue.Queue()
+        for _ in range(concurrency):
+            pool.put(self._open())
+        sql = FUNCTIONS[function]
+        calls = [i for _ in range(repeats) for i in range(len(queries))]
+
+        def call(index: int) -> Tuple[int, float, Optional[set], Optional[str]]:
+            connection = pool.get()
+            try:
+                with connection.cursor() as cursor:
+                    started = time.perf_counter()
+                    cursor.execute(sql, queries[index].params(threshold, k))
+                    rows = cursor.fetchall()
+                    return index, (time.perf_counter() - started) * 1000, {row[0] for row in rows}, None
+            except Exception as e:
+                return index, 0.0, None, str(e).strip()
+            finally:
+                pool.put(connection)
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(call, calls))
+            wall = time.perf_counter() - started
+        finally:
+            while not pool.empty():
+                pool.get().close()
+
+        latencies = [(ms, index) for index, ms, keys, error in outcomes if error is None]
+        results: Dict[int, set] = {}
+        for index, _, keys, error in outcomes:
+            if error is None:
+                results.setdefault(index, keys)
+        errors = [error for _, _, _, error in outcomes if error is not None]
+        if errors:
+            logger.warning(f"{function}: {len(errors)} failed calls, e.g. {errors[0]}")
+        values = [ms for ms, _ in latencies]
+        return {
+            'calls': len(calls),
+            'errors': len(errors),
+            'seconds': round(wall, 3),
+            'qps': round(len(values) / wall, 1) if wall else None,
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(max(values), 2) if values else 0.0,
+            '_results': results,
+            '_slowest': [index for _, index in sorted(latencies, reverse=True)],
+        }
+
+    def explain(self, function: str, query: Query, threshold: float, k: int) -> str:
+        """Plans of one call: auto_explain's nested plans if allowed, else the outer EXPLAIN ANALYZE"""
+        params = query.params(threshold, k)
+        connection = None
+        if self.auto_explain:
+            try:
+                connection = self._open(AUTO_EXPLAIN_SETTINGS)
+            except psycopg2.Error as e:
+                logger.warning(f"auto_explain unavailable ({str(e).strip()}); keeping only the outer plans")
+                self.auto_explain = False
+        if connection is None:
+            connection = self._open()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + FUNCTIONS[function], params)
+                    return '\n'.join(row[0] for row in cursor.fetchall())
+            finally:
+                connection.close()
+        try:
+            connection.notices = deque(maxlen=100)
+            with connection.cursor() as cursor:
+                cursor.execute(FUNCTIONS[function], params)
+                cursor.fetchall()
+            return ''.join(connection.notices)
+        finally:
+            connection.close()
+
+    def run(self, functions: List[str], queries: List[Query], threshold: float, k: int,
+            concurrency_levels: List[int], repeats: int, explain_count: int) -> List[Dict[str, Any]]:
+        runs = []
+        for function in functions:
+            try:
+                exact = self.exact_results(function, queries, threshold, k)
+            except psycopg2.Error as e:
+                # e.g. a deployed version whose result type no longer matches its query
+                error = str(e).strip()
+                logger.error(f"{function} failed, skipping it: {error}")
+                runs.append({'function': function, 'error': error})
+                continue
+            for concurrency in concurrency_levels:
+                logger.info(f"{function}: {len(queries) * repeats} calls at concurrency {concurrency}")
+                result = self.load_test(function, queries, threshold, k, concurrency, repeats)
+                results = result.pop('_results')
+                slowest = result.pop('_slowest')
+
+                # Recall@k of the first answer to each query; queries the baseline finds nothing for are skipped
+                recalls = [len(results[i] & exact[i]) / len(exact[i]) for i in results if exact[i]]
+                result['recall_at_k'] = round(sum(recalls) / len(recalls), 4) if recalls else None
+                result['recall_queries'] = len(recalls)
+
+                plans = []
+                for index in list(dict.fromkeys(slowest))[:explain_count]:
+                    try:
+                        plan = self.explain(function, queries[index], threshold, k)
+                    except psycopg2.Error as e:
+                        plan = f"EXPLAIN failed: {str(e).strip()}"
+                    plans.append({'query': queries[index].text, 'plan': plan})
+                runs.append({'function': function, 'concurrency': concurrency, **result, 'slowest': plans})
+        return runs
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(runs: List[Dict[str, Any]], k: int):
+    print(f"\n{'function':<40} {'conc':>4} {'calls':>6} {'QPS':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{f'recall@{k}':>9}")
+    for run in runs:
+        if 'error' in run:
+            print(f"{run['function']:<40} failed: {run['error'].splitlines()[0]}")
+            continue
+        recall = f"{run['recall_at_k']:.3f}" if run['recall_at_k'] is not None else '-'
+        print(f"{run['function']:<40} {run['concurrency']:>4} {run['calls']:>6} {run['qps'] or 0:>8.1f} "
+              f"{run['p50_ms']:>6.1f}ms {run['p95_ms']:>6.1f}ms {run['p99_ms']:>6.1f}ms {recall:>9}")
+        if run['errors']:
+            print(f"{'':<40} {run['errors']} calls failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the subject-line search functions')
+    corpus = parser.add_mutually_exclusive_group()
+    corpus.add_argument('--sample', type=int, default=200, help='Replay N sampled stored subject lines (default)')
+    corpus.add_argument('--queries', help='File with one query per line (embedded with OPENAI_API_KEY)')
+    parser.add_argument('--company', nargs='+',
+                        help='Company filter for find_similar_subject_lines_with_filters with --queries')
+    parser.add_argument('--functions', nargs='+', choices=list(FUNCTIONS), default=list(FUNCTIONS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help='Connections issuing queries at once; one run per level')
+    parser.add_argument('--repeats', type=int, default=1, help='Times each query is replayed per run')
+    parser.add_argument('--max-results', type=int, default=10)
+    parser.add_argument('--threshold', type=float,
+                        help="Similarity threshold for the vector functions (default: the active model's)")
+    parser.add_argument('--explain', type=int, default=3, help='Slowest calls to capture plans for, per run')
+    parser.add_argument('--results', default='search-benchmark.json', help='JSON results file to write')
+    args = parser.parse_args()
+
+    if any(level <= 0 for level in args.concurrency) or args.repeats <= 0:
+        parser.error('--concurrency and --repeats must be positive')
+    threshold = args.threshold if args.threshold is not None else active_model()['similarity_threshold']
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    bench = SearchBenchmark(db_config)
+    bench.connect()
+    try:
+        if args.queries:
+            queries = bench.file_queries(args.queries, args.company)
+        else:
+            queries = bench.sample_queries(args.sample)
+        if not queries:
+            logger.error("No queries to replay (no stored embeddings to sample from?)")
+            sys.exit(1)
+        runs = bench.run(args.functions, queries, threshold, args.max_results, args.concurrency,
+                         args.repeats, args.explain)
+    finally:
+        bench.disconnect()
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'database': {key: db_config[key] for key in ('host', 'port', 'database')},
+        'corpus': args.queries or f"{len(queries)} sampled subject lines",
+        'max_results': args.max_results,
+        'threshold': threshold,
+        'runs': runs,
+    }
+    with open(args.results, 'w') as f:
+        json.dump(results, f, indent=2)
+    print_results(runs, args.max_results)
+    logger.info(f"Results and slowest-query plans written to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+BM25 index for lexical subject line search.
+
+Replaces the ad hoc ILIKE hit counts and word-hit ratios with Okapi BM25 over tokenized
+subject lines (lowercased alphanumeric words, as pg_trgm and hybrid_query_terms() split them).
+
+Postings are flat arrays: per term, a slice of doc ids (uint32), term frequencies (uint16) and
+precomputed BM25 impacts (float32), addressed through an offsets array. Each term also records
+the largest impact in its list. The index is saved as a directory of .npy files plus a small
+meta.json (parameters and vocabulary), and loads with mmap_mode='r', so a reload maps the files
+instead of rebuilding.
+
+Queries use MaxScore-style early termination. Terms are taken in decreasing order of their
+impact upper bound, and every document in the lists taken so far is scored exactly. Once the
+upper bounds of the remaining terms sum to less than the current k-th best score, no document
+found only in those lists can make the top k, so their (long, common-word) postings are never
+read.
+
+Usage:
+  python3 bm25_index.py --build bm25-index           # from subject_lines
+  python3 bm25_index.py --index bm25-index "credit card bonus"
+  python3 bm25_index.py --index bm25-index --benchmark 1000    # sampled queries vs exhaustive
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from latency_stats import percentile
+from trigram_search import TrigramSearchEngine, get_supabase
+
+# Load environment variables
+load_dotenv('.env.local')
+
+INDEX_VERSION = 1
+
+DEFAULT_K1 = 1.2
+# Subject lines are all short, so length normalization matters less than for documents
+DEFAULT_B = 0.5
+
+# Each term stores its THRESHOLD_K-th largest impact: at least that many documents score that
+# much, so it seeds the top-k threshold before any list is read (for k <= THRESHOLD_K)
+THRESHOLD_K = 10
+
+# A binary-search lookup costs about this many sequential postings
+LOOKUP_COST = 4
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+ARRAYS = ('offsets', 'doc_ids', 'tfs', 'impacts', 'upper_bounds', 'kth_impacts', 'doc_lengths',
+          'row_ids', 'open_rates', 'text', 'text_offsets')
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD_RE.findall((text or '').lower())
+
+
+class BM25Index:
+    """Array-backed BM25 postings over subject lines"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], vocab: List[str], k1: float, b: float, avgdl: float):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.vocab = {term: term_id for term_id, term in enumerate(vocab)}
+        self.terms = vocab
+        self.k1 = k1
+        self.b = b
+        self.avgdl = avgdl
+        self.size = len(self.row_ids)
+
+    @classmethod
+    def build(cls, rows: List[Dict[str, Any]], k1: float = DEFAULT_K1, b: float = DEFAULT_B) -> 'BM25Index':
+        """Index rows with id, subject_line and open_rate"""
+        vocab: Dict[str, int] = {}
+        doc_parts, term_parts = [], []
+        doc_lengths = np.zeros(len(rows), dtype=np.uint16)
+        for doc, row in enumerate(rows):
+            tokens = tokenize(row['subject_line'])
+            doc_lengths[doc] = min(len(tokens), np.iinfo(np.uint16).max)
+            term_parts.append([vocab.setdefault(t, len(vocab)) for t in tokens])
+            doc_parts.append(len(tokens))
+
+        n_docs, n_terms = len(rows), len(vocab)
+        term_ids = np.fromiter((t for part in term_parts for t in part), dtype=np.int64)
+        docs = np.repeat(np.arange(n_docs, dtype=np.int64), doc_parts)
+
+        # (term, doc) pairs sorted by term then doc; the run length of each pair is its tf
+        pairs, tfs = np.unique(term_ids * max(n_docs, 1) + docs, return_counts=True)
+        posting_terms = pairs // max(n_docs, 1)
+        doc_ids = (pairs % max(n_docs, 1)).astype(np.uint32)
+        df = np.bincount(posting_terms, minlength=n_terms)
+        offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_lengths[doc_ids] / max(avgdl, 1e-9))
+        impacts = (idf[posting_terms] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+        upper_bounds = np.zeros(n_terms, dtype=np.float32)
+        np.maximum.at(upper_bounds, posting_terms, impacts)
+        by_impact = impacts[np.lexsort((-impacts, posting_terms))]
+        kth_impacts = np.where(df >= THRESHOLD_K, by_impact[np.minimum(offsets[:-1] + THRESHOLD_K - 1,
+                                                                       max(len(impacts) - 1, 0))], 0)
+
+        encoded = [row['subject_line'].encode('utf-8') for row in rows]
+        lengths = np.asarray([len(e) for e in encoded], dtype=np.int64)
+        arrays = {
+            'offsets': offsets,
+            'doc_ids': doc_ids,
+            'tfs': np.minimum(tfs, np.iinfo(np.uint16).max).astype(np.uint16),
+            'impacts': impacts,
+            'upper_bounds': upper_bounds,
+            'kth_impacts': kth_impacts.astype(np.float32),
+            'doc_lengths': doc_lengths,
+            'row_ids': np.asarray([row['id'] for row in rows], dtype=np.int64),
+            'open_rates': np.asarray([float(row.get('open_rate') or 0.0) for row in rows], dtype=np.float32),
+            'text': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            'text_offsets': np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+        }
+        terms = [''] * n_terms
+        for term, term_id in vocab.items():
+            terms[term_id] = term
+        return cls(arrays, terms, k1, b, avgdl)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        meta = {'version': INDEX_VERSION, 'k1': self.k1, 'b': self.b, 'avgdl': self.avgdl, 'vocab': self.terms}
+        # Written last: a directory without meta.json is an incomplete build
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'BM25Index':
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_VERSION:
+            raise ValueError(f"{path} was built by an incompatible version; rebuild it with --build")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                  for name in ARRAYS}
+        return cls(arrays, meta['vocab'], meta['k1'], meta['b'], meta['avgdl'])
+
+    def subject_line(self, doc: int) -> str:
+        return bytes(self.text[self.text_offsets[doc]:self.text_offsets[doc + 1]]).decode('utf-8')
+
+    def _query_terms(self, query: str) -> List[int]:
+        """Distinct known term ids, highest impact upper bound first"""
+        term_ids = list(dict.fromkeys(self.vocab[t] for t in tokenize(query) if t in self.vocab))
+        term_ids.sort(key=lambda t: (-self.upper_bounds[t], t))
+        return term_ids
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.impacts[start:end]
+
+    def _ranked(self, docs: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """(doc, score) for the k best, ties by open rate then doc"""
+        if len(docs) > k:
+            # Keep every document tied with the k-th score so the tie-break decides among them
+            keep = scores >= self._kth_best(scores, k)
+            docs, scores = docs[keep], scores[keep]
+        order = np.lexsort((docs, -self.open_rates[docs], -scores))[:k]
+        return [(int(docs[i]), float(scores[i])) for i in order]
+
+    @staticmethod
+    def _kth_best(scores: np.ndarray, k: int) -> float:
+        return float(np.partition(scores, len(scores) - k)[len(scores) - k]) if len(scores) >= k else -1.0
+
+    def search(self, query: str, k: int = 10, stats: Optional[Dict[str, int]] = None) -> List[Tuple[int, float]]:
+        """Top k (doc, score) by BM25 with MaxScore pruning"""
+        term_ids = self._query_terms(query)
+        if not term_ids:
+            return []
+        postings = [self._postings(t) for t in term_ids]
+        # remaining[i]: the best score a document could get from lists i.. alone
+        remaining = np.cumsum([float(self.upper_bounds[t]) for t in term_ids][::-1])[::-1]
+        threshold = max(float(self.kth_impacts[t]) for t in term_ids) if k <= THRESHOLD_K else -1.0
+
+        # Essential lists are read in full. Partial scores only grow, so the k-th best partial
+        # score is a safe lower bound on the final k-th best score.
+        docs, partial = postings[0][0], np.array(postings[0][1], dtype=np.float32)
+        read = len(docs)
+        scores = None
+        i = 1
+        while i < len(postings) and remaining[i] >= threshold:
+            threshold = max(threshold, self._kth_best(partial, k))
+            if remaining[i] < threshold:
+                break
+            if scores is None:
+                scores = np.zeros(self.size, dtype=np.float32)
+                scores[docs] = partial
+            term_docs, term_impacts = postings[i]
+            # Impacts are positive, so a zero score means the document has not been seen yet
+            fresh = term_docs[scores[term_docs] == 0]
+            scores[term_docs] += term_impacts
+            docs = np.concatenate([docs, fresh])
+            partial = scores[docs]
+            read += len(term_docs)
+            i += 1
+
+        # Non-essential lists: only candidates that could still reach the threshold are looked up
+        for i in range(i, len(postings)):
+            threshold = max(threshold, self._kth_best(partial, k))
+            alive = partial + remaining[i] >= threshold
+            docs, partial = docs[alive], partial[alive]
+            term_docs, term_impacts = postings[i]
+            if len(docs) * LOOKUP_COST > len(term_docs):
+                # Too many survivors for binary search to pay off: add the whole list instead
+                if scores is None:
+                    scores = np.zeros(self.size, dtype=np.float32)
+                scores[docs] = partial
+                scores[term_docs] += term_impacts
+                partial = scores[docs]
+                read += len(term_docs)
+            else:
+                at = np.searchsorted(term_docs, docs)
+                at[at == len(term_docs)] = 0
+                hit = term_docs[at] == docs
+                partial[hit] += term_impacts[at[hit]]
+
+        if stats is not None:
+            stats['postings_read'] = stats.get('postings_read', 0) + read
+            stats['postings_total'] = stats.get('postings_total', 0) + sum(len(p[0]) for p in postings)
+        return self._ranked(docs, partial, k)
+
+    def search_exhaustive(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """Same ranking as search(), scoring every posting of every query term"""
+        term_ids = self._query_terms(query)
+        if not term_ids:
+            return []
+        scores = np.zeros(self.size, dtype=np.float32)
+        for t in term_ids:
+            term_docs, term_impacts = self._postings(t)
+            scores[term_docs] += term_impacts
+        docs = np.flatnonzero(scores > 0).astype(np.uint32)
+        return self._ranked(docs, scores[docs], k)
+
+
+def sample_queries(index: BM25Index, count: int, seed: int = 0) -> List[str]:
+    """1-3 consecutive words from random stored subject lines"""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for doc in rng.integers(0, index.size, count * 2):
+        words = tokenize(index.subject_line(int(doc)))
+        if not words:
+            continue
+        width = int(rng.integers(1, 4))
+        start = int(rng.integers(0, max(len(words) - width, 0) + 1))
+        queries.append(' '.join(words[start:start + width]))
+        if len(queries) == count:
+            break
+    return queries
+
+
+def benchmark(index: BM25Index, queries: List[str], k: int = 10):
+    pruned_ms, exhaustive_ms = [], []
+    stats: Dict[str, int] = {}
+    mismatches = 0
+    for query in queries:
+        started = time.perf_counter()
+        pruned = index.search(query, k, stats)
+        pruned_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        exhaustive = index.search_exhaustive(query, k)
+        exhaustive_ms.append((time.perf_counter() - started) * 1000)
+
+        if [d for d, _ in pruned] != [d for d, _ in exhaustive]:
+            mismatches += 1
+
+    print(f"{len(queries)} queries, top {k}, {index.size} subject lines, {len(index.terms)} terms")
+    print(f"MaxScore:   p50={percentile(pruned_ms, 50):.3f}ms p95={percentile(pruned_ms, 95):.3f}ms "
+          f"p99={percentile(pruned_ms, 99):.3f}ms")
+    print(f"Exhaustive: p50={percentile(exhaustive_ms, 50):.3f}ms p95={percentile(exhaustive_ms, 95):.3f}ms "
+          f"p99={percentile(exhaustive_ms, 99):.3f}ms")
+    if stats.get('postings_total'):
+        print(f"Postings read: {stats['postings_read'] / stats['postings_total']:.1%} of the query terms' lists")
+    print(f"Top-{k} differs from exhaustive scoring on {mismatches} queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BM25 index over subject lines')
+    parser.add_argument('query', nargs='?', help='Query to run')
+    parser.add_argument('--build', metavar='DIR', help='Build from the database and save to DIR')
+    parser.add_argument('--index', metavar='DIR', default='bm25-index', help='Saved index to load')
+    parser.add_argument('--benchmark', metavar='N_OR_FILE', help='Sample N queries, or read one per line from FILE')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--k1', type=float, default=DEFAULT_K1)
+    parser.add_argument('-b', type=float, default=DEFAULT_B)
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.time()
+        rows = TrigramSearchEngine.fetch_rows(get_supabase())
+        index = BM25Index.build(rows, args.k1, args.b)
+        index.save(args.build)
+        print(f"✅ Indexed {index.size} subject lines, {len(index.terms)} terms, {len(index.doc_ids)} postings "
+              f"in {time.time() - started:.1f}s -> {args.build}")
+        return
+
+    index = BM25Index.load(args.index)
+
+    if args.benchmark:
+        if os.path.exists(args.benchmark):
+            with open(args.benchmark, 'r', encoding='utf-8') as f:
+                queries = [line.strip() for line in f if line.strip()]
+        else:
+            queries = sample_queries(index, int(args.benchmark))
+        benchmark(index, queries, args.k)
+        return
+
+    if not args.query:
+        parser.print_help()
+        sys.exit(1)
+
+    started = time.perf_counter()
+    results = index.search(args.query, args.k)
+    elapsed_us = (time.perf_counter() - started) * 1e6
+    for doc, score in results:
+        print(f"{score:7.3f}  {float(index.open_rates[doc]):.4f}  {index.subject_line(doc)}")
+    print(f"({elapsed_us:.0f}µs)")
+
+
+if __name__ == "__main__":
+    main()
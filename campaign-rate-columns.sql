@@ -0,0 +1,107 @@
+-- Numeric email-rate columns for marketing_campaigns
+-- email_*_rate hold the vendor's text ('45.2%', '0.452', 'None'), so every filter, sort or
+-- average had to cast row by row. The *_num columns hold the same rate as a fraction; the
+-- importers fill them (campaign_rates.py) and migrate-campaign-rates.py backfills existing
+-- rows in id-range chunks with backfill_campaign_rates().
+
+-- Step 1: Columns (no default, so adding them does not rewrite the table)
+ALTER TABLE marketing_campaigns
+  ADD COLUMN IF NOT EXISTS email_inbox_rate_num NUMERIC(5,4),
+  ADD COLUMN IF NOT EXISTS email_spam_rate_num NUMERIC(5,4),
+  ADD COLUMN IF NOT EXISTS email_read_rate_num NUMERIC(5,4),
+  ADD COLUMN IF NOT EXISTS email_delete_rate_num NUMERIC(5,4),
+  ADD COLUMN IF NOT EXISTS email_delete_without_read_rate_num NUMERIC(5,4);
+
+-- Step 2: Parser, same rules as campaign_rates.parse_rate()
+-- '45.2%' -> 0.452. Bare numbers follow p_percent, the column's unit detected by the
+-- importer (TRUE: '45.2' -> 0.452, FALSE: '0.452' -> 0.452). With no unit (NULL), values
+-- above 1 are percentages, values below 1 are fractions, and a bare 1 (100% or 1%) is
+-- ambiguous -> NULL. Missing, malformed and out-of-range values -> NULL.
+DROP FUNCTION IF EXISTS parse_rate_text(TEXT);
+
+CREATE OR REPLACE FUNCTION parse_rate_text(p_value TEXT, p_percent BOOLEAN DEFAULT NULL)
+RETURNS NUMERIC AS $$
+DECLARE
+  t TEXT := btrim(p_value);
+  percent BOOLEAN;
+  rate NUMERIC;
+BEGIN
+  IF t IS NULL OR t = '' OR lower(t) IN ('none', 'null', 'n/a', 'na', '-') THEN
+    RETURN NULL;
+  END IF;
+
+  percent := right(t, 1) = '%';
+  IF percent THEN
+    t := btrim(left(t, -1));
+  END IF;
+  IF t !~ '^[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?$' THEN
+    RETURN NULL;
+  END IF;
+
+  rate := t::NUMERIC;
+  IF NOT percent THEN
+    IF p_percent IS NOT NULL THEN
+      percent := p_percent;
+    ELSIF rate = 1 THEN
+      RETURN NULL;
+    ELSE
+      percent := rate > 1;
+    END IF;
+  END IF;
+  IF percent THEN
+    rate := rate / 100;
+  END IF;
+  IF rate < 0 OR rate > 1 THEN
+    RETURN NULL;
+  END IF;
+  RETURN round(rate, 4);
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Step 3: Backfill one id range. The table does not record which file a row came from, so
+-- the backfill parses with no unit and only fills rate columns that are still NULL,
+-- keeping the values the importers parsed with the file's detected unit. Rows that already
+-- hold their values are skipped, so the migration can be re-run or resumed.
+-- p_reparse re-parses every rate (e.g. rows backfilled before a bare 1 became ambiguous).
+DROP FUNCTION IF EXISTS backfill_campaign_rates(INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION backfill_campaign_rates(p_from_id INTEGER, p_to_id INTEGER,
+                                                   p_reparse BOOLEAN DEFAULT FALSE)
+RETURNS INTEGER AS $$
+DECLARE
+  updated INTEGER;
+BEGIN
+  IF p_reparse THEN
+    UPDATE marketing_campaigns
+    SET email_inbox_rate_num = parse_rate_text(email_inbox_rate),
+        email_spam_rate_num = parse_rate_text(email_spam_rate),
+        email_read_rate_num = parse_rate_text(email_read_rate),
+        email_delete_rate_num = parse_rate_text(email_delete_rate),
+        email_delete_without_read_rate_num = parse_rate_text(email_delete_without_read_rate)
+    WHERE id >= p_from_id AND id < p_to_id
+      AND (email_inbox_rate_num IS DISTINCT FROM parse_rate_text(email_inbox_rate)
+        OR email_spam_rate_num IS DISTINCT FROM parse_rate_text(email_spam_rate)
+        OR email_read_rate_num IS DISTINCT FROM parse_rate_text(email_read_rate)
+        OR email_delete_rate_num IS DISTINCT FROM parse_rate_text(email_delete_rate)
+        OR email_delete_without_read_rate_num IS DISTINCT FROM parse_rate_text(email_delete_without_read_rate));
+  ELSE
+    UPDATE marketing_campaigns
+    SET email_inbox_rate_num = COALESCE(email_inbox_rate_num, parse_rate_text(email_inbox_rate)),
+        email_spam_rate_num = COALESCE(email_spam_rate_num, parse_rate_text(email_spam_rate)),
+        email_read_rate_num = COALESCE(email_read_rate_num, parse_rate_text(email_read_rate)),
+        email_delete_rate_num = COALESCE(email_delete_rate_num, parse_rate_text(email_delete_rate)),
+        email_delete_without_read_rate_num = COALESCE(email_delete_without_read_rate_num,
+                                                      parse_rate_text(email_delete_without_read_rate))
+    WHERE id >= p_from_id AND id < p_to_id
+      AND ((email_inbox_rate_num IS NULL AND parse_rate_text(email_inbox_rate) IS NOT NULL)
+        OR (email_spam_rate_num IS NULL AND parse_rate_text(email_spam_rate) IS NOT NULL)
+        OR (email_read_rate_num IS NULL AND parse_rate_text(email_read_rate) IS NOT NULL)
+        OR (email_delete_rate_num IS NULL AND parse_rate_text(email_delete_rate) IS NOT NULL)
+        OR (email_delete_without_read_rate_num IS NULL
+            AND parse_rate_text(email_delete_without_read_rate) IS NOT NULL));
+  END IF;
+
+  GET DIAGNOSTICS updated = ROW_COUNT;
+  RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
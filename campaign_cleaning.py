@@ -0,0 +1,223 @@
+"""
+Row cleaning shared by the marketing_campaigns importers.
+
+Every importer used to carry its own clean_data(), which redefined its helper closures for
+each row, looked every column up by header name, and tried up to three strptime formats
+per date. CampaignRowCleaner resolves the CSV header once into a list of (position,
+converter) pairs and returns each row as a tuple in COLUMNS order, ready for
+execute_values(). Supabase importers turn it into a dict with as_dict(). Dates go through
+a DateParser (date_parsing.py) that detects the file's format and parses each distinct
+string once. Each rate column's unit (fraction or percentage) is detected from the same
+sample (campaign_rates.detect_rate_unit()).
+
+Usage:
+  cleaner = CampaignRowCleaner(header)              # dates as datetime.date (psycopg2)
+  cleaner = CampaignRowCleaner(header, iso_dates=True)  # dates as 'YYYY-MM-DD' (JSON)
+  sample, rows = peek(reader, DATE_SAMPLE_ROWS)
+  cleaner.detect_dates(sample)
+  cleaner.detect_rates(sample)
+  values = cleaner.clean(row)                       # None if a required field is missing
+"""
+
+from functools import lru_cache, partial
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from campaign_rates import detect_rate_unit, parse_rate
+from date_parsing import DateParser
+
+MISSING = (None, '', 'None')
+
+# Rows read ahead to detect the date format and the rate units
+DATE_SAMPLE_ROWS = 1000
+
+TRUE_VALUES = frozenset(['true', '1', 'yes', 't'])
+
+# (database column, CSV header, kind), in insert order. Rate columns appear twice: the
+# vendor text and its parsed fraction (campaign_rates.py).
+COLUMN_SPECS: List[Tuple[str, str, str]] = [
+    ('campaign_id', 'Campaign ID', 'text'),
+    ('campaign_observation_date', 'Campaign Observation Date', 'date'),
+    ('media_channel', 'Media Channel', 'text'),
+    ('marketing_company', 'Marketing Company', 'text'),
+    ('industry', 'Industry', 'text'),
+    ('subindustry', 'Subindustry', 'text'),
+    ('product_type', 'Product Type', 'text'),
+    ('brand', 'Brand', 'text'),
+    ('product', 'Product', 'text'),
+    ('bundled_products', 'Bundled Products', 'text'),
+    ('properties', 'Properties', 'text'),
+    ('affiliated_company', 'Affiliated Company', 'text'),
+    ('post_link', 'Post Link', 'text'),
+    ('landing_page', 'Landing Page', 'text'),
+    ('campaign_observation_country', 'Campaign Observation Country', 'text'),
+    ('estimated_volume', 'Estimated Volume', 'int'),
+    ('estimated_spend', 'Estimated Spend', 'decimal'),
+    ('email_inbox_rate', 'Email - Inbox Rate', 'text'),
+    ('email_spam_rate', 'Email - Spam Rate', 'text'),
+    ('email_read_rate', 'Email - Read Rate', 'text'),
+    ('email_delete_rate', 'Email - Delete Rate', 'text'),
+    ('email_delete_without_read_rate', 'Email - Delete Without Read Rate', 'text'),
+    ('email_inbox_rate_num', 'Email - Inbox Rate', 'rate'),
+    ('email_spam_rate_num', 'Email - Spam Rate', 'rate'),
+    ('email_read_rate_num', 'Email - Read Rate', 'rate'),
+    ('email_delete_rate_num', 'Email - Delete Rate', 'rate'),
+    ('email_delete_without_read_rate_num', 'Email - Delete Without Read Rate', 'rate'),
+    ('subject_line', 'Subject Line', 'text'),
+    ('email_sender_domain', 'Email- Sender Domain', 'text'),
+    ('social_post_type', 'Social - Post Type', 'text'),
+    ('social_engagement', 'Social - Engagement', 'text'),
+    ('digital_domain_ad_seen_on', 'Digital - Domain Ad Seen On', 'text'),
+    ('panelist_location', 'Panelist Location', 'text'),
+    ('metro_area', 'Metro Area', 'text'),
+    ('is_general_branding', 'Is General Branding', 'bool'),
+    ('text_content', 'Text Content', 'text'),
+    ('day_part', 'Day Part', 'text'),
+    ('ad_duration_seconds', 'Ad Duration (seconds)', 'int'),
+    ('channel', 'Channel', 'text'),
+    ('program', 'Program', 'text'),
+]
+
+# thumbnail_url is derived from marketing_company
+COLUMNS: List[str] = [column for column, _, _ in COLUMN_SPECS] + ['thumbnail_url']
+COLUMN_INDEX: Dict[str, int] = {column: i for i, column in enumerate(COLUMNS)}
+
+# Every input column the cleaner reads: vendor CSV headers, or the database column names that
+# Parquet/Arrow exports of marketing_campaigns use. Columnar readers project onto these.
+INPUT_COLUMNS: List[str] = list(dict.fromkeys(
+    [csv_header for _, csv_header, _ in COLUMN_SPECS] +
+    [column for column, _, kind in COLUMN_SPECS if kind != 'rate']
+))
+
+REQUIRED_COLUMNS = ['campaign_id', 'campaign_observation_date', 'media_channel', 'marketing_company', 'industry']
+
+THUMBNAIL_URL = "https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={}"
+UNKNOWN_THUMBNAIL_URL = "https://via.placeholder.com/150x100/6B7280/FFFFFF?text=Unknown"
+
+
+def clean_text(value: Any) -> Optional[str]:
+    if value in MISSING:
+        return None
+    return str(value).strip()
+
+
+def parse_int(value: Any) -> Optional[int]:
+    if value in MISSING:
+        return None
+    try:
+        return int(float(value))
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_decimal(value: Any) -> Optional[float]:
+    if value in MISSING:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_boolean(value: Any) -> bool:
+    if value in MISSING:
+        return False
+    return str(value).lower() in TRUE_VALUES
+
+
+cached_parse_rate = lru_cache(maxsize=65536)(parse_rate)
+
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'text': clean_text,
+    'int': parse_int,
+    'decimal': parse_decimal,
+    'bool': parse_boolean,
+    'rate': cached_parse_rate,
+}
+
+
+def thumbnail_url(company: Optional[str]) -> str:
+    if company and company != 'None':
+        return THUMBNAIL_URL.format(company.replace(' ', '+'))
+    return UNKNOWN_THUMBNAIL_URL
+
+
+class CampaignRowCleaner:
+    """Cleans input rows (sequences in header order) into tuples in COLUMNS order
+
+    The header may use the vendor CSV headers or the database column names.
+    """
+
+    def __init__(self, header: Sequence[str], iso_dates: bool = False, date_format: Optional[str] = None):
+        positions = {name.strip(): i for i, name in enumerate(header)}
+        self.dates = DateParser(date_format)
+        converters = dict(CONVERTERS, date=self.dates.parse_iso if iso_dates else self.dates.parse)
+
+        indexes = []
+        self.converters = []
+        self.missing_headers = []
+        # (converter index, text column, input position) of each rate column present
+        self._rates: List[Tuple[int, str, int]] = []
+        self.rate_units: Dict[str, Optional[bool]] = {}
+        for column, csv_header, kind in COLUMN_SPECS:
+            # Rate columns are parsed from the text rate, under either name
+            source = column[:-len('_num')] if kind == 'rate' else column
+            position = positions.get(csv_header, positions.get(source))
+            if position is None:
+                # Columns absent from this export clean like an empty cell
+                if csv_header not in self.missing_headers:
+                    self.missing_headers.append(csv_header)
+                position = 0
+                convert = (lambda value, default=converters[kind]('None'): default)
+            else:
+                convert = converters[kind]
+                if kind == 'rate':
+                    self._rates.append((len(self.converters), source, position))
+            indexes.append(position)
+            self.converters.append(convert)
+
+        self.width = max(indexes) + 1
+        self._pick = itemgetter(*indexes)
+        self._required = [COLUMN_INDEX[column] for column in REQUIRED_COLUMNS]
+        self._company = COLUMN_INDEX['marketing_company']
+        self._date_position = positions.get('Campaign Observation Date', positions.get('campaign_observation_date'))
+
+    def detect_dates(self, rows: Iterable[Sequence[Any]]) -> Optional[str]:
+        """Detect the observation date format from sample rows (see DateParser.detect)"""
+        if self._date_position is None:
+            return None
+        position = self._date_position
+        return self.dates.detect(row[position] for row in rows if len(row) > position)
+
+    def detect_rates(self, rows: Sequence[Sequence[Any]]) -> Dict[str, Optional[bool]]:
+        """Detect each rate column's unit from sample rows (see detect_rate_unit)
+
+        Returns text column -> True (percentages), False (fractions) or None (undecided).
+        """
+        for i, column, position in self._rates:
+            unit = detect_rate_unit(row[position] for row in rows if len(row) > position)
+            self.rate_units[column] = unit
+            self.converters[i] = partial(cached_parse_rate, percent_unit=unit)
+        return self.rate_units
+
+    def describe_rates(self) -> str:
+        """One line for the import log"""
+        if not self.rate_units:
+            return "Rates: no rate columns"
+        names = {True: 'percent', False: 'fraction', None: "undecided (bare 1 -> NULL)"}
+        return "Rates: " + ', '.join(f"{column} {names[unit]}" for column, unit in self.rate_units.items())
+
+    def clean(self, row: Sequence[Any]) -> Optional[tuple]:
+        """Cleaned values in COLUMNS order, or None if a required field is missing"""
+        if len(row) < self.width:
+            # Short (ragged) lines: missing trailing cells are empty
+            row = list(row) + [''] * (self.width - len(row))
+        values = [convert(value) for convert, value in zip(self.converters, self._pick(row))]
+        for i in self._required:
+            if not values[i]:
+                return None
+        values.append(thumbnail_url(values[self._company]))
+        return tuple(values)
+
+    @staticmethod
+    def as_dict(values: tuple) -> Dict[str, Any]:
+        return dict(zip(COLUMNS, values))
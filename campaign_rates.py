@@ -0,0 +1,105 @@
+"""
+Numeric email rates for marketing_campaigns (campaign-rate-columns.sql).
+
+The vendor exports carry email rates as text: '45.2%', '0.452', 'None' or blank. The
+importers keep that text in the email_*_rate columns and store the parsed fraction next to
+it in email_*_rate_num, so filters, sorts and averages work on an indexable NUMERIC(5,4).
+parse_rate() and the SQL parse_rate_text() used by the backfill apply the same rules.
+
+A bare number is a fraction in some exports and a percentage in others. The importers
+detect each rate column's unit from a sample of rows (detect_rate_unit(), like DateParser
+does for dates) and parse every value in the column with it. Without a detected unit,
+values above 1 are percentages, values below 1 are fractions, and a bare 1 (100% or 1%)
+is ambiguous and parses to None.
+"""
+
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Text column -> numeric column
+RATE_COLUMNS = {
+    'email_inbox_rate': 'email_inbox_rate_num',
+    'email_spam_rate': 'email_spam_rate_num',
+    'email_read_rate': 'email_read_rate_num',
+    'email_delete_rate': 'email_delete_rate_num',
+    'email_delete_without_read_rate': 'email_delete_without_read_rate_num',
+}
+
+MISSING_VALUES = {'none', 'null', 'n/a', 'na', '-'}
+
+_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+
+_FOUR_PLACES = Decimal('0.0001')
+
+
+def _split(value: Any) -> Optional[Tuple[Decimal, bool]]:
+    """(number, has '%') of a rate cell, or None if it is missing or malformed"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text.lower() in MISSING_VALUES:
+        return None
+
+    percent = text.endswith('%')
+    if percent:
+        text = text[:-1].strip()
+    if not _NUMBER_RE.match(text):
+        return None
+    return Decimal(text), percent
+
+
+def detect_rate_unit(values: Iterable[Any]) -> Optional[bool]:
+    """Unit of the bare numbers in a column sample: True for percentages, False for fractions
+
+    A bare value above 1 or any '%' value makes the column a percentage column; otherwise a
+    value strictly between 0 and 1 makes it a fraction column. A sample of only 0s and 1s
+    (or no numbers at all) is undecided -> None.
+    """
+    fraction = False
+    for value in values:
+        parsed = _split(value)
+        if parsed is None:
+            continue
+        number, percent = parsed
+        if percent or number > 1:
+            return True
+        if 0 < number < 1:
+            fraction = True
+    return False if fraction else None
+
+
+def parse_rate(value: Any, percent_unit: Optional[bool] = None) -> Optional[float]:
+    """'45.2%' -> 0.452; bare numbers per the column's unit; missing or out-of-range -> None
+
+    percent_unit is the column's detected unit (detect_rate_unit()). If it is None, '45.2'
+    -> 0.452 and '0.452' -> 0.452, but a bare '1' could be either and parses to None.
+    """
+    parsed = _split(value)
+    if parsed is None:
+        return None
+    rate, percent = parsed
+
+    if not percent:
+        if percent_unit is None:
+            if rate == 1:
+                return None
+            percent = rate > 1
+        else:
+            percent = percent_unit
+    # Decimal rounding matches round() on NUMERIC in parse_rate_text()
+    if percent:
+        rate /= 100
+    if rate < 0 or rate > 1:
+        return None
+    return float(rate.quantize(_FOUR_PLACES, rounding=ROUND_HALF_UP))
+
+
+def rate_values(row: Dict[str, Any], units: Optional[Dict[str, Optional[bool]]] = None) -> Dict[str, Optional[float]]:
+    """Numeric rate columns for a cleaned row that has the email_*_rate text columns
+
+    units maps text columns to their detected unit (CampaignRowCleaner.detect_rates()).
+    """
+    units = units or {}
+    return {num_column: parse_rate(row.get(column), units.get(column))
+            for column, num_column in RATE_COLUMNS.items()}
@@ -0,0 +1,185 @@
+-- Campaigns listing: keyset pagination and planner-estimated counts
+-- /api/campaigns used OFFSET paging with count: 'exact', so page N read and discarded every
+-- row before it and every request counted the whole table. list_campaigns_keyset() seeks
+-- straight to a page from the (sort value, id) of the row next to it, and count_campaigns()
+-- only counts exactly when the planner expects a small result.
+-- Pages contain only the columns the grid renders (marketing_campaigns_list); the detail
+-- modal fetches the full row by campaign_id.
+-- Deploy with: python3 campaigns_listing.py --deploy (also creates the indexes below
+-- CONCURRENTLY):
+--   (sort_field, id) btree per sortable column, for the seek and the ordered scan; the
+--   default date sort INCLUDEs the list columns so its pages are index-only scans
+--   gin_trgm_ops on campaign_id, marketing_company, industry, for the ILIKE search
+
+-- Step 1: Narrow listing view
+-- Keep in sync with LIST_COLUMNS in src/app/api/campaigns/route.ts and LIST_INCLUDE in
+-- campaigns_listing.py. The wide TEXT columns (text_content, bundled_products, URLs,
+-- subject_line) are left to the detail fetch.
+CREATE OR REPLACE VIEW marketing_campaigns_list AS
+SELECT
+  id,
+  campaign_id,
+  campaign_observation_date,
+  media_channel,
+  marketing_company,
+  industry,
+  estimated_volume,
+  estimated_spend,
+  thumbnail_url
+FROM marketing_campaigns;
+
+-- Step 2: Helpers
+-- Column type used to cast the cursor value; also the whitelist of sortable columns
+CREATE OR REPLACE FUNCTION campaign_sort_type(p_sort_field TEXT)
+RETURNS TEXT AS $$
+BEGIN
+  RETURN CASE p_sort_field
+    WHEN 'campaign_id' THEN 'text'
+    WHEN 'campaign_observation_date' THEN 'date'
+    WHEN 'media_channel' THEN 'text'
+    WHEN 'marketing_company' THEN 'text'
+    WHEN 'industry' THEN 'text'
+    WHEN 'estimated_volume' THEN 'integer'
+    WHEN 'estimated_spend' THEN 'numeric'
+    ELSE NULL
+  END;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- WHERE clause for the listing filters, with values quoted as literals
+CREATE OR REPLACE FUNCTION campaign_filter_sql(
+  p_search TEXT,
+  p_media_channel TEXT,
+  p_marketing_company TEXT
+)
+RETURNS TEXT AS $$
+DECLARE
+  clauses TEXT[] := ARRAY['TRUE'];
+BEGIN
+  IF COALESCE(p_search, '') <> '' THEN
+    clauses := clauses || format(
+      '(campaign_id ILIKE %1$L OR marketing_company ILIKE %1$L OR industry ILIKE %1$L)',
+      '%' || p_search || '%'
+    );
+  END IF;
+  IF COALESCE(p_media_channel, '') <> '' THEN
+    clauses := clauses || format('media_channel = %L', p_media_channel);
+  END IF;
+  IF COALESCE(p_marketing_company, '') <> '' THEN
+    clauses := clauses || format('marketing_company = %L', p_marketing_company);
+  END IF;
+  RETURN array_to_string(clauses, ' AND ');
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Step 3: Keyset page
+-- p_cursor_value/p_cursor_id are the sort value (as text) and id of the last row of the
+-- previous page for p_direction = 'next', or of the first row of the current page for
+-- 'prev'. No cursor returns the first page. Rows for 'prev' come back nearest-first, i.e.
+-- in reverse display order; callers reverse them.
+-- NULLs follow ORDER BY's defaults (last ascending, first descending). Nullable columns are
+-- read as two index range scans, non-NULL rows and NULL rows, so each stays a seek.
+-- Earlier versions returned SETOF marketing_campaigns; the return type cannot be replaced
+DROP FUNCTION IF EXISTS list_campaigns_keyset(TEXT, TEXT, TEXT, INTEGER, TEXT, INTEGER, TEXT, TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION list_campaigns_keyset(
+  p_sort_field TEXT DEFAULT 'campaign_observation_date',
+  p_sort_direction TEXT DEFAULT 'desc',
+  p_cursor_value TEXT DEFAULT NULL,
+  p_cursor_id INTEGER DEFAULT NULL,
+  p_direction TEXT DEFAULT 'next',
+  p_limit INTEGER DEFAULT 10,
+  p_search TEXT DEFAULT NULL,
+  p_media_channel TEXT DEFAULT NULL,
+  p_marketing_company TEXT DEFAULT NULL
+)
+RETURNS SETOF marketing_campaigns_list AS $$
+DECLARE
+  col_type TEXT := campaign_sort_type(p_sort_field);
+  nullable BOOLEAN := p_sort_field IN ('estimated_volume', 'estimated_spend');
+  ascending BOOLEAN;
+  op TEXT;
+  dir TEXT;
+  where_sql TEXT := campaign_filter_sql(p_search, p_media_channel, p_marketing_company);
+  non_null_part TEXT;
+  null_part TEXT;
+  part TEXT;
+  remaining INTEGER := p_limit;
+  fetched INTEGER;
+BEGIN
+  IF col_type IS NULL THEN
+    RAISE EXCEPTION 'Unsupported sort field: %', p_sort_field;
+  END IF;
+  IF p_direction NOT IN ('next', 'prev') THEN
+    RAISE EXCEPTION 'Unsupported direction: %', p_direction;
+  END IF;
+  IF p_limit IS NULL OR p_limit < 1 OR p_limit > 1000 THEN
+    RAISE EXCEPTION 'Limit must be between 1 and 1000';
+  END IF;
+
+  -- Paging backwards is a forward scan in the opposite order
+  ascending := (lower(p_sort_direction) = 'asc') <> (p_direction = 'prev');
+  op := CASE WHEN ascending THEN '>' ELSE '<' END;
+  dir := CASE WHEN ascending THEN 'ASC' ELSE 'DESC' END;
+
+  IF p_cursor_id IS NULL THEN
+    non_null_part := format('%I IS NOT NULL', p_sort_field);
+    null_part := format('%I IS NULL', p_sort_field);
+  ELSIF p_cursor_value IS NOT NULL THEN
+    non_null_part := format('(%I, id) %s (%L::%s, %s)', p_sort_field, op, p_cursor_value, col_type, p_cursor_id);
+    -- NULLs come after every value ascending, and were already passed descending
+    null_part := CASE WHEN ascending THEN format('%I IS NULL', p_sort_field) END;
+  ELSE
+    -- The cursor row is in the NULL group
+    non_null_part := CASE WHEN ascending THEN NULL ELSE format('%I IS NOT NULL', p_sort_field) END;
+    null_part := format('%I IS NULL AND id %s %s', p_sort_field, op, p_cursor_id);
+  END IF;
+
+  IF NOT nullable THEN
+    null_part := NULL;
+  END IF;
+
+  FOREACH part IN ARRAY CASE WHEN ascending THEN ARRAY[non_null_part, null_part]
+                             ELSE ARRAY[null_part, non_null_part] END
+  LOOP
+    CONTINUE WHEN part IS NULL;
+    RETURN QUERY EXECUTE format(
+      'SELECT * FROM marketing_campaigns_list WHERE %s AND %s ORDER BY %I %s, id %s LIMIT %s',
+      where_sql, part, p_sort_field, dir, dir, remaining
+    );
+    GET DIAGNOSTICS fetched = ROW_COUNT;
+    remaining := remaining - fetched;
+    EXIT WHEN remaining <= 0;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Step 4: Count
+-- Uses the planner's row estimate, and only runs count(*) when the estimate is below
+-- p_exact_below, where an exact count is cheap and the UI shows "N campaigns".
+-- VOLATILE: Postgres does not allow EXPLAIN inside a STABLE or IMMUTABLE function.
+CREATE OR REPLACE FUNCTION count_campaigns(
+  p_search TEXT DEFAULT NULL,
+  p_media_channel TEXT DEFAULT NULL,
+  p_marketing_company TEXT DEFAULT NULL,
+  p_exact_below BIGINT DEFAULT 10000
+)
+RETURNS TABLE(total BIGINT, estimated BOOLEAN) AS $$
+DECLARE
+  where_sql TEXT := campaign_filter_sql(p_search, p_media_channel, p_marketing_company);
+  plan JSON;
+  estimate BIGINT;
+BEGIN
+  EXECUTE 'EXPLAIN (FORMAT JSON) SELECT 1 FROM marketing_campaigns WHERE ' || where_sql INTO plan;
+  estimate := (plan->0->'Plan'->>'Plan Rows')::BIGINT;
+
+  IF estimate < p_exact_below THEN
+    EXECUTE 'SELECT count(*) FROM marketing_campaigns WHERE ' || where_sql INTO total;
+    estimated := FALSE;
+  ELSE
+    total := estimate;
+    estimated := TRUE;
+  END IF;
+  RETURN NEXT;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
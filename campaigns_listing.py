@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Deploy and benchmark the keyset campaigns listing (campaigns-listing-functions.sql).
+
+--deploy creates the (sort_field, id) btree indexes and the trigram indexes for the search
+columns CONCURRENTLY, then installs the marketing_campaigns_list view,
+list_campaigns_keyset() and count_campaigns(). The index for the default date sort
+INCLUDEs the listing columns, so first pages and their neighbours are index-only scans.
+
+--benchmark times OFFSET paging against keyset paging at increasing page depths for each
+sort field. Every keyset page is checked against the OFFSET page with the same ordering,
+and so is the page reached backwards from the page after it. It also times count(*)
+against count_campaigns().
+
+Usage:
+  python3 campaigns_listing.py --deploy
+  python3 campaigns_listing.py --benchmark --pages 1 100 1000 5000
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Any, List, Optional, Tuple
+from dotenv import load_dotenv
+import logging
+from latency_stats import percentile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Sortable columns in CampaignsView (campaign_sort_type() in the SQL)
+SORT_FIELDS = [
+    'campaign_observation_date',
+    'campaign_id',
+    'media_channel',
+    'marketing_company',
+    'industry',
+    'estimated_volume',
+    'estimated_spend',
+]
+
+SEARCH_COLUMNS = ['campaign_id', 'marketing_company', 'industry']
+
+# The default sort, whose keyset index also covers the marketing_campaigns_list columns
+COVERING_SORT_FIELD = 'campaign_observation_date'
+LIST_INCLUDE = ['campaign_id', 'media_channel', 'marketing_company', 'industry',
+                'estimated_volume', 'estimated_spend', 'thumbnail_url']
+
+DEFAULT_PAGES = [1, 100, 1000, 5000]
+DEFAULT_LIMIT = 10
+
+
+def deploy(connection):
+    """Create the indexes without blocking writes, then the functions"""
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        for field in SORT_FIELDS:
+            if field == COVERING_SORT_FIELD:
+                continue
+            started = time.time()
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaigns_{field}_keyset "
+                f"ON marketing_campaigns ({field}, id)"
+            )
+            logger.info(f"idx_campaigns_{field}_keyset ready in {time.time() - started:.1f}s")
+
+        started = time.time()
+        cursor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaigns_list_by_date "
+            f"ON marketing_campaigns ({COVERING_SORT_FIELD}, id) INCLUDE ({', '.join(LIST_INCLUDE)})"
+        )
+        # Superseded by the covering index
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_campaigns_{COVERING_SORT_FIELD}_keyset")
+        logger.info(f"idx_campaigns_list_by_date ready in {time.time() - started:.1f}s")
+
+        for column in SEARCH_COLUMNS:
+            started = time.time()
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaigns_{column}_trgm "
+                f"ON marketing_campaigns USING gin ({column} gin_trgm_ops)"
+            )
+            logger.info(f"idx_campaigns_{column}_trgm ready in {time.time() - started:.1f}s")
+
+        with open('campaigns-listing-functions.sql', 'r') as f:
+            cursor.execute(f.read())
+        logger.info("Deployed marketing_campaigns_list, list_campaigns_keyset() and count_campaigns()")
+
+        # Index-only scans need an up-to-date visibility map
+        cursor.execute("VACUUM (ANALYZE) marketing_campaigns")
+    finally:
+        cursor.close()
+        connection.autocommit = False
+
+
+def order_by(field: str, descending: bool) -> str:
+    direction = 'DESC' if descending else 'ASC'
+    return f"ORDER BY {field} {direction}, id {direction}"
+
+
+def offset_page(cursor, field: str, descending: bool, offset: int, limit: int) -> List[int]:
+    """Ids of one page the way /api/campaigns used to read it (with an id tie-break)"""
+    cursor.execute(
+        f"SELECT * FROM marketing_campaigns {order_by(field, descending)} OFFSET %s LIMIT %s",
+        (offset, limit)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def row_key(cursor, field: str, descending: bool, offset: int) -> Optional[Tuple[Optional[str], int]]:
+    """(sort value as text, id) of the row at offset, i.e. a keyset cursor"""
+    cursor.execute(
+        f"SELECT {field}::text, id FROM marketing_campaigns {order_by(field, descending)} OFFSET %s LIMIT 1",
+        (offset,)
+    )
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def keyset_page(cursor, field: str, descending: bool, key: Optional[Tuple[Optional[str], int]],
+                limit: int, direction: str = 'next') -> List[int]:
+    """Ids of one page from list_campaigns_keyset(), in display order"""
+    value, row_id = key if key else (None, None)
+    cursor.execute(
+        "SELECT id FROM list_campaigns_keyset(%s, %s, %s, %s, %s, %s)",
+        (field, 'desc' if descending else 'asc', value, row_id, direction, limit)
+    )
+    ids = [row[0] for row in cursor.fetchall()]
+    return ids[::-1] if direction == 'prev' else ids
+
+
+def timed(fn, *args) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def benchmark(connection, fields: List[str], pages: List[int], limit: int, repeats: int) -> bool:
+    """Print latency per page depth and return whether every keyset page matched"""
+    cursor = connection.cursor()
+    mismatches = 0
+    try:
+        cursor.execute("SELECT count(*) FROM marketing_campaigns")
+        total = cursor.fetchone()[0]
+        print(f"\nmarketing_campaigns rows: {total}")
+        print(f"{'sort field':<26} {'page':>6} | {'offset p50':>10} {'offset p95':>10} | "
+              f"{'keyset p50':>10} {'keyset p95':>10} | match")
+
+        for field in fields:
+            for descending in (True, False):
+                label = f"{field} {'desc' if descending else 'asc'}"
+                for page in pages:
+                    offset = (page - 1) * limit
+                    if offset >= total:
+                        continue
+                    key = row_key(cursor, field, descending, offset - 1) if offset else None
+
+                    offset_ms, keyset_ms = [], []
+                    for _ in range(repeats):
+                        expected, ms = timed(offset_page, cursor, field, descending, offset, limit)
+                        offset_ms.append(ms)
+                        actual, ms = timed(keyset_page, cursor, field, descending, key, limit)
+                        keyset_ms.append(ms)
+
+                    matched = actual == expected
+                    # Previous from the first row of the next page lands on this page again
+                    if matched and offset + limit < total:
+                        next_first = row_key(cursor, field, descending, offset + limit)
+                        matched = keyset_page(cursor, field, descending, next_first, limit, 'prev') == expected
+                    mismatches += 0 if matched else 1
+
+                    print(f"{label:<26} {page:>6} | {percentile(offset_ms, 50):>8.1f}ms "
+                          f"{percentile(offset_ms, 95):>8.1f}ms | {percentile(keyset_ms, 50):>8.1f}ms "
+                          f"{percentile(keyset_ms, 95):>8.1f}ms | {'✅' if matched else '❌'}")
+                    connection.rollback()
+
+        started = time.perf_counter()
+        cursor.execute("SELECT count(*) FROM marketing_campaigns")
+        cursor.fetchone()
+        exact_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        cursor.execute("SELECT total, estimated FROM count_campaigns()")
+        estimate, estimated = cursor.fetchone()
+        estimate_ms = (time.perf_counter() - started) * 1000
+        kind = 'estimated' if estimated else 'exact'
+        print(f"\ncount(*): {total} in {exact_ms:.1f}ms | count_campaigns(): {estimate} ({kind}) in {estimate_ms:.1f}ms")
+    finally:
+        connection.rollback()
+        cursor.close()
+
+    if mismatches:
+        logger.warning(f"{mismatches} keyset pages differed from OFFSET paging")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploy and benchmark keyset paging for marketing_campaigns')
+    parser.add_argument('--deploy', action='store_true', help='Create the indexes and listing functions')
+    parser.add_argument('--benchmark', action='store_true', help='Compare OFFSET and keyset paging')
+    parser.add_argument('--pages', type=int, nargs='+', default=DEFAULT_PAGES, help='Page numbers to time')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Rows per page')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per page')
+    parser.add_argument('--fields', nargs='+', choices=SORT_FIELDS, default=SORT_FIELDS,
+                        help='Sort fields to benchmark')
+    args = parser.parse_args()
+
+    if not args.deploy and not args.benchmark:
+        parser.print_help()
+        return
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    # Imported here: measure-campaign-payloads.py reads this module's column lists without psycopg2
+    import psycopg2
+    try:
+        connection = psycopg2.connect(**db_config)
+    except Exception as e:
+        logger.error(f"Failed to connect to database: {e}")
+        sys.exit(1)
+
+    try:
+        if args.deploy:
+            deploy(connection)
+        if args.benchmark and not benchmark(connection, args.fields, args.pages, args.limit, args.repeats):
+            sys.exit(2)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
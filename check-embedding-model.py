@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Verify that stored subject line embeddings come from the configured embedding model.
+
+Samples rows from subject_line_embeddings, re-embeds their subject lines with the active model
+from src/lib/embedding-model.json and compares the vectors. Re-embedding with the same model
+gives a cosine similarity of ~1.0; vectors from a different model (ada-002 vs 3-small, which
+have the same dimension) come out near 0. Exits with status 1 on any mismatch.
+
+Usage:
+  python3 check-embedding-model.py              # sample 25 rows
+  python3 check-embedding-model.py --sample 100
+"""
+
+import os
+import sys
+import random
+import argparse
+import numpy as np
+from supabase import create_client, Client
+from dotenv import load_dotenv
+from embedding_models import active_model, embed_texts, parse_vector
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Same model re-embedding the same text is not bit-exact, but stays well above this
+MATCH_THRESHOLD = 0.98
+
+
+def sample_embeddings(supabase: Client, sample_size: int):
+    """Fetch sample_size stored embeddings at random offsets, with their subject lines"""
+    total = supabase.table('subject_line_embeddings').select('id', count='exact').limit(1).execute().count or 0
+    if total == 0:
+        return total, []
+
+    offsets = sorted(random.sample(range(total), min(sample_size, total)))
+    rows = []
+    for offset in offsets:
+        response = supabase.table('subject_line_embeddings').select(
+            'subject_line_id, embedding, subject_lines(subject_line)'
+        ).order('id').range(offset, offset).execute()
+        rows.extend(response.data)
+    return total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check stored embeddings against the configured model')
+    parser.add_argument('--sample', type=int, default=25, help='Number of stored embeddings to check')
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+
+    if not all([supabase_url, supabase_key, openai_api_key]):
+        print("Error: Missing required environment variables")
+        print("Required: NEXT_PUBLIC_SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, OPENAI_API_KEY")
+        sys.exit(1)
+
+    model = active_model()
+    print(f"🔍 Configured model: {model['name']} ({model['dimensions']} dims, "
+          f"similarity threshold {model['similarity_threshold']})")
+
+    supabase: Client = create_client(supabase_url, supabase_key)
+    total, rows = sample_embeddings(supabase, args.sample)
+    if not rows:
+        print("❌ No stored embeddings found; run generate-embeddings.py first")
+        sys.exit(1)
+    print(f"📊 Sampled {len(rows)} of {total} stored embeddings")
+
+    stored = [parse_vector(row['embedding']) for row in rows]
+    wrong_size = [row['subject_line_id'] for row, vec in zip(rows, stored) if len(vec) != model['dimensions']]
+    if wrong_size:
+        print(f"❌ {len(wrong_size)} embeddings do not have {model['dimensions']} dimensions "
+              f"(subject_line_ids: {wrong_size[:10]})")
+        sys.exit(1)
+
+    texts = [row['subject_lines']['subject_line'] for row in rows]
+    fresh = np.asarray(embed_texts(openai_api_key, model['name'], texts), dtype=np.float32)
+    stored = np.asarray(stored, dtype=np.float32)
+
+    cosines = np.sum(stored * fresh, axis=1) / (
+        np.linalg.norm(stored, axis=1) * np.linalg.norm(fresh, axis=1)
+    )
+
+    mismatched = [(row, c) for row, c in zip(rows, cosines) if c < MATCH_THRESHOLD]
+    print(f"📈 Cosine(stored, re-embedded): min {cosines.min():.4f}, "
+          f"median {np.median(cosines):.4f}, max {cosines.max():.4f}")
+
+    if mismatched:
+        print(f"❌ {len(mismatched)} of {len(rows)} sampled embeddings were not produced by {model['name']}:")
+        for row, cosine in mismatched[:10]:
+            print(f"   subject_line_id {row['subject_line_id']}: cosine {cosine:.4f}  {row['subject_lines']['subject_line']!r}")
+        print("Regenerate them with generate-embeddings.py after clearing subject_line_embeddings,")
+        print("or set \"active\" in src/lib/embedding-model.json to the model that produced them.")
+        sys.exit(1)
+
+    print(f"✅ Stored embeddings match {model['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,11 @@ CREATE TABLE IF NOT EXISTS marketing_campaigns (
     email_read_rate VARCHAR(50),
     email_delete_rate VARCHAR(50),
     email_delete_without_read_rate VARCHAR(50),
+    email_inbox_rate_num NUMERIC(5,4),
+    email_spam_rate_num NUMERIC(5,4),
+    email_read_rate_num NUMERIC(5,4),
+    email_delete_rate_num NUMERIC(5,4),
+    email_delete_without_read_rate_num NUMERIC(5,4),
     subject_line TEXT,
     email_sender_domain VARCHAR(255),
     social_post_type VARCHAR(50),
@@ -56,6 +56,11 @@ def create_table():
         email_read_rate VARCHAR(50),
         email_delete_rate VARCHAR(50),
         email_delete_without_read_rate VARCHAR(50),
+        email_inbox_rate_num NUMERIC(5,4),
+        email_spam_rate_num NUMERIC(5,4),
+        email_read_rate_num NUMERIC(5,4),
+        email_delete_rate_num NUMERIC(5,4),
+        email_delete_without_read_rate_num NUMERIC(5,4),
         subject_line TEXT,
         email_sender_domain VARCHAR(255),
         social_post_type VARCHAR(50),
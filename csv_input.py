@@ -0,0 +1,335 @@
+"""
+Streaming input for the CSV importers.
+
+Vendor exports arrive in whatever encoding the vendor's tool used, sometimes mixed within a
+file (mostly UTF-8 with a few cp1252 rows), and sometimes compressed. open_csv_lines() reads
+the file as bytes in large blocks, decompressing gzip, bzip2, xz and zstd on the fly. It detects
+the encoding from the first block and yields the lines as str for csv.reader in a single
+pass.
+
+A block that does not decode is decoded line by line instead. Each bad line is repaired
+(cp1252 for a UTF-8 file, then U+FFFD for bytes that are still invalid) and recorded with
+its line number. The importer decides per row whether to keep the repaired text or to
+quarantine the row (QuarantineFile), so an import never restarts because of one bad byte.
+
+open_table() also reads Parquet and Arrow IPC files, one record batch at a time and only the
+requested columns. It yields their rows as tuples, like csv.reader rows, so the importers
+clean every format the same way.
+
+Usage:
+  with open_csv_lines(path) as lines:
+      reader = csv.reader(lines)
+      for row in reader:
+          bad = lines.take_bad_lines(reader.line_num)   # [(line number, raw bytes), ...]
+
+  with open_table(path, columns=CSV_HEADERS) as table:  # .csv[.gz|.bz2|.xz|.zst], .parquet, .arrow
+      for row in table:                                 # values in table.header order
+          ...
+"""
+
+import bz2
+import csv
+import gzip
+import lzma
+import codecs
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Optional: zstd-compressed CSVs and Parquet/Arrow inputs (requirements-import.txt)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+BLOCK_SIZE = 1 << 20  # bytes decoded at a time
+SAMPLE_SIZE = 1 << 20  # bytes used to detect the encoding
+RECORD_BATCH_ROWS = 65536  # Parquet rows decoded at a time
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+PARQUET_MAGIC = b'PAR1'
+ARROW_MAGIC = b'ARROW1'
+
+# Extensions of Arrow IPC streams, which have no magic number
+ARROW_STREAM_EXTENSIONS = ('.arrows', '.arrow_stream')
+
+
+def _open_zstd(path: str, mode: str) -> BinaryIO:
+    if zstandard is None:
+        raise RuntimeError(f"{path} is zstd-compressed; pip install zstandard to read it")
+    return zstandard.ZstdDecompressor().stream_reader(open(path, mode), closefd=True)
+
+
+# Magic bytes -> (compression, opener)
+COMPRESSIONS = [
+    (b'\x1f\x8b', 'gzip', gzip.open),
+    (b'BZh', 'bzip2', bz2.open),
+    (b'\xfd7zXZ\x00', 'xz', lzma.open),
+    (ZSTD_MAGIC, 'zstd', _open_zstd),
+]
+
+# Bytes cp1252 leaves undefined; a sample containing them is read as latin-1
+_CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+
+def open_binary(path: str) -> Tuple[BinaryIO, Optional[str]]:
+    """Open path for reading bytes, decompressing by magic number; returns (stream, compression)"""
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    for magic, compression, opener in COMPRESSIONS:
+        if head.startswith(magic):
+            return opener(path, 'rb'), compression
+    return open(path, 'rb'), None
+
+
+def detect_encoding(sample: bytes) -> str:
+    """utf-8-sig, utf-8, cp1252 or latin-1, whichever decodes the sample first"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    # The sample may end inside a multi-byte character
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if _CP1252_UNDEFINED.isdisjoint(sample):
+        return 'cp1252'
+    return 'latin-1'
+
+
+class DecodedLines:
+    """Lines of a byte stream decoded as str (with their line endings), read in large blocks"""
+
+    def __init__(self, stream: BinaryIO, encoding: Optional[str] = None, compression: Optional[str] = None,
+                 block_size: int = BLOCK_SIZE):
+        self.stream = stream
+        self.compression = compression
+        self.block_size = block_size
+        self._pending = stream.read(max(block_size, SAMPLE_SIZE))
+        self.encoding = encoding or detect_encoding(self._pending)
+        if self.encoding == 'utf-8-sig':
+            # The BOM is only at the start; the rest of the file is plain UTF-8
+            self._pending = self._pending[len(codecs.BOM_UTF8):]
+            self.encoding = 'utf-8'
+        self.line_num = 0
+        self.bad_lines: List[Tuple[int, bytes]] = []
+        self.stats: Dict[str, int] = {'bytes': 0, 'lines': 0, 'repaired': 0}
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            block = self._next_block()
+            if block is None:
+                return
+            self.stats['bytes'] += len(block)
+            try:
+                text = block.decode(self.encoding)
+            except UnicodeDecodeError:
+                yield from self._decode_lines(block)
+                continue
+            lines = text.split('\n')
+            last = lines.pop()
+            self.line_num += len(lines)
+            for line in lines:
+                yield line + '\n'
+            if last:
+                # Final line without a newline
+                self.line_num += 1
+                yield last
+            self.stats['lines'] = self.line_num
+
+    def _next_block(self) -> Optional[bytes]:
+        """Whole lines only, so no block ends inside a multi-byte character"""
+        while True:
+            chunk = self.stream.read(self.block_size)
+            if not chunk:
+                block, self._pending = self._pending, b''
+                return block or None
+            self._pending += chunk
+            end = self._pending.rfind(b'\n')
+            if end >= 0:
+                block, self._pending = self._pending[:end + 1], self._pending[end + 1:]
+                return block
+
+    def _decode_lines(self, block: bytes) -> Iterator[str]:
+        raws = block.split(b'\n')
+        last = raws.pop()
+        for raw in [raw + b'\n' for raw in raws] + ([last] if last else []):
+            self.line_num += 1
+            try:
+                yield raw.decode(self.encoding)
+            except UnicodeDecodeError:
+                self.bad_lines.append((self.line_num, raw))
+                self.stats['repaired'] += 1
+                yield self.repair(raw)
+        self.stats['lines'] = self.line_num
+
+    def repair(self, raw: bytes) -> str:
+        """Best-effort text for a line that does not decode"""
+        if self.encoding == 'utf-8':
+            # Mixed files: a UTF-8 export with rows pasted from a cp1252 tool
+            try:
+                return raw.decode('cp1252')
+            except UnicodeDecodeError:
+                pass
+        return raw.decode(self.encoding, errors='replace')
+
+    def take_bad_lines(self, up_to_line: int) -> List[Tuple[int, bytes]]:
+        """Repaired lines numbered up to up_to_line (e.g. csv.reader.line_num after a row)"""
+        taken = 0
+        while taken < len(self.bad_lines) and self.bad_lines[taken][0] <= up_to_line:
+            taken += 1
+        if not taken:
+            return []
+        bad, self.bad_lines = self.bad_lines[:taken], self.bad_lines[taken:]
+        return bad
+
+    def describe(self) -> str:
+        """One line for the import log"""
+        source = f"{self.compression}-compressed " if self.compression else ''
+        line = f"Reading {source}input as {self.encoding}"
+        if self.stats['repaired']:
+            line += f"; {self.stats['repaired']} lines did not decode and were repaired"
+        return line
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_csv_lines(path: str, encoding: Optional[str] = None, block_size: int = BLOCK_SIZE) -> DecodedLines:
+    """DecodedLines over a (possibly compressed) file; the encoding is detected unless given"""
+    stream, compression = open_binary(path)
+    try:
+        return DecodedLines(stream, encoding, compression, block_size)
+    except Exception:
+        stream.close()
+        raise
+
+
+class QuarantineFile:
+    """Rows set aside because they did not decode: UTF-8 CSV plus their line numbers and raw bytes"""
+
+    def __init__(self, path: str, header: Sequence[str]):
+        self.path = path
+        self.header = list(header) + ['_lines', '_raw']
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    def write(self, values: Sequence[Any], bad_lines: List[Tuple[int, bytes]]):
+        if self.file is None:
+            # Only runs that hit a bad row leave a quarantine file behind
+            self.file = open(self.path, 'w', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(self.header)
+        self.writer.writerow(list(values) + [
+            ' '.join(str(line_num) for line_num, _ in bad_lines),
+            ''.join(raw.decode('utf-8', errors='backslashreplace') for _, raw in bad_lines).rstrip('\r\n')
+        ])
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class TableInput:
+    """Rows of a CSV, Parquet or Arrow file as sequences in header order"""
+
+    def __init__(self, header: Sequence[str], rows: Iterator[Sequence[Any]], file_format: str,
+                 lines: Optional[DecodedLines] = None, closer=None):
+        self.header = list(header)
+        self.rows = rows
+        self.format = file_format
+        self.lines = lines
+        self._closer = closer
+
+    def __iter__(self) -> Iterator[Sequence[Any]]:
+        return self.rows
+
+    def describe(self) -> str:
+        """One line for the import log"""
+        if self.lines is not None:
+            return self.lines.describe()
+        return f"Reading {self.format} input ({len(self.header)} columns)"
+
+    def close(self):
+        if self._closer is not None:
+            self._closer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def table_format(path: str) -> str:
+    """'parquet', 'arrow', 'arrow-stream' or 'csv' (possibly compressed)"""
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(PARQUET_MAGIC):
+        return 'parquet'
+    if head.startswith(ARROW_MAGIC):
+        return 'arrow'
+    if path.lower().endswith(ARROW_STREAM_EXTENSIONS):
+        return 'arrow-stream'
+    return 'csv'
+
+
+def _arrow_rows(batches: Iterator, names: List[str]) -> Iterator[Tuple]:
+    """Record batches -> row tuples; values are cast to text, as a CSV would hold them"""
+    for batch in batches:
+        columns = []
+        for name in names:
+            column = batch.column(batch.schema.get_field_index(name))
+            try:
+                column = column.cast(pyarrow.string())
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+                pass  # e.g. nested types; the cleaners str() whatever comes through
+            columns.append(column.to_pylist())
+        yield from zip(*columns)
+
+
+def open_table(path: str, columns: Optional[Sequence[str]] = None,
+               batch_rows: int = RECORD_BATCH_ROWS) -> TableInput:
+    """Stream a CSV (plain or compressed), Parquet or Arrow IPC file as rows
+
+    For Parquet and Arrow only `columns` that the file has are read (all if None); a CSV
+    always yields every column.
+    """
+    file_format = table_format(path)
+    if file_format == 'csv':
+        lines = open_csv_lines(path)
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        return TableInput(header, reader, 'csv', lines=lines, closer=lines.close)
+
+    if pyarrow is None:
+        raise RuntimeError(f"{path} is a {file_format} file; pip install pyarrow to read it")
+
+    if file_format == 'parquet':
+        parquet = pyarrow.parquet.ParquetFile(path)
+        names = [name for name in parquet.schema_arrow.names if columns is None or name in columns]
+        # Column projection: Parquet only decodes the selected columns
+        batches = parquet.iter_batches(batch_size=batch_rows, columns=names)
+        return TableInput(names, _arrow_rows(batches, names), file_format, closer=parquet.close)
+
+    source = pyarrow.memory_map(path, 'r')
+    if file_format == 'arrow':
+        reader = pyarrow.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        reader = pyarrow.ipc.open_stream(source)
+        batches = iter(reader)
+    names = [name for name in reader.schema.names if columns is None or name in columns]
+    return TableInput(names, _arrow_rows(batches, names), file_format, closer=source.close)
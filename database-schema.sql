@@ -145,3 +145,5 @@ $$ LANGUAGE plpgsql;
 -- Enable the pg_trgm extension for similarity function
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
+-- Trigram index for ILIKE '%...%' and similarity matching (see trigram-search-function.sql)
+CREATE INDEX IF NOT EXISTS idx_subject_line_trgm ON subject_lines USING gin (subject_line gin_trgm_ops);
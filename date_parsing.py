@@ -0,0 +1,173 @@
+"""
+Date parsing for the CSV importers.
+
+Panel exports repeat the same few hundred dates across millions of rows, and each file uses
+one format. Instead of trying every format with strptime on every row, DateParser detects
+the file's format from a sample of rows and memoizes string -> date in a bounded LRU cache,
+so each distinct date string is parsed once.
+
+A file whose sample only holds dates like 03/04/2025 cannot tell month/day from day/month.
+Detection then marks the parser as ambiguous. It reads the dates month first, like the old
+importers did, counts the ambiguous values, and the importers print a warning. To pin the
+format, set IMPORT_DATE_FORMAT (e.g. IMPORT_DATE_FORMAT=%d/%m/%Y) or pass date_format.
+
+Usage:
+  parser = DateParser()
+  parser.detect(row['Date'] for row in sample)
+  parser.parse('9/24/2025 16:04')      # date(2025, 9, 24); the time of day is ignored
+  parser.parse_iso('2025-09-24')       # '2025-09-24'
+"""
+
+import os
+from datetime import date
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+YMD = '%Y-%m-%d'
+MDY = '%m/%d/%Y'
+DMY = '%d/%m/%Y'
+
+# Preference order: a tie between MDY and DMY resolves to MDY, like the old importers
+FORMATS = [YMD, MDY, DMY]
+
+DATE_FORMAT_ENV = 'IMPORT_DATE_FORMAT'
+
+MISSING = (None, '', 'None')
+
+
+def _parse_ymd(text: str) -> date:
+    year, month, day = text.split('-')
+    return _build(year, month, day)
+
+
+def _parse_mdy(text: str) -> date:
+    month, day, year = text.split('/')
+    return _build(year, month, day)
+
+
+def _parse_dmy(text: str) -> date:
+    day, month, year = text.split('/')
+    return _build(year, month, day)
+
+
+def _build(year: str, month: str, day: str) -> date:
+    # Same fields strptime accepts for these formats: 4-digit years, 1-2 digit month and day
+    if len(year) != 4 or not 0 < len(month) <= 2 or not 0 < len(day) <= 2:
+        raise ValueError(f"Not a date: {year}-{month}-{day}")
+    return date(int(year), int(month), int(day))
+
+
+# Format -> parser raising ValueError; several times faster than datetime.strptime
+PARSERS = {YMD: _parse_ymd, MDY: _parse_mdy, DMY: _parse_dmy}
+
+
+def date_part(value: Any) -> str:
+    """'9/24/2025 16:04' -> '9/24/2025'"""
+    return str(value).strip().split(' ', 1)[0]
+
+
+def is_ambiguous(text: str) -> bool:
+    """True for a slash date that is valid both month first and day first, e.g. 03/04/2025"""
+    parts = text.split('/')
+    if len(parts) != 3 or parts[0] == parts[1]:
+        return False
+    try:
+        return 0 < int(parts[0]) <= 12 and 0 < int(parts[1]) <= 12
+    except ValueError:
+        return False
+
+
+def peek(rows: Iterable, count: int) -> Tuple[List, Iterator]:
+    """The first `count` rows, and an iterator that still yields every row"""
+    rows = iter(rows)
+    sample = list(islice(rows, count))
+    return sample, chain(sample, rows)
+
+
+class DateParser:
+    """Cached date parsing in a file's detected (or pinned) format"""
+
+    def __init__(self, date_format: Optional[str] = None, cache_size: int = 4096):
+        date_format = date_format or os.getenv(DATE_FORMAT_ENV) or None
+        if date_format is not None and date_format not in PARSERS:
+            raise ValueError(f"Unsupported date format {date_format!r}; expected one of {FORMATS}")
+        self.format = date_format
+        self.pinned = date_format is not None
+        self.ambiguous = False
+        self.stats: Dict[str, int] = {'ambiguous': 0, 'fallback': 0, 'invalid': 0}
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+        self.parse_iso = lru_cache(maxsize=cache_size)(self._parse_iso)
+
+    def detect(self, values: Iterable[Any]) -> Optional[str]:
+        """Pick the format that parses the most sample values; None if none parse"""
+        if self.pinned:
+            return self.format
+
+        texts = {date_part(value) for value in values if value not in MISSING}
+        matches = {fmt: 0 for fmt in FORMATS}
+        for text in texts:
+            for fmt, parse in PARSERS.items():
+                try:
+                    parse(text)
+                    matches[fmt] += 1
+                except ValueError:
+                    pass
+
+        best = max(matches.values()) if texts else 0
+        if best == 0:
+            self.format = None
+            return None
+        self.format = next(fmt for fmt in FORMATS if matches[fmt] == best)
+        # Every slash date in the sample reads both ways
+        self.ambiguous = matches[MDY] == matches[DMY] == best
+        self.parse.cache_clear()
+        self.parse_iso.cache_clear()
+        return self.format
+
+    def _parse(self, value: Any) -> Optional[date]:
+        # Counted per distinct string, since repeats are served from the cache
+        if value in MISSING:
+            return None
+        text = date_part(value)
+        if self.format is not None:
+            try:
+                parsed = PARSERS[self.format](text)
+                if self.ambiguous and is_ambiguous(text):
+                    self.stats['ambiguous'] += 1
+                return parsed
+            except ValueError:
+                pass
+        # Rows in another format than the sample: try the rest in preference order
+        for fmt in FORMATS:
+            if fmt == self.format:
+                continue
+            try:
+                parsed = PARSERS[fmt](text)
+                if self.format is not None:
+                    self.stats['fallback'] += 1
+                return parsed
+            except ValueError:
+                continue
+        self.stats['invalid'] += 1
+        return None
+
+    def _parse_iso(self, value: Any) -> Optional[str]:
+        parsed = self.parse(value)
+        return parsed.isoformat() if parsed else None
+
+    def describe(self) -> str:
+        """One line for the import log"""
+        if self.format is None:
+            return "Dates: no format detected"
+        source = 'pinned' if self.pinned else 'detected'
+        line = f"Dates: {self.format} ({source})"
+        if self.ambiguous:
+            line += (f"; AMBIGUOUS: the sample fits {MDY} and {DMY}. Reading month first "
+                     f"({self.stats['ambiguous']} distinct ambiguous dates so far). "
+                     f"Set {DATE_FORMAT_ENV} to choose")
+        if self.stats['fallback']:
+            line += f"; {self.stats['fallback']} dates in another format"
+        if self.stats['invalid']:
+            line += f"; {self.stats['invalid']} unparseable dates"
+        return line
@@ -46,7 +46,9 @@ def deploy_functions():
         print("  - find_similar_subject_lines_with_filters()")
         print("  - getVolumes()")
         print("  - getOpenRates()")
-            
+        print("Rollup-backed variants (getVolumeRollups, getOpenRateRollups) live in rollup-tables.sql;")
+        print("install them with: python3 refresh-rollups.py --install")
+
     except Exception as e:
         print(f"❌ Error deploying functions: {e}")
         print("This might be expected if functions already exist")
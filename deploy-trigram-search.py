@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Deploy the trigram GIN index and search_subject_lines_trgm() function, then verify with
+EXPLAIN that the candidate query actually uses the index.
+
+Usage:
+  python3 deploy-trigram-search.py                    # create index + function, run the EXPLAIN check
+  python3 deploy-trigram-search.py --check-only       # only run the EXPLAIN check
+  python3 deploy-trigram-search.py --tune "credit card" "bonus offer"
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List
+import psycopg2
+from dotenv import load_dotenv
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+INDEX_NAME = 'idx_subject_line_trgm'
+
+# Same WHERE clause as the matched CTE in search_subject_lines_trgm()
+CANDIDATE_QUERY = """
+SELECT sl.id
+FROM subject_lines sl
+WHERE sl.subject_line ILIKE '%%' || %(query)s || '%%'
+   OR sl.subject_line ILIKE '%%' || %(variant)s || '%%'
+   OR sl.subject_line %% %(query)s
+"""
+
+DEFAULT_SAMPLE_QUERIES = ['credit card', 'bonus', 'holiday savings', 'your account']
+
+
+def variant_of(query: str) -> str:
+    """Singular/plural form used by strategies 2 and 3"""
+    if query.endswith('s'):
+        return re.sub(r's$', '', query.strip().lower())
+    return query.strip().lower() + 's'
+
+
+def find_index_nodes(plan: Dict[str, Any]) -> List[str]:
+    """Collect every index name used anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    names = []
+    if 'Index Name' in plan:
+        names.append(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        names.extend(find_index_nodes(child))
+    return names
+
+
+def deploy(connection):
+    """Create the index without blocking writes, then the function"""
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        logger.info(f"Creating {INDEX_NAME} (CONCURRENTLY)...")
+        started = time.time()
+        cursor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            "ON subject_lines USING gin (subject_line gin_trgm_ops)"
+        )
+        logger.info(f"Index ready in {time.time() - started:.1f}s")
+
+        with open('trigram-search-function.sql', 'r') as f:
+            cursor.execute(f.read())
+        logger.info("Deployed search_subject_lines_trgm()")
+
+        cursor.execute("ANALYZE subject_lines")
+    finally:
+        cursor.close()
+        connection.autocommit = False
+
+
+def explain_check(connection, queries: List[str], threshold: float, force_index: bool) -> bool:
+    """EXPLAIN the candidate query for each sample and report whether the trigram index is used"""
+    cursor = connection.cursor()
+    all_used = True
+    try:
+        cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(threshold),))
+        if force_index:
+            # Tiny tables are legitimately seq-scanned; this proves the index is usable at all
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        for query in queries:
+            cursor.execute(
+                "EXPLAIN (FORMAT JSON) " + CANDIDATE_QUERY,
+                {'query': query, 'variant': variant_of(query)}
+            )
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            indexes = find_index_nodes(plan[0]['Plan'])
+            used = INDEX_NAME in indexes
+            all_used = all_used and used
+            status = "✅ uses" if used else "❌ does not use"
+            logger.info(f"{query!r}: {status} {INDEX_NAME} (plan root: {plan[0]['Plan']['Node Type']})")
+    finally:
+        connection.rollback()
+        cursor.close()
+    return all_used
+
+
+def tune(connection, queries: List[str], thresholds: List[float]):
+    """Show fuzzy candidate counts and function latency per similarity threshold"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM subject_lines")
+        total = cursor.fetchone()[0]
+        print(f"\nsubject_lines rows: {total}")
+        print(f"{'threshold':>9} | {'avg fuzzy candidates':>20} | {'avg latency':>11}")
+
+        for threshold in thresholds:
+            candidate_counts = []
+            latencies = []
+            for query in queries:
+                cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(threshold),))
+                cursor.execute("SELECT COUNT(*) FROM subject_lines WHERE subject_line %% %s", (query,))
+                candidate_counts.append(cursor.fetchone()[0])
+
+                started = time.perf_counter()
+                cursor.execute("SELECT * FROM search_subject_lines_trgm(%s, %s)", (query, threshold))
+                cursor.fetchall()
+                latencies.append((time.perf_counter() - started) * 1000)
+                connection.rollback()
+
+            print(f"{threshold:>9.2f} | {sum(candidate_counts) / len(candidate_counts):>20.0f} | "
+                  f"{sum(latencies) / len(latencies):>9.1f}ms")
+    finally:
+        connection.rollback()
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploy and verify the trigram search index')
+    parser.add_argument('--check-only', action='store_true', help='Skip deployment, only run the EXPLAIN check')
+    parser.add_argument('--threshold', type=float, default=0.3, help='pg_trgm.similarity_threshold for the check')
+    parser.add_argument('--force-index', action='store_true', help='Disable seq scans during the check')
+    parser.add_argument('--tune', nargs='*', metavar='QUERY', help='Compare thresholds on these queries')
+    args = parser.parse_args()
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    try:
+        connection = psycopg2.connect(**db_config)
+    except Exception as e:
+        logger.error(f"Failed to connect to database: {e}")
+        sys.exit(1)
+
+    try:
+        if not args.check_only and args.tune is None:
+            deploy(connection)
+
+        if args.tune is not None:
+            tune(connection, args.tune or DEFAULT_SAMPLE_QUERIES, [0.1, 0.2, 0.3, 0.4, 0.5])
+            return
+
+        if explain_check(connection, DEFAULT_SAMPLE_QUERIES, args.threshold, args.force_index):
+            logger.info("✅ Trigram index is used by the candidate query")
+        else:
+            logger.warning("Trigram index not used for every sample query")
+            logger.warning("On small tables this is expected; re-run with --force-index to confirm it is usable")
+            sys.exit(2)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
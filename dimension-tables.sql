@@ -0,0 +1,216 @@
+-- Dimension tables for filter lists
+-- allCompanies()/allIndustries() run SELECT DISTINCT over all of subject_lines, and
+-- /api/campaigns downloads every media_channel and marketing_company row to build its
+-- dropdowns. These tables hold each distinct value once. The importers add the values
+-- they see (dimensions.py), and every change bumps a version number. The API caches
+-- the snapshot under that version and serves it with an ETag.
+
+-- Step 1: Dimension tables
+-- Companies and industries appear in both subject_lines and marketing_campaigns; the flags
+-- record where, so each list matches the table its old query read from.
+CREATE TABLE IF NOT EXISTS dim_companies (
+  name TEXT PRIMARY KEY,
+  in_subject_lines BOOLEAN NOT NULL DEFAULT FALSE,
+  in_campaigns BOOLEAN NOT NULL DEFAULT FALSE,
+  first_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- subject_lines.sub_industry (allIndustries()) and marketing_campaigns.industry
+CREATE TABLE IF NOT EXISTS dim_industries (
+  name TEXT PRIMARY KEY,
+  in_subject_lines BOOLEAN NOT NULL DEFAULT FALSE,
+  in_campaigns BOOLEAN NOT NULL DEFAULT FALSE,
+  first_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS dim_media_channels (
+  name TEXT PRIMARY KEY,
+  first_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Step 2: Snapshot version
+-- Bumped by any change to a dimension table; the API uses it as the cache key and ETag.
+CREATE TABLE IF NOT EXISTS dimension_state (
+  id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version BIGINT NOT NULL DEFAULT 1,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO dimension_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_dimension_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE dimension_state SET version = version + 1, updated_at = NOW() WHERE id = 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level triggers fire even when nothing changed, so bump per changed row; the
+-- upsert below skips rows whose flags are already set, so repeat imports change nothing
+DROP TRIGGER IF EXISTS trg_dim_companies_version ON dim_companies;
+CREATE TRIGGER trg_dim_companies_version
+AFTER INSERT OR UPDATE OR DELETE ON dim_companies
+FOR EACH ROW EXECUTE FUNCTION bump_dimension_version();
+
+DROP TRIGGER IF EXISTS trg_dim_industries_version ON dim_industries;
+CREATE TRIGGER trg_dim_industries_version
+AFTER INSERT OR UPDATE OR DELETE ON dim_industries
+FOR EACH ROW EXECUTE FUNCTION bump_dimension_version();
+
+DROP TRIGGER IF EXISTS trg_dim_media_channels_version ON dim_media_channels;
+CREATE TRIGGER trg_dim_media_channels_version
+AFTER INSERT OR UPDATE OR DELETE ON dim_media_channels
+FOR EACH ROW EXECUTE FUNCTION bump_dimension_version();
+
+-- Step 3: Incremental upsert, called by the importers with the values of one run
+-- p_source is the table the values came from: 'subject_lines' or 'marketing_campaigns'.
+CREATE OR REPLACE FUNCTION upsert_dimension_values(
+  p_dimension TEXT,
+  p_source TEXT,
+  p_values TEXT[]
+)
+RETURNS INTEGER AS $$
+DECLARE
+  from_subject_lines BOOLEAN := p_source = 'subject_lines';
+  changed INTEGER;
+BEGIN
+  IF p_source NOT IN ('subject_lines', 'marketing_campaigns') THEN
+    RAISE EXCEPTION 'Unknown dimension source: %', p_source;
+  END IF;
+
+  IF p_dimension = 'companies' THEN
+    INSERT INTO dim_companies AS d (name, in_subject_lines, in_campaigns)
+    SELECT DISTINCT v, from_subject_lines, NOT from_subject_lines
+    FROM unnest(p_values) AS v
+    WHERE v IS NOT NULL AND v <> ''
+    ON CONFLICT (name) DO UPDATE
+      SET in_subject_lines = d.in_subject_lines OR EXCLUDED.in_subject_lines,
+          in_campaigns = d.in_campaigns OR EXCLUDED.in_campaigns
+      WHERE (EXCLUDED.in_subject_lines AND NOT d.in_subject_lines)
+         OR (EXCLUDED.in_campaigns AND NOT d.in_campaigns);
+  ELSIF p_dimension = 'industries' THEN
+    INSERT INTO dim_industries AS d (name, in_subject_lines, in_campaigns)
+    SELECT DISTINCT v, from_subject_lines, NOT from_subject_lines
+    FROM unnest(p_values) AS v
+    WHERE v IS NOT NULL AND v <> ''
+    ON CONFLICT (name) DO UPDATE
+      SET in_subject_lines = d.in_subject_lines OR EXCLUDED.in_subject_lines,
+          in_campaigns = d.in_campaigns OR EXCLUDED.in_campaigns
+      WHERE (EXCLUDED.in_subject_lines AND NOT d.in_subject_lines)
+         OR (EXCLUDED.in_campaigns AND NOT d.in_campaigns);
+  ELSIF p_dimension = 'media_channels' THEN
+    INSERT INTO dim_media_channels (name)
+    SELECT DISTINCT v
+    FROM unnest(p_values) AS v
+    WHERE v IS NOT NULL AND v <> ''
+    ON CONFLICT (name) DO NOTHING;
+  ELSE
+    RAISE EXCEPTION 'Unknown dimension: %', p_dimension;
+  END IF;
+
+  GET DIAGNOSTICS changed = ROW_COUNT;
+  RETURN changed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 4: Full rebuild from the source tables
+-- For the initial backfill, and to drop values whose last row was deleted (deduplication,
+-- manual cleanup). Only rows that actually differ are touched, so an unchanged rebuild
+-- leaves the version alone.
+CREATE OR REPLACE FUNCTION rebuild_dimensions()
+RETURNS VOID AS $$
+BEGIN
+  DROP TABLE IF EXISTS dim_rebuild_companies;
+  CREATE TEMP TABLE dim_rebuild_companies ON COMMIT DROP AS
+  SELECT name, bool_or(in_subject_lines) AS in_subject_lines, bool_or(in_campaigns) AS in_campaigns
+  FROM (
+    SELECT DISTINCT company AS name, TRUE AS in_subject_lines, FALSE AS in_campaigns
+    FROM subject_lines WHERE company IS NOT NULL AND company <> ''
+    UNION ALL
+    SELECT DISTINCT marketing_company, FALSE, TRUE
+    FROM marketing_campaigns WHERE marketing_company IS NOT NULL AND marketing_company <> ''
+  ) s
+  GROUP BY name;
+
+  DELETE FROM dim_companies d
+  WHERE NOT EXISTS (SELECT 1 FROM dim_rebuild_companies r WHERE r.name = d.name);
+  INSERT INTO dim_companies AS d (name, in_subject_lines, in_campaigns)
+  SELECT name, in_subject_lines, in_campaigns FROM dim_rebuild_companies
+  ON CONFLICT (name) DO UPDATE
+    SET in_subject_lines = EXCLUDED.in_subject_lines, in_campaigns = EXCLUDED.in_campaigns
+    WHERE (d.in_subject_lines, d.in_campaigns) IS DISTINCT FROM (EXCLUDED.in_subject_lines, EXCLUDED.in_campaigns);
+
+  DROP TABLE IF EXISTS dim_rebuild_industries;
+  CREATE TEMP TABLE dim_rebuild_industries ON COMMIT DROP AS
+  SELECT name, bool_or(in_subject_lines) AS in_subject_lines, bool_or(in_campaigns) AS in_campaigns
+  FROM (
+    SELECT DISTINCT sub_industry AS name, TRUE AS in_subject_lines, FALSE AS in_campaigns
+    FROM subject_lines WHERE sub_industry IS NOT NULL AND sub_industry <> ''
+    UNION ALL
+    SELECT DISTINCT industry, FALSE, TRUE
+    FROM marketing_campaigns WHERE industry IS NOT NULL AND industry <> ''
+  ) s
+  GROUP BY name;
+
+  DELETE FROM dim_industries d
+  WHERE NOT EXISTS (SELECT 1 FROM dim_rebuild_industries r WHERE r.name = d.name);
+  INSERT INTO dim_industries AS d (name, in_subject_lines, in_campaigns)
+  SELECT name, in_subject_lines, in_campaigns FROM dim_rebuild_industries
+  ON CONFLICT (name) DO UPDATE
+    SET in_subject_lines = EXCLUDED.in_subject_lines, in_campaigns = EXCLUDED.in_campaigns
+    WHERE (d.in_subject_lines, d.in_campaigns) IS DISTINCT FROM (EXCLUDED.in_subject_lines, EXCLUDED.in_campaigns);
+
+  DELETE FROM dim_media_channels d
+  WHERE NOT EXISTS (SELECT 1 FROM marketing_campaigns mc WHERE mc.media_channel = d.name);
+  INSERT INTO dim_media_channels (name)
+  SELECT DISTINCT media_channel FROM marketing_campaigns
+  WHERE media_channel IS NOT NULL AND media_channel <> ''
+  ON CONFLICT (name) DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 5: Version and snapshot for the API
+CREATE OR REPLACE FUNCTION dimension_version()
+RETURNS BIGINT AS $$
+  SELECT version FROM dimension_state WHERE id = 1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION dimension_snapshot()
+RETURNS JSONB AS $$
+  SELECT jsonb_build_object(
+    'version', (SELECT version FROM dimension_state WHERE id = 1),
+    'companies', COALESCE((SELECT jsonb_agg(name ORDER BY name) FROM dim_companies WHERE in_subject_lines), '[]'::jsonb),
+    'industries', COALESCE((SELECT jsonb_agg(name ORDER BY name) FROM dim_industries WHERE in_subject_lines), '[]'::jsonb),
+    'campaignCompanies', COALESCE((SELECT jsonb_agg(name ORDER BY name) FROM dim_companies WHERE in_campaigns), '[]'::jsonb),
+    'campaignIndustries', COALESCE((SELECT jsonb_agg(name ORDER BY name) FROM dim_industries WHERE in_campaigns), '[]'::jsonb),
+    'mediaChannels', COALESCE((SELECT jsonb_agg(name ORDER BY name) FROM dim_media_channels), '[]'::jsonb)
+  );
+$$ LANGUAGE sql STABLE;
+
+-- Step 6: Intent functions read the dimension tables
+-- Same signatures and ordering as intent-database-functions.sql
+CREATE OR REPLACE FUNCTION allCompanies()
+RETURNS TABLE(company text) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT d.name
+  FROM dim_companies d
+  WHERE d.in_subject_lines
+  ORDER BY d.name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION allIndustries()
+RETURNS TABLE(industry text) AS $$
+BEGIN
+  RETURN QUERY
+  SELECT d.name
+  FROM dim_industries d
+  WHERE d.in_subject_lines
+  ORDER BY d.name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 7: Backfill from the existing rows
+SELECT rebuild_dimensions();
@@ -0,0 +1,79 @@
+"""
+Import-time maintenance of the dimension tables behind the filter lists (dimension-tables.sql).
+
+Importers collect the companies, industries and media channels they write with a
+DimensionTracker and flush them once at the end of a run, through upsert_dimension_values().
+A value already recorded in this run is not sent again. Values that are already stored
+change nothing and do not bump the snapshot version, so the API's cached lists stay valid.
+refresh-dimensions.py installs the tables and resyncs them with the source tables.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Sequence, Set
+
+# Source table -> {dimension: column}
+DIMENSION_COLUMNS = {
+    'subject_lines': {'companies': 'company', 'industries': 'sub_industry'},
+    'marketing_campaigns': {'companies': 'marketing_company', 'industries': 'industry',
+                            'media_channels': 'media_channel'},
+}
+
+
+class DimensionTracker:
+    """Distinct dimension values written by one import run"""
+
+    def __init__(self, source: str):
+        if source not in DIMENSION_COLUMNS:
+            raise ValueError(f"Unknown dimension source {source!r}; expected one of {list(DIMENSION_COLUMNS)}")
+        self.source = source
+        self.columns = DIMENSION_COLUMNS[source]
+        self.pending: Dict[str, Set[str]] = {dimension: set() for dimension in self.columns}
+        self.flushed: Dict[str, Set[str]] = {dimension: set() for dimension in self.columns}
+
+    def add(self, rows: Iterable[Any], columns: Optional[Sequence[str]] = None):
+        """Record rows given as dicts, or as tuples laid out like `columns`"""
+        if columns is None:
+            lookups = [(dimension, column) for dimension, column in self.columns.items()]
+        else:
+            lookups = [(dimension, columns.index(column)) for dimension, column in self.columns.items()]
+        for row in rows:
+            for dimension, key in lookups:
+                value = row[key] if columns is not None else row.get(key)
+                if value and value not in self.flushed[dimension]:
+                    self.pending[dimension].add(value)
+
+    def __bool__(self):
+        return any(self.pending.values())
+
+    def _drain(self):
+        for dimension, values in self.pending.items():
+            if values:
+                yield dimension, sorted(values)
+                self.flushed[dimension].update(values)
+                values.clear()
+
+    def flush(self, cursor) -> int:
+        """Upsert pending values through a psycopg2 cursor (caller commits)"""
+        changed = 0
+        # A failure (e.g. dimension-tables.sql not installed) must not abort the import's transaction
+        cursor.execute("SAVEPOINT dimension_flush")
+        try:
+            for dimension, values in self._drain():
+                cursor.execute("SELECT upsert_dimension_values(%s, %s, %s)", (dimension, self.source, values))
+                changed += cursor.fetchone()[0] or 0
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT dimension_flush")
+            raise
+        cursor.execute("RELEASE SAVEPOINT dimension_flush")
+        return changed
+
+    def flush_supabase(self, supabase) -> int:
+        """Upsert pending values through the Supabase RPC endpoint"""
+        changed = 0
+        for dimension, values in self._drain():
+            response = supabase.rpc('upsert_dimension_values', {
+                'p_dimension': dimension,
+                'p_source': self.source,
+                'p_values': values
+            }).execute()
+            changed += response.data or 0
+        return changed
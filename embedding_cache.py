@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Query-embedding cache sidecar for /api/rag and /api/data/query-sql.
+
+Both routes embed the user's subject line on every chat step, and users re-test the same line
+many times in a session. This service keeps embeddings in an LRU + TTL store keyed by
+model + normalized text, persists it to disk, and coalesces concurrent identical requests so
+they trigger a single OpenAI call.
+
+Endpoints:
+  POST /embed  {"input": "...", "model": "..."} -> {"embedding": [...], "cached": bool, "took_ms": n}
+               model defaults to the active one in src/lib/embedding-model.json
+  GET  /stats  -> hit ratio, upstream calls and the latency saved by hits
+
+Usage:
+  python3 embedding_cache.py                        # listen on 127.0.0.1:8788
+  python3 embedding_cache.py --port 8788 --max-entries 20000 --ttl-hours 168
+Then set EMBEDDING_CACHE_URL=http://127.0.0.1:8788 for the Next.js app.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import pickle
+import signal
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from embedding_models import OPENAI_EMBEDDINGS_URL, active_model
+
+# Load environment variables
+load_dotenv('.env.local')
+
+CACHE_FORMAT_VERSION = 1
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive key text; case is kept since it can change the embedding"""
+    return _SPACE_RE.sub(' ', text or '').strip()
+
+
+class UpstreamError(Exception):
+    """OpenAI returned an error or could not be reached"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def fetch_embedding(api_key: str, model: str, text: str, timeout: float = 30.0) -> List[float]:
+    """One embeddings call to OpenAI"""
+    request = urllib.request.Request(
+        OPENAI_EMBEDDINGS_URL,
+        data=json.dumps({'input': text, 'model': model}).encode('utf-8'),
+        headers={
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        },
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise UpstreamError(e.code, f"OpenAI embeddings error: {e.code} {e.reason}")
+    except (urllib.error.URLError, TimeoutError) as e:
+        raise UpstreamError(502, f"OpenAI embeddings unreachable: {e}")
+    return payload['data'][0]['embedding']
+
+
+class _InFlight:
+    """A pending upstream call that identical concurrent requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.embedding: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+
+
+class EmbeddingCache:
+    """LRU + TTL store of float32 embeddings with request coalescing"""
+
+    def __init__(self, fetch, max_entries: int = 10000, ttl_seconds: float = 7 * 24 * 3600,
+                 path: Optional[str] = None):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], _InFlight] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_errors = 0
+        self.upstream_ms_total = 0.0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, model: str, text: str) -> Tuple[np.ndarray, str]:
+        """Embedding for (model, text) and how it was served: 'hit', 'coalesced' or 'miss'"""
+        key = (model, normalize_text(text))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, embedding = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding, 'hit'
+                del self._entries[key]
+
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                pending = _InFlight()
+                self._in_flight[key] = pending
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.embedding, 'coalesced'
+
+        try:
+            started = time.perf_counter()
+            embedding = np.asarray(self.fetch(model, key[1]), dtype=np.float32)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            pending.embedding = embedding
+            with self._lock:
+                self.upstream_ms_total += elapsed_ms
+                self._entries[key] = (time.time(), embedding)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                self._dirty = True
+            return embedding, 'miss'
+        except Exception as e:
+            pending.error = e
+            with self._lock:
+                self.upstream_errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            served = self.hits + self.coalesced + self.misses
+            upstream_calls = self.misses
+            avg_upstream_ms = self.upstream_ms_total / upstream_calls if upstream_calls else 0.0
+            avoided = self.hits + self.coalesced
+            return {
+                'entries': len(self._entries),
+                'requests': served,
+                'hits': self.hits,
+                'coalesced': self.coalesced,
+                'misses': self.misses,
+                'upstream_errors': self.upstream_errors,
+                'hit_ratio': round(avoided / served, 4) if served else 0.0,
+                'avg_upstream_ms': round(avg_upstream_ms, 1),
+                # Each avoided call would have cost roughly one average upstream round trip
+                'estimated_saved_ms': round(avoided * avg_upstream_ms, 1),
+            }
+
+    def save(self):
+        """Write a snapshot atomically; expired entries are dropped"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            cutoff = time.time() - self.ttl_seconds
+            entries = [(k, v) for k, v in self._entries.items() if v[0] >= cutoff]
+            self._dirty = False
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CACHE_FORMAT_VERSION, 'entries': entries}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"⚠️  Ignoring unreadable cache file {self.path}: {e}")
+            return
+        if payload.get('version') != CACHE_FORMAT_VERSION:
+            print(f"⚠️  Ignoring cache file {self.path} with version {payload.get('version')}")
+            return
+
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for key, value in payload['entries'][-self.max_entries:]:
+                if value[0] >= cutoff:
+                    self._entries[key] = value
+        print(f"Loaded {len(self._entries)} cached embeddings from {self.path}")
+
+    def start_autosave(self, interval_seconds: float = 60.0):
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.save()
+                except OSError as e:
+                    print(f"⚠️  Could not save embedding cache: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+def make_handler(cache: EmbeddingCache):
+    default_model = active_model()['name']
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send_json(200, cache.stats())
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            if self.path != '/embed':
+                self.send_error(404)
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                model = request.get('model') or default_model
+                text = request['input']
+            except (ValueError, KeyError):
+                self._send_json(400, {'error': 'Body must be JSON with "input" (and optionally "model")'})
+                return
+            if not isinstance(text, str) or not text.strip():
+                self._send_json(400, {'error': '"input" must be a non-empty string'})
+                return
+
+            started = time.perf_counter()
+            try:
+                embedding, source = cache.get(model, text)
+            except UpstreamError as e:
+                self._send_json(e.status, {'error': str(e)})
+                return
+            self._send_json(200, {
+                'model': model,
+                'embedding': embedding.tolist(),
+                'cached': source != 'miss',
+                'source': source,
+                'took_ms': round((time.perf_counter() - started) * 1000, 2),
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query-embedding cache sidecar')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8788)
+    parser.add_argument('--max-entries', type=int, default=10000)
+    parser.add_argument('--ttl-hours', type=float, default=168.0)
+    parser.add_argument('--cache-file', default=os.getenv('EMBEDDING_CACHE_FILE', 'embedding-cache.pkl'))
+    parser.add_argument('--save-interval', type=float, default=60.0, help='Seconds between snapshots')
+    args = parser.parse_args()
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print("Error: Missing OPENAI_API_KEY")
+        sys.exit(1)
+
+    cache = EmbeddingCache(
+        lambda model, text: fetch_embedding(api_key, model, text),
+        max_entries=args.max_entries,
+        ttl_seconds=args.ttl_hours * 3600,
+        path=args.cache_file
+    )
+    cache.start_autosave(args.save_interval)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cache))
+
+    def shutdown(signum, frame):
+        # serve_forever() must be stopped from another thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"Embedding cache listening on http://{args.host}:{args.port} (file: {args.cache_file})")
+    try:
+        server.serve_forever()
+    finally:
+        cache.save()
+        stats = cache.stats()
+        print(f"Saved {stats['entries']} embeddings. Hit ratio {stats['hit_ratio']:.1%}, "
+              f"~{stats['estimated_saved_ms'] / 1000:.1f}s of upstream latency saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Embedding model registry shared by the embedding generator and the query paths.
+
+src/lib/embedding-model.json names the active model together with its vector size and
+the similarity threshold the vector searches should use. The Next.js routes import the
+same file through src/lib/query-embedding.ts, so stored vectors and query vectors always
+come from the same embedding space. Switching models means editing the file and
+regenerating the stored embeddings (generate-embeddings.py), then running
+check-embedding-model.py.
+"""
+
+import os
+import json
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+OPENAI_EMBEDDINGS_URL = 'https://api.openai.com/v1/embeddings'
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'lib', 'embedding-model.json')
+
+
+def load_registry(path: str = REGISTRY_PATH) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        registry = json.load(f)
+    if registry.get('active') not in registry.get('models', {}):
+        raise ValueError(f"Active embedding model {registry.get('active')!r} is not defined in {path}")
+    return registry
+
+
+def active_model(registry: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The configured model as {'name', 'dimensions', 'similarity_threshold'}"""
+    registry = registry or load_registry()
+    name = registry['active']
+    return {'name': name, **registry['models'][name]}
+
+
+def embed_texts(api_key: str, model: str, texts: List[str], timeout: float = 60.0) -> List[List[float]]:
+    """Embed a batch of texts in one OpenAI request, returned in input order"""
+    request = urllib.request.Request(
+        OPENAI_EMBEDDINGS_URL,
+        data=json.dumps({'input': texts, 'model': model}).encode('utf-8'),
+        headers={
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        },
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        payload = json.loads(response.read())
+    return [item['embedding'] for item in sorted(payload['data'], key=lambda item: item['index'])]
+
+
+def parse_vector(value: Any) -> List[float]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
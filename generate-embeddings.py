@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Script to generate embeddings for all subject lines in the database.
-This script fetches all subject lines and generates embeddings using OpenAI's text-embedding-ada-002 model.
+This script fetches all subject lines and generates embeddings with the active model from
+src/lib/embedding-model.json (see embedding_models.py), the same model the query routes use.
 """
 
 import os
@@ -12,6 +13,7 @@ import json
 from typing import List, Dict, Any
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from embedding_models import active_model
 
 # Load environment variables
 load_dotenv('.env.local')
@@ -29,6 +31,7 @@ class EmbeddingGenerator:
             sys.exit(1)
         
         self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.model = active_model()['name']
         self.batch_size = 100  # Process embeddings in batches
         self.delay_between_batches = 1  # Seconds to wait between batches to respect rate limits
     
@@ -41,7 +44,7 @@ class EmbeddingGenerator:
         
         data = {
             'input': text,
-            'model': 'text-embedding-ada-002'
+            'model': self.model
         }
         
         try:
@@ -95,7 +98,7 @@ class EmbeddingGenerator:
     
     async def generate_all_embeddings(self):
         """Generate embeddings for all subject lines in the database"""
-        print("🚀 Starting embedding generation...")
+        print(f"🚀 Starting embedding generation with {self.model}...")
         
         # First, check if embeddings already exist (with pagination)
         print("🔍 Checking existing embeddings...")
@@ -0,0 +1,151 @@
+-- Hybrid search with reciprocal-rank fusion
+-- find_hybrid_similar_subject_lines() evaluates its unnest(query_words) + ILIKE keyword
+-- subquery three times per row (SELECT, combined_score and WHERE) over the full
+-- embeddings join, so every call scans the table. This version takes two small top-k lists
+-- instead: a lexical one from a GIN-indexed tsvector column, and a vector one from the
+-- ivfflat index. It fuses them by rank, so only the union of the two lists is ever scored.
+
+-- Step 1: Stored token vector and its GIN index
+-- 'simple' config: lowercased words with no stemming or stop words, closest to the
+-- ILIKE word matching of the original function (prefix queries cover plurals).
+ALTER TABLE subject_lines ADD COLUMN IF NOT EXISTS subject_tsv TSVECTOR
+  GENERATED ALWAYS AS (to_tsvector('simple', coalesce(subject_line, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_subject_lines_subject_tsv ON subject_lines USING gin (subject_tsv);
+
+-- Lexical-only results look up their embedding by subject_line_id
+CREATE INDEX IF NOT EXISTS idx_subject_line_embeddings_subject_line_id
+ON subject_line_embeddings (subject_line_id);
+
+-- Step 2: Query terms
+-- Lowercased alphanumeric words of 2+ characters, the same filter /api/rag applies
+CREATE OR REPLACE FUNCTION hybrid_query_terms(query_text TEXT)
+RETURNS TEXT[] AS $$
+  SELECT COALESCE(array_agg(DISTINCT t), ARRAY[]::TEXT[])
+  FROM regexp_split_to_table(lower(coalesce(query_text, '')), '[^[:alnum:]]+') AS t
+  WHERE length(t) > 1;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Step 3: Fused search
+-- keyword_score is the fraction of query terms present (as a word prefix), computed once per
+-- lexical candidate. combined_score is the RRF score: sum of 1 / (rrf_k + rank) over the
+-- lists a row appears in. Ties go to the higher open rate, like the other search functions.
+CREATE OR REPLACE FUNCTION find_hybrid_similar_subject_lines_rrf(
+  query_text TEXT,
+  query_embedding VECTOR(1536),
+  max_results INTEGER DEFAULT 10,
+  candidate_k INTEGER DEFAULT 50,
+  rrf_k INTEGER DEFAULT 60
+)
+RETURNS TABLE (
+  subject_line_id INTEGER,
+  subject_line TEXT,
+  open_rate DECIMAL(5,4),
+  similarity_score FLOAT,
+  keyword_score FLOAT,
+  combined_score FLOAT,
+  lexical_rank INTEGER,
+  vector_rank INTEGER,
+  company TEXT,
+  sub_industry TEXT,
+  mailing_type TEXT,
+  read_rate DECIMAL(5,4),
+  inbox_rate DECIMAL(5,4),
+  date_sent DATE,
+  spam_rate DECIMAL(5,4)
+) AS $$
+DECLARE
+  terms TEXT[];
+  term_queries TSQUERY[];
+  any_term TSQUERY;
+BEGIN
+  terms := hybrid_query_terms(query_text);
+
+  IF array_length(terms, 1) IS NOT NULL THEN
+    SELECT array_agg(to_tsquery('simple', t || ':*'))
+    INTO term_queries
+    FROM unnest(terms) AS t;
+
+    any_term := to_tsquery('simple', array_to_string(
+      ARRAY(SELECT t || ':*' FROM unnest(terms) AS t), ' | '
+    ));
+  END IF;
+
+  RETURN QUERY
+  WITH lexical_matches AS (
+    -- Bitmap scan on idx_subject_lines_subject_tsv; the term count runs once per match
+    SELECT
+      sl.id,
+      sl.open_rate,
+      (
+        SELECT COUNT(*)::FLOAT
+        FROM unnest(term_queries) AS q
+        WHERE sl.subject_tsv @@ q
+      ) / array_length(terms, 1) AS kw_score
+    FROM subject_lines sl
+    WHERE any_term IS NOT NULL
+      AND sl.subject_tsv @@ any_term
+  ),
+  lexical AS (
+    SELECT
+      lm.id,
+      lm.kw_score,
+      ROW_NUMBER() OVER (ORDER BY lm.kw_score DESC, lm.open_rate DESC, lm.id)::INTEGER AS rnk
+    FROM lexical_matches lm
+    ORDER BY lm.kw_score DESC, lm.open_rate DESC, lm.id
+    LIMIT candidate_k
+  ),
+  nearest AS (
+    -- Index-ordered scan on idx_subject_line_embeddings_vector
+    SELECT
+      sle.subject_line_id AS id,
+      sle.embedding <=> query_embedding AS distance
+    FROM subject_line_embeddings sle
+    ORDER BY sle.embedding <=> query_embedding
+    LIMIT candidate_k
+  ),
+  semantic AS (
+    SELECT
+      n.id,
+      n.distance,
+      ROW_NUMBER() OVER (ORDER BY n.distance, n.id)::INTEGER AS rnk
+    FROM nearest n
+  ),
+  fused AS (
+    SELECT
+      COALESCE(l.id, v.id) AS id,
+      l.rnk AS l_rank,
+      v.rnk AS v_rank,
+      l.kw_score,
+      v.distance,
+      COALESCE(1.0 / (rrf_k + l.rnk), 0) + COALESCE(1.0 / (rrf_k + v.rnk), 0) AS rrf_score
+    FROM lexical l
+    FULL OUTER JOIN semantic v ON v.id = l.id
+  )
+  SELECT
+    sl.id,
+    sl.subject_line,
+    sl.open_rate,
+    -- Lexical-only rows are scored against their embedding here, at most candidate_k lookups
+    (1 - COALESCE(f.distance, (
+      SELECT MIN(sle.embedding <=> query_embedding)
+      FROM subject_line_embeddings sle
+      WHERE sle.subject_line_id = sl.id
+    )))::FLOAT,
+    COALESCE(f.kw_score, 0)::FLOAT,
+    f.rrf_score::FLOAT,
+    f.l_rank,
+    f.v_rank,
+    sl.company,
+    sl.sub_industry,
+    sl.mailing_type,
+    sl.read_rate,
+    sl.inbox_rate,
+    sl.date_sent,
+    sl.spam_rate
+  FROM fused f
+  JOIN subject_lines sl ON sl.id = f.id
+  ORDER BY f.rrf_score DESC, sl.open_rate DESC, sl.id
+  LIMIT max_results;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Reference implementation and benchmark for find_hybrid_similar_subject_lines_rrf().
+
+The SQL function fuses a lexical top-k list (GIN-indexed subject_tsv) and a vector top-k
+list (ivfflat) with reciprocal-rank fusion. This module mirrors that logic in Python:
+query_terms(), keyword_score() and rrf_fuse() match the SQL step for step. The benchmark
+replays sampled stored subject lines as queries, using their own stored embeddings so no
+OpenAI calls are made, and for each query it:
+  - times the original find_hybrid_similar_subject_lines() and the RRF function
+  - rebuilds the RRF result from the two component lists plus the Python fusion and
+    checks it against the function's output
+  - reports how much the two functions' top results overlap
+
+Usage:
+  python3 hybrid_search.py --deploy              # run hybrid-rrf-search-function.sql
+  python3 hybrid_search.py --benchmark 50        # 50 sampled queries
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+import logging
+from latency_stats import percentile
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+DEFAULT_RRF_K = 60
+DEFAULT_CANDIDATE_K = 50
+
+_TERM_RE = re.compile(r'[^\W_]+')
+
+
+def query_terms(query_text: str) -> List[str]:
+    """hybrid_query_terms(): distinct lowercased alphanumeric words of 2+ characters"""
+    return sorted({t for t in _TERM_RE.findall((query_text or '').lower()) if len(t) > 1})
+
+
+def keyword_score(subject_line: str, terms: Sequence[str]) -> float:
+    """Fraction of terms that prefix-match a word of subject_line (subject_tsv @@ 'term:*')"""
+    if not terms:
+        return 0.0
+    words = set(_TERM_RE.findall(subject_line.lower()))
+    return sum(1 for t in terms if any(w.startswith(t) for w in words)) / len(terms)
+
+
+def rrf_fuse(lexical_ids: Sequence[int], vector_ids: Sequence[int], open_rates: Dict[int, float],
+             rrf_k: int = DEFAULT_RRF_K, max_results: Optional[int] = None) -> List[Tuple[int, float]]:
+    """(id, score) by descending sum of 1 / (rrf_k + rank), ties by open rate then id"""
+    scores: Dict[int, float] = {}
+    for ranked in (lexical_ids, vector_ids):
+        for rank, row_id in enumerate(ranked, start=1):
+            scores[row_id] = scores.get(row_id, 0.0) + 1.0 / (rrf_k + rank)
+    fused = sorted(scores.items(), key=lambda item: (-item[1], -open_rates.get(item[0], 0.0), item[0]))
+    return fused[:max_results] if max_results else fused
+
+
+class HybridSearchBenchmark:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        # Imported here: search_service.py uses this module's fusion helpers without psycopg2
+        import psycopg2
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def deploy(self, sql_path: str = 'hybrid-rrf-search-function.sql'):
+        """Add subject_tsv, its index and the RRF function"""
+        with open(sql_path, 'r') as f:
+            sql_content = f.read()
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql_content)
+            self.connection.commit()
+            logger.info(f"Deployed find_hybrid_similar_subject_lines_rrf() from {sql_path}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to deploy hybrid RRF search: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def sample_queries(self, count: int) -> List[Tuple[str, str]]:
+        """(subject_line, embedding literal) pairs taken from stored rows"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT sl.subject_line, sle.embedding::text
+                FROM subject_line_embeddings sle
+                JOIN subject_lines sl ON sl.id = sle.subject_line_id
+                ORDER BY random()
+                LIMIT %s
+            """, (count,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _timed(self, cursor, sql: str, params: tuple) -> Tuple[list, float]:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        return rows, (time.perf_counter() - started) * 1000
+
+    def reference(self, cursor, query_text: str, embedding: str, candidate_k: int, rrf_k: int,
+                  max_results: int) -> List[int]:
+        """RRF result rebuilt from separately fetched lexical and vector lists"""
+        terms = query_terms(query_text)
+        lexical: List[Tuple[float, float, int]] = []
+        open_rates: Dict[int, float] = {}
+        if terms:
+            any_term = ' | '.join(t + ':*' for t in terms)
+            cursor.execute(
+                "SELECT id, subject_line, open_rate FROM subject_lines "
+                "WHERE subject_tsv @@ to_tsquery('simple', %s)",
+                (any_term,)
+            )
+            for row_id, line, open_rate in cursor.fetchall():
+                open_rates[row_id] = float(open_rate or 0)
+                lexical.append((-keyword_score(line, terms), -open_rates[row_id], row_id))
+        lexical_ids = [row_id for _, _, row_id in sorted(lexical)[:candidate_k]]
+
+        cursor.execute(
+            "SELECT sle.subject_line_id, sl.open_rate FROM subject_line_embeddings sle "
+            "JOIN subject_lines sl ON sl.id = sle.subject_line_id "
+            "ORDER BY sle.embedding <=> %s::vector LIMIT %s",
+            (embedding, candidate_k)
+        )
+        vector_ids = []
+        for row_id, open_rate in cursor.fetchall():
+            vector_ids.append(row_id)
+            open_rates[row_id] = float(open_rate or 0)
+
+        return [row_id for row_id, _ in rrf_fuse(lexical_ids, vector_ids, open_rates, rrf_k, max_results)]
+
+    def run(self, query_count: int, max_results: int = 10, candidate_k: int = DEFAULT_CANDIDATE_K,
+            rrf_k: int = DEFAULT_RRF_K):
+        queries = self.sample_queries(query_count)
+        if not queries:
+            logger.error("No stored embeddings to sample queries from")
+            return
+
+        legacy_ms, rrf_ms, overlaps = [], [], []
+        agree = 0
+        cursor = self.connection.cursor()
+        try:
+            for query_text, embedding in queries:
+                legacy, elapsed = self._timed(
+                    cursor,
+                    "SELECT subject_line_id FROM find_hybrid_similar_subject_lines(%s, %s::vector, 0.4, %s)",
+                    (query_text, embedding, max_results)
+                )
+                legacy_ms.append(elapsed)
+
+                fused, elapsed = self._timed(
+                    cursor,
+                    "SELECT subject_line_id FROM find_hybrid_similar_subject_lines_rrf(%s, %s::vector, %s, %s, %s)",
+                    (query_text, embedding, max_results, candidate_k, rrf_k)
+                )
+                rrf_ms.append(elapsed)
+
+                fused_ids = [r[0] for r in fused]
+                legacy_ids = {r[0] for r in legacy}
+                overlaps.append(len(legacy_ids & set(fused_ids)) / max(len(legacy_ids), 1))
+
+                if fused_ids == self.reference(cursor, query_text, embedding, candidate_k, rrf_k, max_results):
+                    agree += 1
+        finally:
+            self.connection.rollback()
+            cursor.close()
+
+        n = len(queries)
+        print(f"\n{n} sampled queries, top {max_results}, candidate_k={candidate_k}, rrf_k={rrf_k}")
+        print(f"{'function':<40} | {'p50':>8} | {'p95':>8} | {'max':>8}")
+        for name, values in (('find_hybrid_similar_subject_lines', legacy_ms),
+                             ('find_hybrid_similar_subject_lines_rrf', rrf_ms)):
+            print(f"{name:<40} | {percentile(values, 50):>6.1f}ms | {percentile(values, 95):>6.1f}ms | "
+                  f"{max(values):>6.1f}ms")
+        print(f"\nSpeedup (p50): {percentile(legacy_ms, 50) / max(percentile(rrf_ms, 50), 1e-6):.1f}x")
+        print(f"Python reference agrees with the SQL function on {agree}/{n} queries")
+        print(f"Mean overlap with the original function's results: {sum(overlaps) / n:.0%}")
+        if agree < n:
+            print("Disagreements usually come from Postgres' parser splitting tokens (URLs, hyphens)")
+            print("differently from query_terms(), or from approximate ivfflat ordering.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deploy and benchmark RRF hybrid search')
+    parser.add_argument('--deploy', action='store_true', help='Run hybrid-rrf-search-function.sql')
+    parser.add_argument('--benchmark', type=int, metavar='N', help='Replay N sampled subject lines')
+    parser.add_argument('--max-results', type=int, default=10)
+    parser.add_argument('--candidate-k', type=int, default=DEFAULT_CANDIDATE_K)
+    parser.add_argument('--rrf-k', type=int, default=DEFAULT_RRF_K)
+    args = parser.parse_args()
+
+    if not args.deploy and not args.benchmark:
+        parser.print_help()
+        sys.exit(1)
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    bench = HybridSearchBenchmark(db_config)
+    bench.connect()
+    try:
+        if args.deploy:
+            bench.deploy()
+        if args.benchmark:
+            bench.run(args.benchmark, args.max_results, args.candidate_k, args.rrf_k)
+    finally:
+        bench.disconnect()
+
+
+if __name__ == "__main__":
+    main()
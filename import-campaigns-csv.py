@@ -1,27 +1,39 @@
 #!/usr/bin/env python3
 """
 Script to import marketing campaigns CSV data into the database.
-This script handles large CSV files efficiently with batch processing.
+This script handles large CSV files efficiently with batch processing. Inputs may also be
+gzip/bzip2/xz/zstd-compressed CSVs or Parquet/Arrow files, read as a stream (csv_input.py).
 """
 
 import csv
 import os
 import sys
-from typing import Dict, Any, Optional
+import uuid
+from itertools import islice
+from typing import Dict, Optional
 import psycopg2
 from psycopg2.extras import execute_values
-import pandas as pd
-from datetime import datetime
 import logging
+from campaign_cleaning import CampaignRowCleaner, COLUMNS, COLUMN_INDEX, DATE_SAMPLE_ROWS, INPUT_COLUMNS
+from csv_input import open_table
+from date_parsing import peek
+from dimensions import DimensionTracker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+CAMPAIGN_ID = COLUMN_INDEX['campaign_id']
+OBSERVATION_DATE = COLUMN_INDEX['campaign_observation_date']
+COMPANY = COLUMN_INDEX['marketing_company']
+
 class CampaignImporter:
     def __init__(self, db_config: Dict[str, str]):
         self.db_config = db_config
         self.connection = None
+        self.run_id = str(uuid.uuid4())
+        self.affected = set()  # (observation date, marketing company) pairs for the rollup refresh
+        self.dimensions = DimensionTracker('marketing_campaigns')
         
     def connect(self):
         """Connect to the database"""
@@ -65,6 +77,11 @@ class CampaignImporter:
             email_read_rate VARCHAR(50),
             email_delete_rate VARCHAR(50),
             email_delete_without_read_rate VARCHAR(50),
+            email_inbox_rate_num NUMERIC(5,4),
+            email_spam_rate_num NUMERIC(5,4),
+            email_read_rate_num NUMERIC(5,4),
+            email_delete_rate_num NUMERIC(5,4),
+            email_delete_without_read_rate_num NUMERIC(5,4),
             subject_line TEXT,
             email_sender_domain VARCHAR(255),
             social_post_type VARCHAR(50),
@@ -91,7 +108,13 @@ class CampaignImporter:
             "CREATE INDEX IF NOT EXISTS idx_campaigns_industry ON marketing_campaigns(industry);",
             "CREATE INDEX IF NOT EXISTS idx_campaigns_observation_date ON marketing_campaigns(campaign_observation_date);",
             "CREATE INDEX IF NOT EXISTS idx_campaigns_estimated_spend ON marketing_campaigns(estimated_spend);",
-            "CREATE INDEX IF NOT EXISTS idx_campaigns_estimated_volume ON marketing_campaigns(estimated_volume);"
+            "CREATE INDEX IF NOT EXISTS idx_campaigns_estimated_volume ON marketing_campaigns(estimated_volume);",
+            # Numeric rate columns for tables created before campaign-rate-columns.sql
+            "ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS email_inbox_rate_num NUMERIC(5,4);",
+            "ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS email_spam_rate_num NUMERIC(5,4);",
+            "ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS email_read_rate_num NUMERIC(5,4);",
+            "ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS email_delete_rate_num NUMERIC(5,4);",
+            "ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS email_delete_without_read_rate_num NUMERIC(5,4);"
         ]
         
         try:
@@ -108,132 +131,47 @@ class CampaignImporter:
             logger.error(f"Failed to create table: {e}")
             raise
     
-    def clean_data(self, row: Dict[str, Any]) -> Dict[str, Any]:
-        """Clean and validate data from CSV row"""
-        cleaned = {}
-        
-        # Helper function to clean values
-        def clean_value(value, default=None):
-            if value is None or value == '' or value == 'None':
-                return default
-            return str(value).strip()
-        
-        # Helper function to parse boolean
-        def parse_boolean(value):
-            if value is None or value == '' or value == 'None':
-                return False
-            return str(value).lower() in ['true', '1', 'yes', 't']
-        
-        # Helper function to parse integer
-        def parse_int(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                return int(float(value))
-            except (ValueError, TypeError):
-                return None
-        
-        # Helper function to parse decimal
-        def parse_decimal(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return None
-        
-        # Helper function to parse date
-        def parse_date(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                # Try different date formats
-                for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
-                    try:
-                        return datetime.strptime(str(value), fmt).date()
-                    except ValueError:
-                        continue
-                return None
-            except (ValueError, TypeError):
-                return None
-        
-        # Map CSV columns to database columns
-        cleaned['campaign_id'] = clean_value(row.get('Campaign ID'))
-        cleaned['campaign_observation_date'] = parse_date(row.get('Campaign Observation Date'))
-        cleaned['media_channel'] = clean_value(row.get('Media Channel'))
-        cleaned['marketing_company'] = clean_value(row.get('Marketing Company'))
-        cleaned['industry'] = clean_value(row.get('Industry'))
-        cleaned['subindustry'] = clean_value(row.get('Subindustry'))
-        cleaned['product_type'] = clean_value(row.get('Product Type'))
-        cleaned['brand'] = clean_value(row.get('Brand'))
-        cleaned['product'] = clean_value(row.get('Product'))
-        cleaned['bundled_products'] = clean_value(row.get('Bundled Products'))
-        cleaned['properties'] = clean_value(row.get('Properties'))
-        cleaned['affiliated_company'] = clean_value(row.get('Affiliated Company'))
-        cleaned['post_link'] = clean_value(row.get('Post Link'))
-        cleaned['landing_page'] = clean_value(row.get('Landing Page'))
-        cleaned['campaign_observation_country'] = clean_value(row.get('Campaign Observation Country'))
-        cleaned['estimated_volume'] = parse_int(row.get('Estimated Volume'))
-        cleaned['estimated_spend'] = parse_decimal(row.get('Estimated Spend'))
-        cleaned['email_inbox_rate'] = clean_value(row.get('Email - Inbox Rate'))
-        cleaned['email_spam_rate'] = clean_value(row.get('Email - Spam Rate'))
-        cleaned['email_read_rate'] = clean_value(row.get('Email - Read Rate'))
-        cleaned['email_delete_rate'] = clean_value(row.get('Email - Delete Rate'))
-        cleaned['email_delete_without_read_rate'] = clean_value(row.get('Email - Delete Without Read Rate'))
-        cleaned['subject_line'] = clean_value(row.get('Subject Line'))
-        cleaned['email_sender_domain'] = clean_value(row.get('Email- Sender Domain'))
-        cleaned['social_post_type'] = clean_value(row.get('Social - Post Type'))
-        cleaned['social_engagement'] = clean_value(row.get('Social - Engagement'))
-        cleaned['digital_domain_ad_seen_on'] = clean_value(row.get('Digital - Domain Ad Seen On'))
-        cleaned['panelist_location'] = clean_value(row.get('Panelist Location'))
-        cleaned['metro_area'] = clean_value(row.get('Metro Area'))
-        cleaned['is_general_branding'] = parse_boolean(row.get('Is General Branding'))
-        cleaned['text_content'] = clean_value(row.get('Text Content'))
-        cleaned['day_part'] = clean_value(row.get('Day Part'))
-        cleaned['ad_duration_seconds'] = parse_int(row.get('Ad Duration (seconds)'))
-        cleaned['channel'] = clean_value(row.get('Channel'))
-        cleaned['program'] = clean_value(row.get('Program'))
-        
-        # Generate thumbnail URL based on marketing company
-        company = cleaned.get('marketing_company', 'Unknown')
-        if company and company != 'None':
-            # Create a placeholder thumbnail URL
-            cleaned['thumbnail_url'] = f"https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={company.replace(' ', '+')}"
-        else:
-            cleaned['thumbnail_url'] = "https://via.placeholder.com/150x100/6B7280/FFFFFF?text=Unknown"
-        
-        return cleaned
-    
-    def import_csv_pandas(self, csv_file_path: str, batch_size: int = 1000):
-        """Import CSV using pandas for better performance with large files"""
-        logger.info(f"Starting import of {csv_file_path}")
+    def import_file(self, file_path: str, batch_size: int = 1000):
+        """Import a CSV (plain, .gz, .bz2, .xz or .zst), Parquet or Arrow file in chunks"""
+        logger.info(f"Starting import of {file_path}")
         
         try:
-            # Read CSV in chunks
             chunk_count = 0
             total_rows = 0
             
-            for chunk in pd.read_csv(csv_file_path, chunksize=batch_size, low_memory=False):
-                chunk_count += 1
-                logger.info(f"Processing chunk {chunk_count} with {len(chunk)} rows")
+            # Streams the file; Parquet and Arrow read only the columns the cleaner uses
+            with open_table(file_path, columns=INPUT_COLUMNS) as table:
+                logger.info(table.describe())
+                cleaner = CampaignRowCleaner(table.header)
+                if cleaner.missing_headers:
+                    logger.warning(f"Input has no {', '.join(cleaner.missing_headers)} column(s)")
+                sample, rows = peek(table, DATE_SAMPLE_ROWS)
+                cleaner.detect_dates(sample)
+                logger.info(cleaner.dates.describe())
+                cleaner.detect_rates(sample)
+                logger.info(cleaner.describe_rates())
                 
-                # Clean the data
-                cleaned_data = []
-                for _, row in chunk.iterrows():
-                    cleaned_row = self.clean_data(row.to_dict())
-                    # Only add rows with required fields
-                    if (cleaned_row.get('campaign_id') and 
-                        cleaned_row.get('campaign_observation_date') and 
-                        cleaned_row.get('media_channel') and 
-                        cleaned_row.get('marketing_company') and 
-                        cleaned_row.get('industry')):
-                        cleaned_data.append(cleaned_row)
+                while True:
+                    chunk = list(islice(rows, batch_size))
+                    if not chunk:
+                        break
+                    chunk_count += 1
+                    logger.info(f"Processing chunk {chunk_count} with {len(chunk)} rows")
+                    
+                    # Clean the data; rows missing a required field come back as None
+                    cleaned_data = []
+                    for row in chunk:
+                        cleaned_row = cleaner.clean(row)
+                        if cleaned_row is not None:
+                            cleaned_data.append(cleaned_row)
+                    
+                    if cleaned_data:
+                        self.insert_batch(cleaned_data)
+                        total_rows += len(cleaned_data)
+                        logger.info(f"Inserted {len(cleaned_data)} rows from chunk {chunk_count}")
                 
-                if cleaned_data:
-                    self.insert_batch(cleaned_data)
-                    total_rows += len(cleaned_data)
-                    logger.info(f"Inserted {len(cleaned_data)} rows from chunk {chunk_count}")
-            
+                logger.info(table.describe())
+                logger.info(cleaner.dates.describe())
             logger.info(f"Import completed. Total rows processed: {total_rows}")
             
         except Exception as e:
@@ -241,32 +179,15 @@ class CampaignImporter:
             raise
     
     def insert_batch(self, data: list):
-        """Insert a batch of records using execute_values for better performance"""
+        """Insert a batch of cleaned tuples (campaign_cleaning.COLUMNS order) with execute_values"""
         if not data:
             return
         
         cursor = self.connection.cursor()
         
-        # Prepare the data for insertion
-        columns = [
-            'campaign_id', 'campaign_observation_date', 'media_channel', 'marketing_company',
-            'industry', 'subindustry', 'product_type', 'brand', 'product', 'bundled_products',
-            'properties', 'affiliated_company', 'post_link', 'landing_page', 'campaign_observation_country',
-            'estimated_volume', 'estimated_spend', 'email_inbox_rate', 'email_spam_rate',
-            'email_read_rate', 'email_delete_rate', 'email_delete_without_read_rate',
-            'subject_line', 'email_sender_domain', 'social_post_type', 'social_engagement',
-            'digital_domain_ad_seen_on', 'panelist_location', 'metro_area', 'is_general_branding',
-            'text_content', 'day_part', 'ad_duration_seconds', 'channel', 'program', 'thumbnail_url'
-        ]
-        
-        values = []
-        for row in data:
-            value_tuple = tuple(row.get(col) for col in columns)
-            values.append(value_tuple)
-        
         # Use ON CONFLICT to handle duplicates
         insert_sql = f"""
-        INSERT INTO marketing_campaigns ({', '.join(columns)})
+        INSERT INTO marketing_campaigns ({', '.join(COLUMNS)})
         VALUES %s
         ON CONFLICT (campaign_id) DO UPDATE SET
             campaign_observation_date = EXCLUDED.campaign_observation_date,
@@ -279,11 +200,23 @@ class CampaignImporter:
         """
         
         try:
+            # Upserts can move a campaign to another date/company, so the old bucket is affected too
+            cursor.execute(
+                "SELECT campaign_observation_date, marketing_company FROM marketing_campaigns WHERE campaign_id = ANY(%s)",
+                ([row[CAMPAIGN_ID] for row in data],)
+            )
+            previous = cursor.fetchall()
+            
             execute_values(
-                cursor, insert_sql, values, 
+                cursor, insert_sql, data, 
                 template=None, page_size=1000
             )
             self.connection.commit()
+            
+            # Stored rows may predate the NOT NULL company; watermarks record unknown as ''
+            self.affected.update((obs_date, company or '') for obs_date, company in previous)
+            self.affected.update((row[OBSERVATION_DATE], row[COMPANY]) for row in data)
+            self.dimensions.add(data, COLUMNS)
         except Exception as e:
             self.connection.rollback()
             logger.error(f"Error inserting batch: {e}")
@@ -291,6 +224,53 @@ class CampaignImporter:
         finally:
             cursor.close()
 
+    def record_watermarks(self):
+        """Record the (date, company) pairs touched by this run for refresh-rollups.py"""
+        if not self.affected:
+            return
+        
+        cursor = self.connection.cursor()
+        values = [
+            (self.run_id, 'import-campaigns-csv.py', 'marketing_campaigns', obs_date, company)
+            for obs_date, company in sorted(self.affected)
+        ]
+        
+        try:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO import_watermarks (run_id, source, target_table, affected_date, company)
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                """,
+                values,
+                page_size=1000
+            )
+            self.connection.commit()
+            logger.info(f"Recorded {len(values)} rollup watermarks for run {self.run_id}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.warning(f"Could not record rollup watermarks: {e}")
+        finally:
+            cursor.close()
+
+    def record_dimensions(self):
+        """Add this run's companies, industries and media channels to the filter lists"""
+        if not self.dimensions:
+            return
+        
+        cursor = self.connection.cursor()
+        try:
+            changed = self.dimensions.flush(cursor)
+            self.connection.commit()
+            logger.info(f"Updated filter dimensions ({changed} new values)")
+        except Exception as e:
+            self.connection.rollback()
+            logger.warning(f"Could not update filter dimensions: {e}")
+            logger.warning("Run 'python3 refresh-dimensions.py --rebuild' to resync them")
+        finally:
+            cursor.close()
+
 def main():
     """Main function to run the import"""
     # Database configuration - update these values
@@ -303,7 +283,7 @@ def main():
     }
     
     # CSV file path
-    csv_file_path = input("Enter the path to your CSV file: ").strip()
+    csv_file_path = input("Enter the path to your CSV, .csv.gz, .csv.zst or Parquet file: ").strip()
     
     if not os.path.exists(csv_file_path):
         logger.error(f"CSV file not found: {csv_file_path}")
@@ -323,7 +303,7 @@ def main():
         importer.create_table_if_not_exists()
         
         # Import CSV
-        importer.import_csv_pandas(csv_file_path, batch_size)
+        importer.import_file(csv_file_path, batch_size)
         
         logger.info("Import completed successfully!")
         
@@ -331,6 +311,10 @@ def main():
         logger.error(f"Import failed: {e}")
         sys.exit(1)
     finally:
+        # Batches committed before a failure still need their rollups refreshed
+        if importer.connection:
+            importer.record_watermarks()
+            importer.record_dimensions()
         importer.disconnect()
 
 if __name__ == "__main__":
@@ -4,56 +4,20 @@ Simple CSV import script for marketing campaigns.
 This is a more straightforward approach for smaller datasets.
 """
 
-import csv
 import os
 import sys
+import uuid
 import psycopg2
 from psycopg2.extras import execute_values
-from datetime import datetime
+from dimensions import DimensionTracker
+from campaign_rates import RATE_COLUMNS
+from campaign_cleaning import CampaignRowCleaner, COLUMNS, COLUMN_INDEX, DATE_SAMPLE_ROWS, INPUT_COLUMNS
+from csv_input import open_table
+from date_parsing import peek
 
-def clean_value(value, default=None):
-    """Clean and validate CSV values"""
-    if value is None or value == '' or value == 'None':
-        return default
-    return str(value).strip()
-
-def parse_int(value):
-    """Parse integer values"""
-    if value is None or value == '' or value == 'None':
-        return None
-    try:
-        return int(float(value))
-    except (ValueError, TypeError):
-        return None
-
-def parse_decimal(value):
-    """Parse decimal values"""
-    if value is None or value == '' or value == 'None':
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
-
-def parse_date(value):
-    """Parse date values"""
-    if value is None or value == '' or value == 'None':
-        return None
-    try:
-        for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
-            try:
-                return datetime.strptime(str(value), fmt).date()
-            except ValueError:
-                continue
-        return None
-    except (ValueError, TypeError):
-        return None
-
-def parse_boolean(value):
-    """Parse boolean values"""
-    if value is None or value == '' or value == 'None':
-        return False
-    return str(value).lower() in ['true', '1', 'yes', 't']
+CAMPAIGN_ID = COLUMN_INDEX['campaign_id']
+OBSERVATION_DATE = COLUMN_INDEX['campaign_observation_date']
+COMPANY = COLUMN_INDEX['marketing_company']
 
 def main():
     # Database connection - update these values
@@ -93,6 +57,11 @@ def main():
         email_read_rate VARCHAR(50),
         email_delete_rate VARCHAR(50),
         email_delete_without_read_rate VARCHAR(50),
+        email_inbox_rate_num NUMERIC(5,4),
+        email_spam_rate_num NUMERIC(5,4),
+        email_read_rate_num NUMERIC(5,4),
+        email_delete_rate_num NUMERIC(5,4),
+        email_delete_without_read_rate_num NUMERIC(5,4),
         subject_line TEXT,
         email_sender_domain VARCHAR(255),
         social_post_type VARCHAR(50),
@@ -113,6 +82,9 @@ def main():
     """
     
     cursor.execute(create_table_sql)
+    # Numeric rate columns for tables created before campaign-rate-columns.sql
+    for num_column in RATE_COLUMNS.values():
+        cursor.execute(f"ALTER TABLE marketing_campaigns ADD COLUMN IF NOT EXISTS {num_column} NUMERIC(5,4)")
     conn.commit()
     print("Table created successfully")
     
@@ -127,100 +99,87 @@ def main():
     batch_size = 1000
     batch_data = []
     total_rows = 0
+    affected = set()  # (observation date, marketing company) pairs for the rollup refresh
+    dimensions = DimensionTracker('marketing_campaigns')
     
     print(f"Starting import of {csv_file_path}")
     
-    with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    with open_table(csv_file_path, columns=INPUT_COLUMNS) as table:
+        print(table.describe())
+        cleaner = CampaignRowCleaner(table.header)
+        sample, rows = peek(table, DATE_SAMPLE_ROWS)
+        cleaner.detect_dates(sample)
+        print(cleaner.dates.describe())
+        cleaner.detect_rates(sample)
+        print(cleaner.describe_rates())
         
-        for row in reader:
-            # Clean and prepare data
-            cleaned_row = {
-                'campaign_id': clean_value(row.get('Campaign ID')),
-                'campaign_observation_date': parse_date(row.get('Campaign Observation Date')),
-                'media_channel': clean_value(row.get('Media Channel')),
-                'marketing_company': clean_value(row.get('Marketing Company')),
-                'industry': clean_value(row.get('Industry')),
-                'subindustry': clean_value(row.get('Subindustry')),
-                'product_type': clean_value(row.get('Product Type')),
-                'brand': clean_value(row.get('Brand')),
-                'product': clean_value(row.get('Product')),
-                'bundled_products': clean_value(row.get('Bundled Products')),
-                'properties': clean_value(row.get('Properties')),
-                'affiliated_company': clean_value(row.get('Affiliated Company')),
-                'post_link': clean_value(row.get('Post Link')),
-                'landing_page': clean_value(row.get('Landing Page')),
-                'campaign_observation_country': clean_value(row.get('Campaign Observation Country')),
-                'estimated_volume': parse_int(row.get('Estimated Volume')),
-                'estimated_spend': parse_decimal(row.get('Estimated Spend')),
-                'email_inbox_rate': clean_value(row.get('Email - Inbox Rate')),
-                'email_spam_rate': clean_value(row.get('Email - Spam Rate')),
-                'email_read_rate': clean_value(row.get('Email - Read Rate')),
-                'email_delete_rate': clean_value(row.get('Email - Delete Rate')),
-                'email_delete_without_read_rate': clean_value(row.get('Email - Delete Without Read Rate')),
-                'subject_line': clean_value(row.get('Subject Line')),
-                'email_sender_domain': clean_value(row.get('Email- Sender Domain')),
-                'social_post_type': clean_value(row.get('Social - Post Type')),
-                'social_engagement': clean_value(row.get('Social - Engagement')),
-                'digital_domain_ad_seen_on': clean_value(row.get('Digital - Domain Ad Seen On')),
-                'panelist_location': clean_value(row.get('Panelist Location')),
-                'metro_area': clean_value(row.get('Metro Area')),
-                'is_general_branding': parse_boolean(row.get('Is General Branding')),
-                'text_content': clean_value(row.get('Text Content')),
-                'day_part': clean_value(row.get('Day Part')),
-                'ad_duration_seconds': parse_int(row.get('Ad Duration (seconds)')),
-                'channel': clean_value(row.get('Channel')),
-                'program': clean_value(row.get('Program')),
-                'thumbnail_url': f"https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={clean_value(row.get('Marketing Company'), 'Unknown').replace(' ', '+')}"
-            }
-            
-            # Only add rows with required fields
-            if (cleaned_row['campaign_id'] and 
-                cleaned_row['campaign_observation_date'] and 
-                cleaned_row['media_channel'] and 
-                cleaned_row['marketing_company'] and 
-                cleaned_row['industry']):
-                
+        for row in rows:
+            # Clean and prepare data; rows missing a required field come back as None
+            cleaned_row = cleaner.clean(row)
+            if cleaned_row is not None:
                 batch_data.append(cleaned_row)
                 
                 # Insert batch when it reaches batch_size
                 if len(batch_data) >= batch_size:
-                    insert_batch(cursor, batch_data)
+                    insert_batch(cursor, batch_data, affected)
+                    dimensions.add(batch_data, COLUMNS)
                     total_rows += len(batch_data)
                     print(f"Inserted {total_rows} rows so far...")
                     batch_data = []
     
     # Insert remaining data
     if batch_data:
-        insert_batch(cursor, batch_data)
+        insert_batch(cursor, batch_data, affected)
+        dimensions.add(batch_data, COLUMNS)
         total_rows += len(batch_data)
     
+    record_watermarks(cursor, affected)
+    try:
+        changed = dimensions.flush(cursor)
+        print(f"Updated filter dimensions ({changed} new values)")
+    except Exception as e:
+        print(f"Warning: Could not update filter dimensions: {e}")
+        print("Run 'python3 refresh-dimensions.py --rebuild' to resync them")
     conn.commit()
+    print(cleaner.dates.describe())
     print(f"Import completed successfully! Total rows: {total_rows}")
     
     cursor.close()
     conn.close()
 
-def insert_batch(cursor, data):
-    """Insert a batch of records"""
-    columns = [
-        'campaign_id', 'campaign_observation_date', 'media_channel', 'marketing_company',
-        'industry', 'subindustry', 'product_type', 'brand', 'product', 'bundled_products',
-        'properties', 'affiliated_company', 'post_link', 'landing_page', 'campaign_observation_country',
-        'estimated_volume', 'estimated_spend', 'email_inbox_rate', 'email_spam_rate',
-        'email_read_rate', 'email_delete_rate', 'email_delete_without_read_rate',
-        'subject_line', 'email_sender_domain', 'social_post_type', 'social_engagement',
-        'digital_domain_ad_seen_on', 'panelist_location', 'metro_area', 'is_general_branding',
-        'text_content', 'day_part', 'ad_duration_seconds', 'channel', 'program', 'thumbnail_url'
+def record_watermarks(cursor, affected):
+    """Record the (date, company) pairs touched by this run for refresh-rollups.py"""
+    run_id = str(uuid.uuid4())
+    values = [
+        (run_id, 'import-campaigns-simple.py', 'marketing_campaigns', obs_date, company)
+        for obs_date, company in sorted(affected)
     ]
     
-    values = []
-    for row in data:
-        value_tuple = tuple(row.get(col) for col in columns)
-        values.append(value_tuple)
-    
+    # The import commits once at the end, so a failure here (e.g. rollup-tables.sql not
+    # installed) must not abort its transaction
+    cursor.execute("SAVEPOINT record_watermarks")
+    try:
+        execute_values(
+            cursor,
+            """
+            INSERT INTO import_watermarks (run_id, source, target_table, affected_date, company)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            """,
+            values,
+            page_size=1000
+        )
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT record_watermarks")
+        print(f"Warning: Could not record rollup watermarks: {e}")
+        return
+    cursor.execute("RELEASE SAVEPOINT record_watermarks")
+    print(f"Recorded {len(values)} rollup watermarks for run {run_id}")
+
+def insert_batch(cursor, data, affected):
+    """Insert a batch of cleaned tuples (campaign_cleaning.COLUMNS order)"""
     insert_sql = f"""
-    INSERT INTO marketing_campaigns ({', '.join(columns)})
+    INSERT INTO marketing_campaigns ({', '.join(COLUMNS)})
     VALUES %s
     ON CONFLICT (campaign_id) DO UPDATE SET
         campaign_observation_date = EXCLUDED.campaign_observation_date,
@@ -232,7 +191,16 @@ def insert_batch(cursor, data):
         updated_at = CURRENT_TIMESTAMP
     """
     
-    execute_values(cursor, insert_sql, values, template=None, page_size=1000)
+    # Upserts can move a campaign to another date/company, so the old bucket is affected too
+    cursor.execute(
+        "SELECT campaign_observation_date, marketing_company FROM marketing_campaigns WHERE campaign_id = ANY(%s)",
+        ([row[CAMPAIGN_ID] for row in data],)
+    )
+    # Stored rows may predate the NOT NULL company; watermarks record unknown as ''
+    affected.update((obs_date, company or '') for obs_date, company in cursor.fetchall())
+    affected.update((row[OBSERVATION_DATE], row[COMPANY]) for row in data)
+    
+    execute_values(cursor, insert_sql, data, template=None, page_size=1000)
 
 if __name__ == "__main__":
     main()
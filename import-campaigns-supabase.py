@@ -6,10 +6,13 @@ Uses Supabase client to create table and import data.
 
 import os
 import sys
-import csv
+import uuid
 import pandas as pd
-from datetime import datetime
 from supabase import create_client, Client
+from dimensions import DimensionTracker
+from campaign_cleaning import CampaignRowCleaner, DATE_SAMPLE_ROWS, INPUT_COLUMNS
+from csv_input import open_table
+from date_parsing import peek
 from dotenv import load_dotenv
 import logging
 
@@ -30,6 +33,9 @@ class SupabaseCampaignImporter:
             sys.exit(1)
         
         self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.run_id = str(uuid.uuid4())
+        self.affected = set()  # (observation date, marketing company) pairs for the rollup refresh
+        self.dimensions = DimensionTracker('marketing_campaigns')
         logger.info("Connected to Supabase successfully")
     
     def create_table(self):
@@ -59,6 +65,11 @@ class SupabaseCampaignImporter:
             email_read_rate VARCHAR(50),
             email_delete_rate VARCHAR(50),
             email_delete_without_read_rate VARCHAR(50),
+            email_inbox_rate_num NUMERIC(5,4),
+            email_spam_rate_num NUMERIC(5,4),
+            email_read_rate_num NUMERIC(5,4),
+            email_delete_rate_num NUMERIC(5,4),
+            email_delete_without_read_rate_num NUMERIC(5,4),
             subject_line TEXT,
             email_sender_domain VARCHAR(255),
             social_post_type VARCHAR(50),
@@ -109,95 +120,6 @@ class SupabaseCampaignImporter:
                 logger.error(f"Alternative method also failed: {e2}")
                 raise
     
-    def clean_data(self, row):
-        """Clean and validate data from CSV row"""
-        def clean_value(value, default=None):
-            if value is None or value == '' or value == 'None':
-                return default
-            return str(value).strip()
-        
-        def parse_int(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                return int(float(value))
-            except (ValueError, TypeError):
-                return None
-        
-        def parse_decimal(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return None
-        
-        def parse_date(value):
-            if value is None or value == '' or value == 'None':
-                return None
-            try:
-                for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
-                    try:
-                        return datetime.strptime(str(value), fmt).strftime('%Y-%m-%d')
-                    except ValueError:
-                        continue
-                return None
-            except (ValueError, TypeError):
-                return None
-        
-        def parse_boolean(value):
-            if value is None or value == '' or value == 'None':
-                return False
-            return str(value).lower() in ['true', '1', 'yes', 't']
-        
-        # Clean the data
-        cleaned = {
-            'campaign_id': clean_value(row.get('Campaign ID')),
-            'campaign_observation_date': parse_date(row.get('Campaign Observation Date')),
-            'media_channel': clean_value(row.get('Media Channel')),
-            'marketing_company': clean_value(row.get('Marketing Company')),
-            'industry': clean_value(row.get('Industry')),
-            'subindustry': clean_value(row.get('Subindustry')),
-            'product_type': clean_value(row.get('Product Type')),
-            'brand': clean_value(row.get('Brand')),
-            'product': clean_value(row.get('Product')),
-            'bundled_products': clean_value(row.get('Bundled Products')),
-            'properties': clean_value(row.get('Properties')),
-            'affiliated_company': clean_value(row.get('Affiliated Company')),
-            'post_link': clean_value(row.get('Post Link')),
-            'landing_page': clean_value(row.get('Landing Page')),
-            'campaign_observation_country': clean_value(row.get('Campaign Observation Country')),
-            'estimated_volume': parse_int(row.get('Estimated Volume')),
-            'estimated_spend': parse_decimal(row.get('Estimated Spend')),
-            'email_inbox_rate': clean_value(row.get('Email - Inbox Rate')),
-            'email_spam_rate': clean_value(row.get('Email - Spam Rate')),
-            'email_read_rate': clean_value(row.get('Email - Read Rate')),
-            'email_delete_rate': clean_value(row.get('Email - Delete Rate')),
-            'email_delete_without_read_rate': clean_value(row.get('Email - Delete Without Read Rate')),
-            'subject_line': clean_value(row.get('Subject Line')),
-            'email_sender_domain': clean_value(row.get('Email- Sender Domain')),
-            'social_post_type': clean_value(row.get('Social - Post Type')),
-            'social_engagement': clean_value(row.get('Social - Engagement')),
-            'digital_domain_ad_seen_on': clean_value(row.get('Digital - Domain Ad Seen On')),
-            'panelist_location': clean_value(row.get('Panelist Location')),
-            'metro_area': clean_value(row.get('Metro Area')),
-            'is_general_branding': parse_boolean(row.get('Is General Branding')),
-            'text_content': clean_value(row.get('Text Content')),
-            'day_part': clean_value(row.get('Day Part')),
-            'ad_duration_seconds': parse_int(row.get('Ad Duration (seconds)')),
-            'channel': clean_value(row.get('Channel')),
-            'program': clean_value(row.get('Program')),
-        }
-        
-        # Generate thumbnail URL
-        company = cleaned.get('marketing_company', 'Unknown')
-        if company and company != 'None':
-            cleaned['thumbnail_url'] = f"https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={company.replace(' ', '+')}"
-        else:
-            cleaned['thumbnail_url'] = "https://via.placeholder.com/150x100/6B7280/FFFFFF?text=Unknown"
-        
-        return cleaned
-    
     def import_csv(self, csv_file_path, batch_size=1000):
         """Import CSV data in batches"""
         logger.info(f"Starting import of {csv_file_path}")
@@ -206,20 +128,20 @@ class SupabaseCampaignImporter:
             total_rows = 0
             batch_data = []
             
-            with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
+            with open_table(csv_file_path, columns=INPUT_COLUMNS) as table:
+                logger.info(table.describe())
+                cleaner = CampaignRowCleaner(table.header, iso_dates=True)
+                sample, rows = peek(table, DATE_SAMPLE_ROWS)
+                cleaner.detect_dates(sample)
+                logger.info(cleaner.dates.describe())
+                cleaner.detect_rates(sample)
+                logger.info(cleaner.describe_rates())
                 
-                for row in reader:
-                    cleaned_row = self.clean_data(row)
-                    
-                    # Only add rows with required fields
-                    if (cleaned_row.get('campaign_id') and 
-                        cleaned_row.get('campaign_observation_date') and 
-                        cleaned_row.get('media_channel') and 
-                        cleaned_row.get('marketing_company') and 
-                        cleaned_row.get('industry')):
-                        
-                        batch_data.append(cleaned_row)
+                for row in rows:
+                    # Rows missing a required field come back as None
+                    cleaned_row = cleaner.clean(row)
+                    if cleaned_row is not None:
+                        batch_data.append(cleaner.as_dict(cleaned_row))
                         
                         # Insert batch when it reaches batch_size
                         if len(batch_data) >= batch_size:
@@ -233,6 +155,7 @@ class SupabaseCampaignImporter:
                 self.insert_batch(batch_data)
                 total_rows += len(batch_data)
             
+            logger.info(cleaner.dates.describe())
             logger.info(f"Import completed successfully! Total rows: {total_rows}")
             
         except Exception as e:
@@ -251,15 +174,54 @@ class SupabaseCampaignImporter:
             if hasattr(result, 'data'):
                 logger.debug(f"Inserted {len(result.data)} records")
             
+            self.affected.update(
+                (record['campaign_observation_date'], record['marketing_company']) for record in data
+            )
+            self.dimensions.add(data)
+            
         except Exception as e:
             logger.error(f"Error inserting batch: {e}")
             # Try individual inserts as fallback
             for record in data:
                 try:
                     self.supabase.table('marketing_campaigns').upsert(record).execute()
+                    self.affected.add((record['campaign_observation_date'], record['marketing_company']))
+                    self.dimensions.add([record])
                 except Exception as e2:
                     logger.warning(f"Failed to insert record {record.get('campaign_id')}: {e2}")
 
+    def record_watermarks(self):
+        """Record the (date, company) pairs touched by this run for refresh-rollups.py"""
+        rows = [
+            {
+                'run_id': self.run_id,
+                'source': 'import-campaigns-supabase.py',
+                'target_table': 'marketing_campaigns',
+                'affected_date': obs_date,
+                'company': company
+            }
+            for obs_date, company in sorted(self.affected)
+        ]
+        
+        try:
+            for i in range(0, len(rows), 1000):
+                self.supabase.table('import_watermarks').upsert(
+                    rows[i:i + 1000],
+                    on_conflict='run_id,target_table,affected_date,company'
+                ).execute()
+            logger.info(f"Recorded {len(rows)} rollup watermarks for run {self.run_id}")
+        except Exception as e:
+            logger.warning(f"Could not record rollup watermarks: {e}")
+
+    def record_dimensions(self):
+        """Add the companies, industries and media channels seen by this run to the filter lists"""
+        try:
+            changed = self.dimensions.flush_supabase(self.supabase)
+            logger.info(f"Updated filter dimensions ({changed} new values)")
+        except Exception as e:
+            logger.warning(f"Could not update filter dimensions: {e}")
+            logger.warning("Run 'python3 refresh-dimensions.py --rebuild' to resync them")
+
 def main():
     """Main function to run the import"""
     # Get CSV file path
@@ -289,6 +251,12 @@ def main():
     except Exception as e:
         logger.error(f"Import failed: {e}")
         sys.exit(1)
+    finally:
+        # Batches upserted before a failure still need their rollups refreshed
+        if importer.affected:
+            importer.record_watermarks()
+        if importer.dimensions:
+            importer.record_dimensions()
 
 if __name__ == "__main__":
     main()
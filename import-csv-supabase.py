@@ -2,13 +2,17 @@
 """
 Import CSV data into Supabase marketing_campaigns table.
 Usage: python3 import-csv-supabase.py /path/to/your/file.csv
+The file may also be .csv.gz/.bz2/.xz/.zst, Parquet or Arrow (csv_input.py).
 """
 
 import os
 import sys
-import csv
-from datetime import datetime
+import uuid
 from supabase import create_client, Client
+from campaign_cleaning import CampaignRowCleaner, DATE_SAMPLE_ROWS, INPUT_COLUMNS
+from csv_input import open_table
+from date_parsing import peek
+from dimensions import DimensionTracker
 from dotenv import load_dotenv
 import logging
 
@@ -19,94 +23,26 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv('.env.local')
 
-def clean_data(row):
-    """Clean and validate data from CSV row"""
-    def clean_value(value, default=None):
-        if value is None or value == '' or value == 'None':
-            return default
-        return str(value).strip()
+def record_watermarks(supabase, run_id, source, affected):
+    """Record the (date, company) pairs touched by this run for refresh-rollups.py"""
+    rows = [
+        {
+            'run_id': run_id,
+            'source': source,
+            'target_table': 'marketing_campaigns',
+            'affected_date': obs_date,
+            'company': company
+        }
+        for obs_date, company in sorted(affected)
+    ]
     
-    def parse_int(value):
-        if value is None or value == '' or value == 'None':
-            return None
-        try:
-            return int(float(value))
-        except (ValueError, TypeError):
-            return None
+    for i in range(0, len(rows), 1000):
+        supabase.table('import_watermarks').upsert(
+            rows[i:i + 1000],
+            on_conflict='run_id,target_table,affected_date,company'
+        ).execute()
     
-    def parse_decimal(value):
-        if value is None or value == '' or value == 'None':
-            return None
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return None
-    
-    def parse_date(value):
-        if value is None or value == '' or value == 'None':
-            return None
-        try:
-            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
-                try:
-                    return datetime.strptime(str(value), fmt).strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-            return None
-        except (ValueError, TypeError):
-            return None
-    
-    def parse_boolean(value):
-        if value is None or value == '' or value == 'None':
-            return False
-        return str(value).lower() in ['true', '1', 'yes', 't']
-    
-    # Clean the data
-    cleaned = {
-        'campaign_id': clean_value(row.get('Campaign ID')),
-        'campaign_observation_date': parse_date(row.get('Campaign Observation Date')),
-        'media_channel': clean_value(row.get('Media Channel')),
-        'marketing_company': clean_value(row.get('Marketing Company')),
-        'industry': clean_value(row.get('Industry')),
-        'subindustry': clean_value(row.get('Subindustry')),
-        'product_type': clean_value(row.get('Product Type')),
-        'brand': clean_value(row.get('Brand')),
-        'product': clean_value(row.get('Product')),
-        'bundled_products': clean_value(row.get('Bundled Products')),
-        'properties': clean_value(row.get('Properties')),
-        'affiliated_company': clean_value(row.get('Affiliated Company')),
-        'post_link': clean_value(row.get('Post Link')),
-        'landing_page': clean_value(row.get('Landing Page')),
-        'campaign_observation_country': clean_value(row.get('Campaign Observation Country')),
-        'estimated_volume': parse_int(row.get('Estimated Volume')),
-        'estimated_spend': parse_decimal(row.get('Estimated Spend')),
-        'email_inbox_rate': clean_value(row.get('Email - Inbox Rate')),
-        'email_spam_rate': clean_value(row.get('Email - Spam Rate')),
-        'email_read_rate': clean_value(row.get('Email - Read Rate')),
-        'email_delete_rate': clean_value(row.get('Email - Delete Rate')),
-        'email_delete_without_read_rate': clean_value(row.get('Email - Delete Without Read Rate')),
-        'subject_line': clean_value(row.get('Subject Line')),
-        'email_sender_domain': clean_value(row.get('Email- Sender Domain')),
-        'social_post_type': clean_value(row.get('Social - Post Type')),
-        'social_engagement': clean_value(row.get('Social - Engagement')),
-        'digital_domain_ad_seen_on': clean_value(row.get('Digital - Domain Ad Seen On')),
-        'panelist_location': clean_value(row.get('Panelist Location')),
-        'metro_area': clean_value(row.get('Metro Area')),
-        'is_general_branding': parse_boolean(row.get('Is General Branding')),
-        'text_content': clean_value(row.get('Text Content')),
-        'day_part': clean_value(row.get('Day Part')),
-        'ad_duration_seconds': parse_int(row.get('Ad Duration (seconds)')),
-        'channel': clean_value(row.get('Channel')),
-        'program': clean_value(row.get('Program')),
-    }
-    
-    # Generate thumbnail URL
-    company = cleaned.get('marketing_company', 'Unknown')
-    if company and company != 'None':
-        cleaned['thumbnail_url'] = f"https://via.placeholder.com/150x100/4F46E5/FFFFFF?text={company.replace(' ', '+')}"
-    else:
-        cleaned['thumbnail_url'] = "https://via.placeholder.com/150x100/6B7280/FFFFFF?text=Unknown"
-    
-    return cleaned
+    logger.info(f"Recorded {len(rows)} rollup watermarks for run {run_id}")
 
 def import_csv(csv_file_path, batch_size=1000):
     """Import CSV data into Supabase"""
@@ -127,26 +63,30 @@ def import_csv(csv_file_path, batch_size=1000):
         logger.error(f"CSV file not found: {csv_file_path}")
         return False
     
+    run_id = str(uuid.uuid4())
+    affected = set()  # (observation date, marketing company) pairs for the rollup refresh
+    dimensions = DimensionTracker('marketing_campaigns')
+    
     try:
         total_rows = 0
         batch_data = []
         
         logger.info(f"Starting import of {csv_file_path}")
         
-        with open(csv_file_path, 'r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
+        with open_table(csv_file_path, columns=INPUT_COLUMNS) as table:
+            logger.info(table.describe())
+            cleaner = CampaignRowCleaner(table.header, iso_dates=True)
+            sample, rows = peek(table, DATE_SAMPLE_ROWS)
+            cleaner.detect_dates(sample)
+            logger.info(cleaner.dates.describe())
+            cleaner.detect_rates(sample)
+            logger.info(cleaner.describe_rates())
             
-            for row in reader:
-                cleaned_row = clean_data(row)
-                
-                # Only add rows with required fields
-                if (cleaned_row.get('campaign_id') and 
-                    cleaned_row.get('campaign_observation_date') and 
-                    cleaned_row.get('media_channel') and 
-                    cleaned_row.get('marketing_company') and 
-                    cleaned_row.get('industry')):
-                    
-                    batch_data.append(cleaned_row)
+            for row in rows:
+                # Rows missing a required field come back as None
+                cleaned_row = cleaner.clean(row)
+                if cleaned_row is not None:
+                    batch_data.append(cleaner.as_dict(cleaned_row))
                     
                     # Insert batch when it reaches batch_size
                     if len(batch_data) >= batch_size:
@@ -156,6 +96,8 @@ def import_csv(csv_file_path, batch_size=1000):
                         ).execute()
                         
                         total_rows += len(batch_data)
+                        affected.update((r['campaign_observation_date'], r['marketing_company']) for r in batch_data)
+                        dimensions.add(batch_data)
                         logger.info(f"Inserted {total_rows} rows so far...")
                         batch_data = []
         
@@ -166,13 +108,30 @@ def import_csv(csv_file_path, batch_size=1000):
                 on_conflict='campaign_id'
             ).execute()
             total_rows += len(batch_data)
+            affected.update((r['campaign_observation_date'], r['marketing_company']) for r in batch_data)
+            dimensions.add(batch_data)
         
+        logger.info(cleaner.dates.describe())
         logger.info(f"✅ Import completed successfully! Total rows: {total_rows}")
         return True
         
     except Exception as e:
         logger.error(f"Error during import: {e}")
         return False
+    finally:
+        # Batches upserted before a failure still need their rollups refreshed
+        if affected:
+            try:
+                record_watermarks(supabase, run_id, 'import-csv-supabase.py', affected)
+            except Exception as e:
+                logger.warning(f"Could not record rollup watermarks: {e}")
+        if dimensions:
+            try:
+                changed = dimensions.flush_supabase(supabase)
+                logger.info(f"Updated filter dimensions ({changed} new values)")
+            except Exception as e:
+                logger.warning(f"Could not update filter dimensions: {e}")
+                logger.warning("Run 'python3 refresh-dimensions.py --rebuild' to resync them")
 
 def main():
     if len(sys.argv) != 2:
@@ -1,29 +1,28 @@
 #!/usr/bin/env python3
 """
 Script to import subject lines from CSV file into Supabase database.
-Usage: python import-subject-lines.py <csv_file_path>
+Duplicates (same LOWER(TRIM(subject_line)) as deduplicate-database.sql) are merged at import
+time instead of by a full-table pass afterwards; see subject_dedup.py.
+The file may be gzip, bzip2 or xz compressed; its encoding is detected, and rows with bytes
+that do not decode are repaired or quarantined (csv_input.py).
+Usage: python import-subject-lines.py <csv_file_path> [--on-duplicate keep-best|keep-existing|keep-new]
+       [--on-bad-bytes repair|quarantine]
 """
 
-import sys
 import csv
 import os
-from datetime import datetime
+import uuid
+import argparse
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from subject_dedup import MERGE_POLICIES, SubjectLineDeduplicator
+from dimensions import DimensionTracker
+from date_parsing import FORMATS, DateParser, peek
+from csv_input import QuarantineFile, open_csv_lines
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
 
-def parse_date(date_str):
-    """Parse date string in format '9/24/2025 16:04' to ISO date string."""
-    try:
-        # Parse the date part (before the space)
-        date_part = date_str.split(' ')[0]
-        date_obj = datetime.strptime(date_part, '%m/%d/%Y').date()
-        return date_obj.isoformat()  # Convert to ISO string for JSON serialization
-    except:
-        return None
-
 def parse_decimal(value_str):
     """Parse decimal string to float, return None if invalid."""
     try:
@@ -38,7 +37,73 @@ def parse_bigint(value_str):
     except:
         return None
 
-def import_subject_lines(csv_file_path):
+def record_watermarks(supabase, run_id, affected):
+    """Record the (date, company) pairs touched by this run for refresh-rollups.py."""
+    rows = [
+        {
+            'run_id': run_id,
+            'source': 'import-subject-lines.py',
+            'target_table': 'subject_lines',
+            'affected_date': date_sent,
+            'company': company
+        }
+        for date_sent, company in sorted(affected)
+    ]
+    
+    for i in range(0, len(rows), 1000):
+        supabase.table('import_watermarks').upsert(
+            rows[i:i + 1000],
+            on_conflict='run_id,target_table,affected_date,company'
+        ).execute()
+    
+    print(f"Recorded {len(rows)} rollup watermarks for run {run_id}")
+
+def write_batch(supabase, dedup, batch, affected, dimensions):
+    """Insert new lines and merge duplicates for one batch. Returns (inserted, merged, skipped, errors)."""
+    inserts, updates = dedup.plan(batch)
+    skipped = len(batch) - len(inserts) - len(updates)
+    inserted = merged = errors = 0
+    
+    if inserts:
+        try:
+            stored = supabase.table('subject_lines').insert(inserts).execute().data or []
+        except Exception as e:
+            # Retry row by row so one bad row does not lose the whole batch
+            print(f"Batch insert failed ({e}); retrying rows individually")
+            stored = []
+            for row in inserts:
+                try:
+                    stored.extend(supabase.table('subject_lines').insert(row).execute().data or [])
+                except Exception as row_error:
+                    if errors < 10:
+                        print(f"Error inserting {row['subject_line']!r}: {row_error}")
+                    errors += 1
+        dedup.remember(stored)
+        inserted = len(stored)
+        affected.update((r['date_sent'], r['company'] or '') for r in stored if r.get('date_sent'))
+        dimensions.add(stored)
+    
+    for existing, row in updates:
+        try:
+            stored = supabase.table('subject_lines').update(row).eq('id', existing['id']).execute().data or []
+        except Exception as e:
+            if errors < 10:
+                print(f"Error merging into subject line {existing['id']}: {e}")
+            errors += 1
+            continue
+        dedup.remember(stored)
+        dimensions.add(stored)
+        merged += len(stored)
+        # Both the old and the new (date, company) buckets change
+        if existing.get('date_sent'):
+            affected.add((existing['date_sent'], existing['company'] or ''))
+        if row.get('date_sent'):
+            affected.add((row['date_sent'], row['company'] or ''))
+    
+    return inserted, merged, skipped, errors
+
+def import_subject_lines(csv_file_path, on_duplicate='keep-best', batch_size=500, date_format=None,
+                         on_bad_bytes='repair'):
     """Import subject lines from CSV file."""
     
     # Initialize Supabase client
@@ -55,36 +120,47 @@ def import_subject_lines(csv_file_path):
     print(f"Importing subject lines from {csv_file_path}...")
     
     imported_count = 0
+    merged_count = 0
+    duplicate_count = 0
     error_count = 0
+    run_id = str(uuid.uuid4())
+    affected = set()  # (date_sent, company) pairs for the rollup refresh
+    dimensions = DimensionTracker('subject_lines')
+    dates = DateParser(date_format)  # e.g. '9/24/2025 16:04' -> '2025-09-24'
     
+    dedup = SubjectLineDeduplicator(supabase, policy=on_duplicate)
     try:
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1', 'utf-8-sig']
-        file = None
-        used_encoding = None
-        
-        for encoding in encodings:
-            try:
-                file = open(csv_file_path, 'r', encoding=encoding)
-                # Test reading a few lines to make sure it works
-                file.readline()
-                file.seek(0)  # Reset to beginning
-                used_encoding = encoding
-                print(f"Successfully opened file with encoding: {encoding}")
-                break
-            except (UnicodeDecodeError, UnicodeError):
-                if file:
-                    file.close()
-                continue
-        
-        if not file:
-            print("Error: Could not read file with any supported encoding")
-            return
+        dedup.preload()
+        print(f"Preloaded {dedup.stats['preloaded']} existing subject keys (duplicate policy: {on_duplicate})")
+    except Exception as e:
+        # Without the subject_key column only duplicates within this file are merged
+        print(f"Warning: Could not preload subject keys ({e})")
+        print("Run subject-line-dedup-key.sql to de-duplicate against existing rows")
+    
+    batch = []
+    lines = None
+    quarantine = None
+    try:
+        # One pass over the (possibly compressed) file; lines that do not decode are repaired
+        lines = open_csv_lines(csv_file_path)
+        print(lines.describe())
         
-        reader = csv.DictReader(file)
+        reader = csv.DictReader(lines)
+        # Last physical line of each row, to match it with the lines that did not decode
+        numbered = ((reader.line_num, row) for row in reader)
+        sample, rows = peek(numbered, 1000)
+        dates.detect(row.get('Date') for _, row in sample)
+        print(dates.describe())
         
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 because of header
+        for row_num, (line_num, row) in enumerate(rows, start=2):  # Start at 2 because of header
             try:
+                bad_lines = lines.take_bad_lines(line_num)
+                if bad_lines and on_bad_bytes == 'quarantine':
+                    if quarantine is None:
+                        quarantine = QuarantineFile(csv_file_path + '.quarantine.csv', reader.fieldnames)
+                    quarantine.write([row.get(name) for name in reader.fieldnames], bad_lines)
+                    continue
+                
                 # Skip rows with redacted subjects
                 if row.get('Subject', '').strip() == '[Subject Redacted]':
                     continue
@@ -93,7 +169,7 @@ def import_subject_lines(csv_file_path):
                 subject_data = {
                     'subject_line': row.get('Subject', '').strip(),
                     'open_rate': parse_decimal(row.get('Read Rate', '')),  # Using Read Rate as open_rate
-                    'date_sent': parse_date(row.get('Date', '')),
+                    'date_sent': dates.parse_iso(row.get('Date', '')),
                     'company': row.get('Company', '').strip(),
                     'sub_industry': row.get('Sub-Industry', '').strip(),
                     'mailing_type': row.get('Mailing Type', '').strip(),
@@ -111,16 +187,15 @@ def import_subject_lines(csv_file_path):
                     error_count += 1
                     continue
                 
-                # Insert into database
-                result = supabase.table('subject_lines').insert(subject_data).execute()
-                
-                if result.data:
-                    imported_count += 1
-                    if imported_count % 100 == 0:
-                        print(f"Imported {imported_count} subject lines...")
-                else:
-                    print(f"Error inserting row {row_num}")
-                    error_count += 1
+                batch.append(subject_data)
+                if len(batch) >= batch_size:
+                    inserted, merged, skipped, errors = write_batch(supabase, dedup, batch, affected, dimensions)
+                    imported_count += inserted
+                    merged_count += merged
+                    duplicate_count += skipped
+                    error_count += errors
+                    batch = []
+                    print(f"Imported {imported_count} subject lines ({merged_count} merged, {duplicate_count} duplicates skipped)...")
                     
             except Exception as e:
                 # Only print error for first few rows to avoid spam
@@ -131,8 +206,15 @@ def import_subject_lines(csv_file_path):
                 error_count += 1
                 continue
         
-        # Close the file
-        file.close()
+        if batch:
+            inserted, merged, skipped, errors = write_batch(supabase, dedup, batch, affected, dimensions)
+            imported_count += inserted
+            merged_count += merged
+            duplicate_count += skipped
+            error_count += errors
+        
+        print(lines.describe())
+        print(dates.describe())
     
     except FileNotFoundError:
         print(f"Error: File {csv_file_path} not found")
@@ -140,16 +222,47 @@ def import_subject_lines(csv_file_path):
     except Exception as e:
         print(f"Error reading file: {e}")
         return
+    finally:
+        if lines:
+            lines.close()
+        if quarantine:
+            quarantine.close()
+        # Record watermarks even if the import stopped early, so rows already inserted are rolled up
+        if affected:
+            try:
+                record_watermarks(supabase, run_id, affected)
+            except Exception as e:
+                print(f"Warning: Could not record rollup watermarks: {e}")
+                print("Run 'python3 refresh-rollups.py --scan' to refresh rollups instead")
+        if dimensions:
+            try:
+                changed = dimensions.flush_supabase(supabase)
+                print(f"Updated filter dimensions ({changed} new values)")
+            except Exception as e:
+                print(f"Warning: Could not update filter dimensions: {e}")
+                print("Run 'python3 refresh-dimensions.py --rebuild' to resync them")
     
     print(f"\nImport completed!")
     print(f"Successfully imported: {imported_count} subject lines")
+    print(f"Merged into existing lines: {merged_count}")
+    print(f"Duplicates skipped: {duplicate_count}")
     print(f"Errors: {error_count} rows")
+    if quarantine:
+        print(f"Quarantined: {quarantine.count} rows that did not decode, in {quarantine.path}")
+    print(f"Dedup: {dedup.stats['bloom_hits']} Bloom filter hits, {dedup.stats['db_lookups']} lookup queries")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python import-subject-lines.py <csv_file_path>")
-        print("Example: python import-subject-lines.py subject-lines.csv")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Import subject lines from a CSV file')
+    parser.add_argument('csv_file_path', help='CSV export, e.g. subject-lines.csv')
+    parser.add_argument('--on-duplicate', choices=MERGE_POLICIES, default='keep-best',
+                        help='keep-best keeps the higher open rate (default), like deduplicate-database.sql')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--date-format', choices=FORMATS,
+                        help='Format of the Date column (default: detected from the first rows)')
+    parser.add_argument('--on-bad-bytes', choices=['repair', 'quarantine'], default='repair',
+                        help='Rows with bytes that do not decode: import them repaired (default) or '
+                             'set them aside in <csv>.quarantine.csv')
+    args = parser.parse_args()
     
-    csv_file_path = sys.argv[1]
-    import_subject_lines(csv_file_path)
+    import_subject_lines(args.csv_file_path, args.on_duplicate, args.batch_size, args.date_format,
+                         args.on_bad_bytes)
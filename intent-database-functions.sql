@@ -1,6 +1,9 @@
 -- Database functions for intent-based chat system
 -- This file contains all the database functions needed for the new intent API
 
+-- allCompanies() and allIndustries() are redefined by dimension-tables.sql to read the
+-- dimension tables; run that file after this one if it is installed.
+
 -- 1. Get all companies in the database
 CREATE OR REPLACE FUNCTION allCompanies()
 RETURNS TABLE(company text) AS $$
@@ -0,0 +1,17 @@
+"""
+Latency summaries shared by the benchmarks and search_service.py's /stats endpoint.
+
+No third-party imports, so scripts that only time HTTP calls (measure-campaign-payloads.py)
+need neither numpy nor a database driver to use it.
+"""
+
+from typing import List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of latencies"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
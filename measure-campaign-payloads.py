@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Compare what the campaigns grid transfers with select('*') against the narrow listing.
+
+Both patterns go through PostgREST exactly like /api/campaigns:
+  wide    one page of marketing_campaigns with every column (the old list query)
+  narrow  the same page with only the grid columns (as in marketing_campaigns_list), plus a
+          detail fetch by campaign_id for each row, as when the modal is opened
+Response bodies are measured uncompressed and gzipped, since Supabase compresses responses.
+
+Usage:
+  python3 measure-campaign-payloads.py
+  python3 measure-campaign-payloads.py --limit 10 50 100 --pages 1 100 --repeats 20
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+import logging
+from latency_stats import percentile
+from campaigns_listing import COVERING_SORT_FIELD, LIST_INCLUDE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+LIST_COLUMNS = ['id', COVERING_SORT_FIELD] + LIST_INCLUDE
+
+ORDER = f"{COVERING_SORT_FIELD}.desc,id.desc"
+
+
+class PostgrestClient:
+    """Raw PostgREST GETs, so response sizes are the bytes on the wire"""
+
+    def __init__(self, supabase_url: str, key: str):
+        self.base_url = supabase_url.rstrip('/') + '/rest/v1/'
+        self.headers = {
+            'apikey': key,
+            'Authorization': f"Bearer {key}",
+            'Accept': 'application/json',
+            'Accept-Encoding': 'identity'
+        }
+
+    def get(self, table: str, params: Dict[str, str]) -> Tuple[bytes, float]:
+        """Return (body, latency in ms)"""
+        url = self.base_url + table + '?' + urllib.parse.urlencode(params)
+        request = urllib.request.Request(url, headers=self.headers)
+        started = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+        return body, (time.perf_counter() - started) * 1000
+
+
+def measure(client: PostgrestClient, limit: int, page: int, repeats: int) -> Dict[str, List[float]]:
+    """Latencies and body sizes of both access patterns for one page"""
+    page_params = {'order': ORDER, 'limit': str(limit), 'offset': str((page - 1) * limit)}
+    results: Dict[str, List[float]] = {
+        'wide_ms': [], 'narrow_ms': [], 'detail_ms': [],
+        'wide_bytes': [], 'wide_gzip': [], 'narrow_bytes': [], 'narrow_gzip': [],
+        'detail_bytes': [], 'detail_gzip': []
+    }
+    campaign_ids: List[str] = []
+
+    for _ in range(repeats):
+        body, ms = client.get('marketing_campaigns', {'select': '*', **page_params})
+        results['wide_ms'].append(ms)
+        results['wide_bytes'].append(len(body))
+        results['wide_gzip'].append(len(gzip.compress(body)))
+
+        body, ms = client.get('marketing_campaigns', {'select': ','.join(LIST_COLUMNS), **page_params})
+        results['narrow_ms'].append(ms)
+        results['narrow_bytes'].append(len(body))
+        results['narrow_gzip'].append(len(gzip.compress(body)))
+        if not campaign_ids:
+            campaign_ids = [row['campaign_id'] for row in json.loads(body)]
+
+    for campaign_id in campaign_ids:
+        body, ms = client.get('marketing_campaigns', {'select': '*', 'campaign_id': f"eq.{campaign_id}"})
+        results['detail_ms'].append(ms)
+        results['detail_bytes'].append(len(body))
+        results['detail_gzip'].append(len(gzip.compress(body)))
+
+    return results
+
+
+def mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wide and narrow campaign list payloads')
+    parser.add_argument('--limit', type=int, nargs='+', default=[10, 50, 100], help='Page sizes to measure')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 100], help='Page numbers to measure')
+    parser.add_argument('--repeats', type=int, default=10, help='Timed requests per page and pattern')
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    if not supabase_url or not supabase_key:
+        logger.error("Missing Supabase credentials in .env.local")
+        sys.exit(1)
+
+    client = PostgrestClient(supabase_url, supabase_key)
+
+    print(f"\n{'rows':>5} {'page':>5} | {'wide bytes':>10} {'gzip':>8} {'p50':>8} {'p95':>8} | "
+          f"{'narrow bytes':>12} {'gzip':>8} {'p50':>8} {'p95':>8} | {'detail bytes':>12} {'p50':>8}")
+    for limit in args.limit:
+        for page in args.pages:
+            try:
+                r = measure(client, limit, page, args.repeats)
+            except Exception as e:
+                logger.error(f"Request failed for {limit} rows, page {page}: {e}")
+                sys.exit(1)
+            if not r['detail_ms']:
+                logger.warning(f"Page {page} of {limit} rows is empty; skipping")
+                continue
+
+            print(f"{limit:>5} {page:>5} | {mean(r['wide_bytes']):>10.0f} {mean(r['wide_gzip']):>8.0f} "
+                  f"{percentile(r['wide_ms'], 50):>6.1f}ms {percentile(r['wide_ms'], 95):>6.1f}ms | "
+                  f"{mean(r['narrow_bytes']):>12.0f} {mean(r['narrow_gzip']):>8.0f} "
+                  f"{percentile(r['narrow_ms'], 50):>6.1f}ms {percentile(r['narrow_ms'], 95):>6.1f}ms | "
+                  f"{mean(r['detail_bytes']):>12.0f} {percentile(r['detail_ms'], 50):>6.1f}ms")
+
+            # A page view plus opening one campaign, against the old single wide request
+            narrow_total = mean(r['narrow_gzip']) + mean(r['detail_gzip'])
+            print(f"{'':>11}  page + 1 detail: {narrow_total:.0f} gzip bytes vs {mean(r['wide_gzip']):.0f} "
+                  f"({narrow_total / max(mean(r['wide_gzip']), 1):.0%})")
+
+
+if __name__ == "__main__":
+    main()
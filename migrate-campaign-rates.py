@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Add numeric email-rate columns to marketing_campaigns and backfill them in chunks
+(campaign-rate-columns.sql).
+
+Each chunk is one id range updated and committed on its own, so the migration holds row
+locks only briefly, can run while imports continue, and resumes where it stopped when
+restarted with --start-id. The backfill only fills rates that are still NULL, since the
+importers parse with each file's detected unit; --reparse re-parses every rate with the
+unit-less rules. Indexes on the read and inbox rates are built CONCURRENTLY once
+the backfill is done.
+
+Usage:
+  python3 migrate-campaign-rates.py --install                 # columns + functions
+  python3 migrate-campaign-rates.py --backfill [--chunk-size 5000] [--pause 0.1]
+  python3 migrate-campaign-rates.py --backfill --reparse      # re-parse rates already filled
+  python3 migrate-campaign-rates.py --indexes
+  python3 migrate-campaign-rates.py --install --backfill --indexes
+"""
+
+import os
+import sys
+import time
+import argparse
+from typing import Dict, Optional
+import psycopg2
+from dotenv import load_dotenv
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# The rates the UI and intent queries filter and average on
+INDEXED_RATE_COLUMNS = ['email_read_rate_num', 'email_inbox_rate_num']
+
+
+class CampaignRateMigration:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def install(self, sql_path: str = 'campaign-rate-columns.sql'):
+        """Add the numeric columns and the parse/backfill functions"""
+        cursor = self.connection.cursor()
+        try:
+            with open(sql_path, 'r') as f:
+                cursor.execute(f.read())
+            self.connection.commit()
+            logger.info(f"Installed numeric rate columns from {sql_path}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def backfill(self, chunk_size: int, pause: float, start_id: Optional[int] = None, reparse: bool = False):
+        """Parse the text rates of existing rows, one committed id range at a time"""
+        cursor = self.connection.cursor()
+        from_id = start_id
+        try:
+            cursor.execute("SELECT MIN(id), MAX(id) FROM marketing_campaigns")
+            min_id, max_id = cursor.fetchone()
+            self.connection.commit()
+            if min_id is None:
+                logger.info("marketing_campaigns is empty; nothing to backfill")
+                return
+
+            from_id = max(min_id, start_id or min_id)
+            updated_total = 0
+            chunks = 0
+            started = time.time()
+            while from_id <= max_id:
+                to_id = from_id + chunk_size
+                cursor.execute("SELECT backfill_campaign_rates(%s, %s, %s)", (from_id, to_id, reparse))
+                updated_total += cursor.fetchone()[0]
+                self.connection.commit()
+                chunks += 1
+
+                if chunks % 20 == 0 or to_id > max_id:
+                    done = min(to_id, max_id + 1) - min_id
+                    logger.info(f"Backfilled ids up to {to_id - 1} "
+                                f"({done / (max_id - min_id + 1):.0%}, {updated_total} rows updated)")
+                from_id = to_id
+                if pause:
+                    time.sleep(pause)
+
+            logger.info(f"✅ Backfill complete: {updated_total} rows updated in {chunks} chunks, "
+                        f"{time.time() - started:.1f}s")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Backfill stopped at id {from_id}: {e}")
+            logger.error(f"Re-run with --start-id {from_id} to resume")
+            raise
+        finally:
+            cursor.close()
+
+    def create_indexes(self):
+        """Build the rate indexes without blocking writes"""
+        self.connection.autocommit = True
+        cursor = self.connection.cursor()
+        try:
+            for column in INDEXED_RATE_COLUMNS:
+                started = time.time()
+                cursor.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaigns_{column} "
+                    f"ON marketing_campaigns ({column}) WHERE {column} IS NOT NULL"
+                )
+                logger.info(f"idx_campaigns_{column} ready in {time.time() - started:.1f}s")
+            cursor.execute("ANALYZE marketing_campaigns")
+        finally:
+            cursor.close()
+            self.connection.autocommit = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add and backfill numeric email-rate columns')
+    parser.add_argument('--install', action='store_true', help='Run campaign-rate-columns.sql')
+    parser.add_argument('--backfill', action='store_true', help='Parse the text rates of existing rows')
+    parser.add_argument('--indexes', action='store_true', help='Create the rate indexes (CONCURRENTLY)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Ids per backfill transaction')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    parser.add_argument('--start-id', type=int, help='Resume the backfill from this id')
+    parser.add_argument('--reparse', action='store_true',
+                        help='Re-parse every rate, not only the NULL ones (overrides units detected at import)')
+    args = parser.parse_args()
+
+    if not (args.install or args.backfill or args.indexes):
+        parser.print_help()
+        return
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    migration = CampaignRateMigration(db_config)
+    migration.connect()
+    try:
+        if args.install:
+            migration.install()
+        if args.backfill:
+            migration.backfill(args.chunk_size, args.pause, args.start_id, args.reparse)
+        if args.indexes:
+            migration.create_indexes()
+    except Exception:
+        sys.exit(1)
+    finally:
+        migration.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+-- Near-duplicate clusters for subject_lines
+-- deduplicate-database.sql only collapses exact LOWER(TRIM(subject_line)) matches.
+-- near_duplicates.py groups lines that differ by a name token, emoji or punctuation
+-- (MinHash + LSH) and writes each cluster's representative id back here.
+
+-- Step 1: Cluster column
+-- NULL for lines with no near-duplicate; otherwise the id of the cluster's representative
+-- (highest open_rate, then most recent, as in deduplicate-database.sql). The representative
+-- carries its own id.
+ALTER TABLE subject_lines ADD COLUMN IF NOT EXISTS near_dup_cluster_id INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_subject_lines_near_dup_cluster
+ON subject_lines(near_dup_cluster_id)
+WHERE near_dup_cluster_id IS NOT NULL;
+
+-- Step 2: One row per cluster, for embedding generation and neighbor queries
+CREATE OR REPLACE VIEW subject_lines_distinct AS
+SELECT *
+FROM subject_lines
+WHERE near_dup_cluster_id IS NULL
+   OR near_dup_cluster_id = id;
+
+-- Step 3: Cluster summary
+CREATE OR REPLACE VIEW subject_line_near_dup_clusters AS
+SELECT
+  near_dup_cluster_id AS cluster_id,
+  COUNT(*) AS line_count,
+  MAX(open_rate) AS max_open_rate,
+  MIN(open_rate) AS min_open_rate
+FROM subject_lines
+WHERE near_dup_cluster_id IS NOT NULL
+GROUP BY near_dup_cluster_id;
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for subject_lines with MinHash and LSH banding.
+
+Each normalized subject line (casefolded, punctuation and emoji removed) becomes a set of
+3-character shingles; lines with nothing left after normalizing are never clustered. The
+shingles of the whole corpus are hashed in one vectorized rolling hash, and MinHash
+signatures come from np.minimum.reduceat over each row's shingle segment.
+Signatures are split into bands; rows that agree on a whole band are candidate pairs, which
+are kept when their estimated Jaccard similarity clears the threshold. Connected pairs form
+clusters, and each cluster's representative is the line with the highest open_rate (then
+the most recent, as in deduplicate-database.sql). Every step is linear in the row count.
+
+Usage:
+  python3 near_duplicates.py --install                  # add near_dup_cluster_id (near-duplicates.sql)
+  python3 near_duplicates.py                            # cluster and write cluster ids back
+  python3 near_duplicates.py --dry-run --show 20        # print the largest clusters only
+  python3 near_duplicates.py --threshold 0.7 --bands 16
+  python3 near_duplicates.py --check                    # cluster built-in examples, no database
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List, Tuple
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+import logging
+from autocomplete_index import normalize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Short lines that differ by one word ('john your bonus is waiting' / 'mary ...') share about
+# 70% of their 3-character shingles, but only about 60-65% of longer shingles
+SHINGLE_SIZE = 3
+NUM_PERM = 128
+# 32 bands of 4 rows puts the LSH threshold at (1/32)**(1/4) ~= 0.42, so pairs near the
+# verification threshold almost always become candidates (0.71 Jaccard: > 99.9%)
+DEFAULT_BANDS = 32
+DEFAULT_THRESHOLD = 0.6
+
+# Rows per MinHash chunk; bounds the (shingles x permutation) working set
+SIGNATURE_CHUNK_ROWS = 200_000
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+
+
+def shingle_hashes(lines: List[str], k: int = SHINGLE_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """uint32 hashes of every k-byte shingle and each row's [start, end) offsets into them"""
+    encoded = [line.encode('utf-8').ljust(k) for line in lines]  # short lines still get one shingle
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    # Polynomial hash of every k-byte window in the concatenated corpus
+    window_count = max(len(data) - k + 1, 0)
+    rolling = np.zeros(window_count, dtype=np.uint64)
+    for j in range(k):
+        rolling = rolling * np.uint64(257) + data[j:j + window_count]
+
+    # Keep only windows that lie inside a single row
+    row_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    counts = lengths - k + 1
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    positions = np.repeat(row_starts, counts) + (np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts))
+
+    hashes = ((rolling[positions] * _MIX) >> _SHIFT).astype(np.uint32)
+    return hashes, offsets
+
+
+def minhash_signatures(hashes: np.ndarray, offsets: np.ndarray, num_perm: int = NUM_PERM,
+                       seed: int = 1) -> np.ndarray:
+    """(n_rows x num_perm) uint32 MinHash signatures using multiply-shift permutations"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    n_rows = len(offsets) - 1
+    signatures = np.empty((n_rows, num_perm), dtype=np.uint32)
+    values = hashes.astype(np.uint64)
+    for start in range(0, n_rows, SIGNATURE_CHUNK_ROWS):
+        end = min(start + SIGNATURE_CHUNK_ROWS, n_rows)
+        chunk = values[offsets[start]:offsets[end]]
+        segment_starts = offsets[start:end] - offsets[start]
+        for i in range(num_perm):
+            permuted = ((chunk * a[i] + b[i]) >> _SHIFT).astype(np.uint32)
+            signatures[start:end, i] = np.minimum.reduceat(permuted, segment_starts)
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """(n_pairs x 2) row pairs that share at least one whole band, each row paired with its bucket's first row"""
+    n_rows, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    pairs = []
+    for band in range(bands):
+        block = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = np.zeros(n_rows, dtype=np.uint64)
+        for column in range(rows_per_band):
+            keys = (keys ^ block[:, column]) * _MIX
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        is_start = np.empty(n_rows, dtype=bool)
+        is_start[0] = True
+        is_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        first = order[np.maximum.accumulate(np.where(is_start, np.arange(n_rows), 0))]
+        members = ~is_start
+        if members.any():
+            pairs.append(np.stack([first[members], order[members]], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.vstack(pairs), axis=0)
+
+
+def estimated_jaccard(signatures: np.ndarray, pairs: np.ndarray, chunk: int = 500_000) -> np.ndarray:
+    """Fraction of equal MinHash values for each pair"""
+    result = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), chunk):
+        p = pairs[start:start + chunk]
+        result[start:start + len(p)] = np.mean(signatures[p[:, 0]] == signatures[p[:, 1]], axis=1)
+    return result
+
+
+def connected_components(n_rows: int, pairs: np.ndarray) -> np.ndarray:
+    """Component label per row (union-find with path halving)"""
+    parent = np.arange(n_rows)
+    for left, right in pairs:
+        while parent[left] != left:
+            parent[left] = parent[parent[left]]
+            left = parent[left]
+        while parent[right] != right:
+            parent[right] = parent[parent[right]]
+            right = parent[right]
+        if left != right:
+            parent[max(left, right)] = min(left, right)
+
+    # Flatten so every row points at its root
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return parent
+        parent = grandparent
+
+
+def find_clusters(ids: np.ndarray, lines: List[str], open_rates: np.ndarray, created_at: np.ndarray,
+                  threshold: float = DEFAULT_THRESHOLD, bands: int = DEFAULT_BANDS,
+                  num_perm: int = NUM_PERM) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Representative id per row (-1 for rows without near-duplicates) and stage timings"""
+    timings = {}
+
+    started = time.perf_counter()
+    normalized = [normalize(line) for line in lines]
+    # Empty and emoji-only lines normalize to '' and would all share one signature
+    keep = np.fromiter((bool(text) for text in normalized), dtype=bool, count=len(normalized))
+    representatives = np.full(len(ids), -1, dtype=np.int64)
+    if not keep.any():
+        timings.update(shingle_s=time.perf_counter() - started, minhash_s=0.0, lsh_s=0.0,
+                       candidate_pairs=0, verified_pairs=0)
+        return representatives, timings
+    rows = np.flatnonzero(keep)
+    ids, open_rates, created_at = ids[rows], open_rates[rows], created_at[rows]
+    hashes, offsets = shingle_hashes([normalized[i] for i in rows])
+    timings['shingle_s'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    signatures = minhash_signatures(hashes, offsets, num_perm)
+    timings['minhash_s'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pairs = lsh_candidate_pairs(signatures, bands)
+    similar = pairs[estimated_jaccard(signatures, pairs) >= threshold]
+    labels = connected_components(len(ids), similar)
+    timings['lsh_s'] = time.perf_counter() - started
+    timings['candidate_pairs'] = len(pairs)
+    timings['verified_pairs'] = len(similar)
+
+    # Best row per component: highest open_rate, then most recent, then lowest id
+    order = np.lexsort((ids, -created_at, -open_rates, labels))
+    sorted_labels = labels[order]
+    is_first = np.empty(len(order), dtype=bool)
+    is_first[:1] = True
+    is_first[1:] = sorted_labels[1:] != sorted_labels[:-1]
+    best_row = np.empty(len(ids), dtype=np.int64)
+    best_row[sorted_labels[is_first]] = order[is_first]
+
+    sizes = np.bincount(labels, minlength=len(ids))
+    representatives[rows] = np.where(sizes[labels] > 1, ids[best_row[labels]], -1)
+    return representatives, timings
+
+
+# (lines, whether they must end up in one cluster) for --check
+CHECK_CASES = [
+    (["John, your bonus is waiting 🎉", "Mary, your bonus is waiting!"], True),
+    (["Last chance: 0% APR ends tonight", "LAST CHANCE - 0% APR ends tonight!!"], True),
+    (["Your statement is ready", "Free shipping on all orders this weekend"], False),
+    (["", "🎉🎉", "!!!"], False),
+]
+
+
+def self_check(threshold: float = DEFAULT_THRESHOLD, bands: int = DEFAULT_BANDS) -> bool:
+    """Cluster CHECK_CASES together and report any case that comes out wrong"""
+    lines = [line for case, _ in CHECK_CASES for line in case]
+    ids = np.arange(1, len(lines) + 1, dtype=np.int64)
+    representatives, _ = find_clusters(ids, lines, np.zeros(len(lines)), np.zeros(len(lines)), threshold, bands)
+    ok = True
+    start = 0
+    for case, together in CHECK_CASES:
+        got = representatives[start:start + len(case)]
+        start += len(case)
+        clustered = bool(got[0] >= 0 and (got == got[0]).all())
+        if together != clustered or (not together and (got >= 0).any()):
+            ok = False
+            logger.error(f"{'Expected' if together else 'Did not expect'} one cluster for {case}: {got.tolist()}")
+    return ok
+
+
+class NearDuplicateFinder:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def install(self, sql_path: str = 'near-duplicates.sql'):
+        """Add the cluster column and views"""
+        with open(sql_path, 'r') as f:
+            sql_content = f.read()
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql_content)
+            self.connection.commit()
+            logger.info(f"Installed near-duplicate column and views from {sql_path}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to install near-duplicate schema: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def fetch(self) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+        """Stream id, subject_line, open_rate and created_at with a server-side cursor"""
+        ids, lines, rates, created = [], [], [], []
+        cursor = self.connection.cursor(name='near_dup_fetch')
+        cursor.itersize = 50000
+        try:
+            cursor.execute(
+                "SELECT id, subject_line, COALESCE(open_rate, 0), "
+                "COALESCE(EXTRACT(EPOCH FROM created_at), 0) FROM subject_lines"
+            )
+            for row_id, line, rate, created_at in cursor:
+                ids.append(row_id)
+                lines.append(line or '')
+                rates.append(float(rate))
+                created.append(float(created_at))
+        finally:
+            cursor.close()
+            self.connection.rollback()
+        return np.asarray(ids, dtype=np.int64), lines, np.asarray(rates), np.asarray(created)
+
+    def write_back(self, ids: np.ndarray, representatives: np.ndarray):
+        """COPY cluster ids into a temp table and apply them in two set-based updates"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE near_dup_assignments (id INTEGER PRIMARY KEY, cluster_id INTEGER NOT NULL) "
+                "ON COMMIT DROP"
+            )
+            clustered = representatives >= 0
+            buffer = io.StringIO()
+            for row_id, cluster_id in zip(ids[clustered], representatives[clustered]):
+                buffer.write(f"{row_id}\t{cluster_id}\n")
+            buffer.seek(0)
+            cursor.copy_from(buffer, 'near_dup_assignments', columns=('id', 'cluster_id'))
+
+            cursor.execute("""
+                UPDATE subject_lines sl
+                SET near_dup_cluster_id = a.cluster_id
+                FROM near_dup_assignments a
+                WHERE sl.id = a.id
+                  AND sl.near_dup_cluster_id IS DISTINCT FROM a.cluster_id
+            """)
+            assigned = cursor.rowcount
+            cursor.execute("""
+                UPDATE subject_lines sl
+                SET near_dup_cluster_id = NULL
+                WHERE sl.near_dup_cluster_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM near_dup_assignments a WHERE a.id = sl.id)
+            """)
+            cleared = cursor.rowcount
+            self.connection.commit()
+            logger.info(f"Updated {assigned} cluster assignments, cleared {cleared} stale ones")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to write cluster ids: {e}")
+            raise
+        finally:
+            cursor.close()
+
+
+def print_clusters(ids: np.ndarray, lines: List[str], open_rates: np.ndarray, representatives: np.ndarray,
+                   limit: int):
+    clustered = np.flatnonzero(representatives >= 0)
+    if len(clustered) == 0:
+        print("No near-duplicate clusters found")
+        return
+    cluster_ids, sizes = np.unique(representatives[clustered], return_counts=True)
+    row_of = {int(row_id): i for i, row_id in enumerate(ids)}
+    for cluster_id in cluster_ids[np.argsort(-sizes)][:limit]:
+        members = clustered[representatives[clustered] == cluster_id]
+        print(f"\nCluster {cluster_id} ({len(members)} lines)")
+        print(f"  * {open_rates[row_of[int(cluster_id)]]:.4f}  {lines[row_of[int(cluster_id)]]}")
+        for i in members[:5]:
+            if ids[i] != cluster_id:
+                print(f"    {open_rates[i]:.4f}  {lines[i]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cluster near-duplicate subject lines')
+    parser.add_argument('--install', action='store_true', help='Create the cluster column and views')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Minimum estimated Jaccard')
+    parser.add_argument('--bands', type=int, default=DEFAULT_BANDS, help=f'LSH bands (divides {NUM_PERM})')
+    parser.add_argument('--dry-run', action='store_true', help='Do not write cluster ids back')
+    parser.add_argument('--show', type=int, default=0, metavar='N', help='Print the N largest clusters')
+    parser.add_argument('--check', action='store_true', help='Cluster built-in example pairs and exit')
+    args = parser.parse_args()
+
+    if NUM_PERM % args.bands:
+        parser.error(f"--bands must divide {NUM_PERM}")
+
+    if args.check:
+        if not self_check(args.threshold, args.bands):
+            sys.exit(1)
+        logger.info(f"All {len(CHECK_CASES)} example cases cluster as expected")
+        return
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    finder = NearDuplicateFinder(db_config)
+    finder.connect()
+    try:
+        if args.install:
+            finder.install()
+            return
+
+        started = time.time()
+        ids, lines, open_rates, created_at = finder.fetch()
+        logger.info(f"Fetched {len(ids)} subject lines in {time.time() - started:.1f}s")
+        if len(ids) == 0:
+            return
+
+        representatives, timings = find_clusters(ids, lines, open_rates, created_at, args.threshold, args.bands)
+        clustered = representatives >= 0
+        logger.info(
+            f"{int(clustered.sum())} lines in {len(np.unique(representatives[clustered]))} clusters "
+            f"({timings['candidate_pairs']} candidate pairs, {timings['verified_pairs']} verified); "
+            f"shingles {timings['shingle_s']:.1f}s, minhash {timings['minhash_s']:.1f}s, lsh {timings['lsh_s']:.1f}s"
+        )
+
+        if args.show:
+            print_clusters(ids, lines, open_rates, representatives, args.show)
+
+        if not args.dry_run:
+            finder.write_back(ids, representatives)
+    finally:
+        finder.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Open-rate prediction model trained on subject_lines.
+
+A ridge regression over hashed features: subject line words and word pairs, a few surface
+signals (length, digits, punctuation, emoji, all-caps words) and the company, sub_industry
+and mailing_type columns. Training solves the ridge normal equations with conjugate
+gradients, using NumPy bincount for the sparse products, so a full fit over the table takes
+seconds. The artifact is a single .npz holding the weight vector and the feature settings,
+and prediction needs no vector search, embeddings or LLM calls.
+
+Usage:
+  python3 open_rate_model.py --train open-rate-model.npz            # fit on subject_lines
+  python3 open_rate_model.py --model open-rate-model.npz "Your 2x points bonus ends tonight"
+  python3 open_rate_model.py --model open-rate-model.npz --benchmark 5000
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from batch_scorer import grade
+
+# Load environment variables
+load_dotenv('.env.local')
+
+MODEL_VERSION = 1
+
+# 2**18 weights is ~1MB as float32 and keeps hash collisions rare at our vocabulary size
+DEFAULT_HASH_BITS = 18
+
+DEFAULT_L2 = 1.0
+
+# Every 5th row (by id) is held out for evaluation
+HOLDOUT_MODULUS = 5
+
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)?")
+
+# (pattern, feature) pairs for surface signals
+_SURFACE_FEATURES = [
+    (re.compile(r'\d'), 'has:digit'),
+    (re.compile('%'), 'has:percent'),
+    (re.compile(r'\$'), 'has:dollar'),
+    (re.compile(r'\?'), 'has:question'),
+    (re.compile('!'), 'has:exclaim'),
+    (re.compile('[\U0001F300-\U0001FAFF\u2600-\u27BF]'), 'has:emoji'),
+]
+
+_LENGTH_FEATURES = [f"len:{i}" for i in range(5)]
+_WORD_COUNT_FEATURES = [f"words:{i}" for i in range(5)]
+
+
+def _bucket(value: int, edges: Tuple[int, ...]) -> int:
+    for i, edge in enumerate(edges):
+        if value <= edge:
+            return i
+    return len(edges)
+
+
+def feature_names(subject_line: str, company: Optional[str] = None, sub_industry: Optional[str] = None,
+                  mailing_type: Optional[str] = None) -> List[str]:
+    """The string features of one row before hashing"""
+    text = subject_line or ''
+    raw_words = _WORD_RE.findall(text)
+    words = [w.lower() for w in raw_words]
+
+    names = ['w:' + w for w in words]
+    names.extend(['b:' + a + ' ' + b for a, b in zip(words, words[1:])])
+    names.append(_LENGTH_FEATURES[_bucket(len(text), (20, 35, 50, 70))])
+    names.append(_WORD_COUNT_FEATURES[_bucket(len(words), (3, 6, 9, 12))])
+    names.extend(name for pattern, name in _SURFACE_FEATURES if pattern.search(text))
+    if any(len(w) > 1 and w.isupper() for w in raw_words):
+        names.append('has:caps_word')
+
+    names.append('company:' + (company or '').strip().lower())
+    names.append('sub_industry:' + (sub_industry or '').strip().lower())
+    names.append('mailing_type:' + (mailing_type or '').strip().lower())
+    return names
+
+
+class FeatureHasher:
+    """Maps feature strings to column ids with crc32 (stable across processes, unlike hash())"""
+
+    def __init__(self, hash_bits: int = DEFAULT_HASH_BITS, cache_size: int = 1_000_000):
+        self.n_features = 1 << hash_bits
+        self.mask = self.n_features - 1
+        self.cache_size = cache_size
+        self._cache: Dict[str, int] = {}
+
+    def column(self, name: str) -> int:
+        column = zlib.crc32(name.encode('utf-8')) & self.mask
+        if len(self._cache) < self.cache_size:
+            self._cache[name] = column
+        return column
+
+    def transform(self, rows: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Padded (n_rows x max_features) column ids and values; padding points at column n_features"""
+        cache = self._cache
+        flat: List[int] = []
+        lengths = np.empty(len(rows), dtype=np.int32)
+        for i, row in enumerate(rows):
+            names = feature_names(
+                row.get('subject_line', ''), row.get('company'), row.get('sub_industry'), row.get('mailing_type')
+            )
+            flat.extend([cache[n] if n in cache else self.column(n) for n in names])
+            lengths[i] = len(names)
+
+        width = int(lengths.max()) if len(rows) else 0
+        present = np.arange(width) < lengths[:, None]
+        indexes = np.full((len(rows), width), self.n_features, dtype=np.int32)
+        indexes[present] = flat
+        # Scale so long and short subject lines contribute comparable totals
+        values = present * (1.0 / np.sqrt(np.maximum(lengths, 1)))[:, None].astype(np.float32)
+        return indexes, values.astype(np.float32)
+
+
+def _matvec(weights: np.ndarray, indexes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    return np.sum(weights[indexes] * values, axis=1)
+
+
+def _rmatvec(residuals: np.ndarray, indexes: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    return np.bincount(indexes.ravel(), weights=(values * residuals[:, None]).ravel(), minlength=size)
+
+
+def fit_ridge(indexes: np.ndarray, values: np.ndarray, targets: np.ndarray, n_features: int,
+              l2: float = DEFAULT_L2, max_iter: int = 200, tol: float = 1e-6) -> Tuple[np.ndarray, int]:
+    """Solve (X^T X + l2 I) w = X^T y by conjugate gradients; returns (weights, iterations)"""
+    size = n_features + 1  # last slot is the padding column, pinned to zero
+
+    def apply(p: np.ndarray) -> np.ndarray:
+        result = _rmatvec(_matvec(p, indexes, values), indexes, values, size) + l2 * p
+        result[n_features] = 0.0
+        return result
+
+    weights = np.zeros(size, dtype=np.float64)
+    residual = _rmatvec(targets.astype(np.float64), indexes, values, size)
+    residual[n_features] = 0.0
+    direction = residual.copy()
+    rs_old = residual @ residual
+    rs_start = rs_old
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        applied = apply(direction)
+        alpha = rs_old / (direction @ applied)
+        weights += alpha * direction
+        residual -= alpha * applied
+        rs_new = residual @ residual
+        if rs_new <= tol * tol * rs_start:
+            break
+        direction = residual + (rs_new / rs_old) * direction
+        rs_old = rs_new
+
+    return weights, iterations
+
+
+class OpenRateModel:
+    """Hashed-feature ridge regressor for open_rate"""
+
+    def __init__(self, weights: np.ndarray, intercept: float, hash_bits: int = DEFAULT_HASH_BITS,
+                 metrics: Optional[Dict[str, Any]] = None):
+        self.hasher = FeatureHasher(hash_bits)
+        self.weights = np.append(weights[:self.hasher.n_features], 0.0).astype(np.float32)
+        self.intercept = float(intercept)
+        self.hash_bits = hash_bits
+        self.metrics = metrics or {}
+
+    @classmethod
+    def train(cls, rows: List[Dict[str, Any]], hash_bits: int = DEFAULT_HASH_BITS,
+              l2: float = DEFAULT_L2) -> 'OpenRateModel':
+        """Fit on every row except the id-based holdout, report holdout metrics, then refit on all rows"""
+        rows = [r for r in rows if r.get('subject_line') and r.get('open_rate') is not None]
+        if not rows:
+            raise ValueError("No subject lines with an open_rate to train on")
+
+        hasher = FeatureHasher(hash_bits)
+        indexes, values = hasher.transform(rows)
+        targets = np.asarray([float(r['open_rate']) for r in rows], dtype=np.float64)
+        holdout = np.asarray([int(r.get('id', i)) % HOLDOUT_MODULUS == 0 for i, r in enumerate(rows)])
+
+        metrics: Dict[str, Any] = {'rows': len(rows), 'l2': l2, 'hash_bits': hash_bits}
+        train = ~holdout
+        if holdout.any() and train.any():
+            mean = targets[train].mean()
+            weights, _ = fit_ridge(indexes[train], values[train], targets[train] - mean, hasher.n_features, l2)
+            predicted = np.clip(_matvec(weights, indexes[holdout], values[holdout]) + mean, 0.0, 1.0)
+            actual = targets[holdout]
+            metrics.update({
+                'holdout_rows': int(holdout.sum()),
+                'holdout_rmse': float(np.sqrt(np.mean((predicted - actual) ** 2))),
+                'holdout_mae': float(np.mean(np.abs(predicted - actual))),
+                'baseline_rmse': float(np.sqrt(np.mean((mean - actual) ** 2))),
+                'holdout_grade_accuracy': float(np.mean(
+                    [grade(p) == grade(a) for p, a in zip(predicted, actual)]
+                )),
+            })
+
+        started = time.perf_counter()
+        mean = targets.mean()
+        weights, iterations = fit_ridge(indexes, values, targets - mean, hasher.n_features, l2)
+        metrics.update({'cg_iterations': iterations, 'fit_seconds': round(time.perf_counter() - started, 2)})
+        return cls(weights, mean, hash_bits, metrics)
+
+    def predict(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """Predicted open rates for rows with subject_line (and optionally company, sub_industry, mailing_type)"""
+        if not rows:
+            return np.zeros(0, dtype=np.float32)
+        indexes, values = self.hasher.transform(rows)
+        return np.clip(_matvec(self.weights, indexes, values) + self.intercept, 0.0, 1.0)
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            version=MODEL_VERSION,
+            weights=self.weights[:-1],
+            intercept=self.intercept,
+            hash_bits=self.hash_bits,
+            metrics=json.dumps(self.metrics)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'OpenRateModel':
+        artifact = np.load(path, allow_pickle=False)
+        if int(artifact['version']) != MODEL_VERSION:
+            raise ValueError(f"Unsupported open rate model version: {int(artifact['version'])}")
+        return cls(artifact['weights'], float(artifact['intercept']), int(artifact['hash_bits']),
+                   json.loads(str(artifact['metrics'])))
+
+
+def fetch_rows(page_size: int = 1000) -> List[Dict[str, Any]]:
+    """Page through subject_lines by id using the Supabase service role"""
+    from supabase import create_client
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("Error: Missing Supabase environment variables")
+        print("Please set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        sys.exit(1)
+
+    supabase = create_client(supabase_url, supabase_key)
+    rows = []
+    last_id = 0
+    while True:
+        response = supabase.table('subject_lines').select(
+            'id, subject_line, open_rate, company, sub_industry, mailing_type'
+        ).gt('id', last_id).order('id').limit(page_size).execute()
+        if not response.data:
+            break
+        rows.extend(response.data)
+        last_id = response.data[-1]['id']
+        if len(response.data) < page_size:
+            break
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train or apply the open rate prediction model')
+    parser.add_argument('subject_line', nargs='*', help='Subject lines to score')
+    parser.add_argument('--train', metavar='PATH', help='Fit on subject_lines and save the model to PATH')
+    parser.add_argument('--model', metavar='PATH', default='open-rate-model.npz', help='Saved model to load')
+    parser.add_argument('--l2', type=float, default=DEFAULT_L2, help='Ridge penalty')
+    parser.add_argument('--hash-bits', type=int, default=DEFAULT_HASH_BITS)
+    parser.add_argument('--company', help='Company context for the lines being scored')
+    parser.add_argument('--sub-industry', help='Sub-industry context for the lines being scored')
+    parser.add_argument('--mailing-type', help='Mailing type context for the lines being scored')
+    parser.add_argument('--benchmark', type=int, metavar='N', help='Time prediction on N stored subject lines')
+    args = parser.parse_args()
+
+    if args.train:
+        started = time.time()
+        rows = fetch_rows()
+        print(f"📊 Fetched {len(rows)} subject lines in {time.time() - started:.1f}s")
+        model = OpenRateModel.train(rows, hash_bits=args.hash_bits, l2=args.l2)
+        model.save(args.train)
+        m = model.metrics
+        if 'holdout_rmse' in m:
+            print(f"📈 Holdout ({m['holdout_rows']} rows): RMSE {m['holdout_rmse']:.4f} "
+                  f"(mean baseline {m['baseline_rmse']:.4f}), MAE {m['holdout_mae']:.4f}, "
+                  f"grade accuracy {m['holdout_grade_accuracy']:.1%}")
+        print(f"✅ Fit in {m['fit_seconds']}s ({m['cg_iterations']} CG iterations) -> {args.train}")
+        return
+
+    model = OpenRateModel.load(args.model)
+
+    if args.benchmark:
+        rows = fetch_rows()[:args.benchmark]
+        model.predict(rows[:100])  # warm the feature cache the way a long-lived process would
+        started = time.perf_counter()
+        model.predict(rows)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"⏱️  Scored {len(rows)} lines in {elapsed_ms:.1f}ms ({len(rows) / elapsed_ms:.0f} lines/ms)")
+        return
+
+    if not args.subject_line:
+        parser.print_help()
+        sys.exit(1)
+
+    rows = [
+        {'subject_line': line, 'company': args.company, 'sub_industry': args.sub_industry,
+         'mailing_type': args.mailing_type}
+        for line in args.subject_line
+    ]
+    for line, predicted in zip(args.subject_line, model.predict(rows)):
+        print(f"{grade(float(predicted))}  {predicted * 100:5.1f}%  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Install and resync the filter dimension tables (dimension-tables.sql).
+The importers keep them current as they run (dimensions.DimensionTracker); a rebuild is only
+needed to drop values whose last row was deleted.
+
+Usage:
+  python3 refresh-dimensions.py --install     # create tables/functions and backfill from existing rows
+  python3 refresh-dimensions.py --rebuild     # resync with the source tables (drops values no longer used)
+  python3 refresh-dimensions.py               # show the current version and list sizes
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Dict
+import psycopg2
+from dotenv import load_dotenv
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+
+class DimensionManager:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def _execute(self, sql: str, description: str):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql)
+            self.connection.commit()
+            logger.info(description)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def install(self, sql_path: str = 'dimension-tables.sql'):
+        """Create the dimension tables and functions, then backfill them"""
+        with open(sql_path, 'r') as f:
+            self._execute(f.read(), f"Installed and backfilled dimension tables from {sql_path}")
+
+    def rebuild(self):
+        self._execute("SELECT rebuild_dimensions()", "Rebuilt dimension tables from subject_lines and marketing_campaigns")
+
+    def show(self):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT dimension_snapshot()")
+            snapshot = cursor.fetchone()[0]
+            if isinstance(snapshot, str):
+                snapshot = json.loads(snapshot)
+        finally:
+            cursor.close()
+
+        print(f"Dimension snapshot version {snapshot['version']}")
+        for key, values in snapshot.items():
+            if isinstance(values, list):
+                print(f"  {key:<20} {len(values):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the filter dimension tables')
+    parser.add_argument('--install', action='store_true', help='Run dimension-tables.sql (includes a backfill)')
+    parser.add_argument('--rebuild', action='store_true', help='Resync the dimension tables with their sources')
+    args = parser.parse_args()
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    manager = DimensionManager(db_config)
+    manager.connect()
+    try:
+        if args.install:
+            manager.install()
+        elif args.rebuild:
+            manager.rebuild()
+        manager.show()
+    finally:
+        manager.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Refresh the rollup tables used by the intent volume/open-rate queries.
+Run after each import batch; only the buckets recorded in import_watermarks by the
+importers are recomputed.
+
+Usage:
+  python3 refresh-rollups.py --install            # create tables/functions from rollup-tables.sql
+  python3 refresh-rollups.py                      # apply pending import watermarks
+  python3 refresh-rollups.py --scan               # refresh months with rows added since the last scan
+  python3 refresh-rollups.py --from 2025-01-01 --to 2025-03-31
+  python3 refresh-rollups.py --full               # rebuild every subject line bucket
+  python3 refresh-rollups.py --backfill           # enqueue watermarks for every existing date/company
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import psycopg2
+from dotenv import load_dotenv
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Tables the importers record watermarks for
+WATERMARK_TARGETS = ['subject_lines', 'marketing_campaigns']
+
+
+class RollupRefresher:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def install(self, sql_path: str = 'rollup-tables.sql'):
+        """Create the rollup tables and functions"""
+        with open(sql_path, 'r') as f:
+            sql_content = f.read()
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(sql_content)
+            self.connection.commit()
+            logger.info(f"Installed rollup tables and functions from {sql_path}")
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Failed to install rollups: {e}")
+            raise
+        finally:
+            cursor.close()
+
+    def pending_months(self) -> Tuple[List[date], Optional[datetime]]:
+        """Return the months that received rows since the last refresh, plus the new high-water mark"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT last_created_at FROM subject_line_rollup_state WHERE id = 1")
+            row = cursor.fetchone()
+            last_created_at = row[0] if row else None
+
+            cursor.execute(
+                """
+                SELECT DATE_TRUNC('month', date_sent)::DATE AS month, MAX(created_at)
+                FROM subject_lines
+                WHERE date_sent IS NOT NULL
+                  AND (%s::timestamptz IS NULL OR created_at > %s::timestamptz)
+                GROUP BY 1
+                ORDER BY 1
+                """,
+                (last_created_at, last_created_at)
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        months = [r[0] for r in rows]
+        high_water = max((r[1] for r in rows), default=None)
+        return months, high_water
+
+    def all_months(self) -> List[date]:
+        """Return every month that has subject lines"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT DISTINCT DATE_TRUNC('month', date_sent)::DATE
+                FROM subject_lines
+                WHERE date_sent IS NOT NULL
+                ORDER BY 1
+                """
+            )
+            return [r[0] for r in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def refresh_month(self, month_start: date) -> int:
+        """Rebuild every bucket overlapping one month in a single transaction"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                SELECT refresh_subject_line_rollups(
+                  %s::DATE,
+                  (DATE_TRUNC('month', %s::DATE) + INTERVAL '1 month - 1 day')::DATE
+                )
+                """,
+                (month_start, month_start)
+            )
+            affected = cursor.fetchone()[0]
+            self.connection.commit()
+            return affected
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def refresh_range(self, from_date: date, to_date: date) -> int:
+        """Rebuild every bucket overlapping [from_date, to_date]"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT refresh_subject_line_rollups(%s, %s)", (from_date, to_date))
+            affected = cursor.fetchone()[0]
+            self.connection.commit()
+            return affected
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def apply_watermarks(self, target_table: str, max_watermarks: int) -> Tuple[int, int, int]:
+        """Claim one batch of pending watermarks and rebuild the buckets they touch"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT * FROM apply_import_watermarks(%s, %s)",
+                (target_table, max_watermarks)
+            )
+            result = cursor.fetchone()
+            self.connection.commit()
+            return result
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def apply_all_watermarks(self, max_watermarks: int = 10000) -> int:
+        """Drain pending watermarks for every target table, one transaction per batch"""
+        total = 0
+        for target_table in WATERMARK_TARGETS:
+            while True:
+                started = time.time()
+                watermarks, buckets, rows = self.apply_watermarks(target_table, max_watermarks)
+                if not watermarks:
+                    break
+                total += rows
+                logger.info(
+                    f"{target_table}: applied {watermarks} watermarks, rebuilt {buckets} buckets "
+                    f"({rows} rollup rows) in {time.time() - started:.2f}s"
+                )
+        return total
+
+    def backfill_watermarks(self) -> int:
+        """Enqueue a watermark for every existing (date, company) so the next run rebuilds everything"""
+        run_id = f"backfill-{datetime.now():%Y%m%d%H%M%S}"
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO import_watermarks (run_id, source, target_table, affected_date, company)
+                SELECT DISTINCT %s, 'refresh-rollups.py', 'subject_lines', date_sent, COALESCE(company, '')
+                FROM subject_lines
+                WHERE date_sent IS NOT NULL
+                UNION
+                SELECT DISTINCT %s, 'refresh-rollups.py', 'marketing_campaigns',
+                       campaign_observation_date, marketing_company
+                FROM marketing_campaigns
+                ON CONFLICT DO NOTHING
+                """,
+                (run_id, run_id)
+            )
+            count = cursor.rowcount
+            self.connection.commit()
+            logger.info(f"Enqueued {count} backfill watermarks ({run_id})")
+            return count
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def save_high_water(self, high_water):
+        """Remember the newest created_at that has been rolled up"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE subject_line_rollup_state
+                SET last_created_at = GREATEST(COALESCE(last_created_at, %s), %s),
+                    last_refreshed_at = NOW()
+                WHERE id = 1
+                """,
+                (high_water, high_water)
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def refresh_months(self, months: List[date]) -> int:
+        """Refresh a list of months, one transaction each"""
+        total = 0
+        for month_start in months:
+            started = time.time()
+            affected = self.refresh_month(month_start)
+            total += affected
+            logger.info(
+                f"Refreshed {month_start:%Y-%m}: {affected} rollup rows in {time.time() - started:.2f}s"
+            )
+        return total
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Refresh subject line rollup tables')
+    parser.add_argument('--install', action='store_true', help='Create tables and functions first')
+    parser.add_argument('--scan', action='store_true', help='Refresh months with rows added since the last scan')
+    parser.add_argument('--full', action='store_true', help='Rebuild every subject line bucket')
+    parser.add_argument('--backfill', action='store_true', help='Enqueue watermarks for all existing data')
+    parser.add_argument('--from', dest='from_date', type=date.fromisoformat, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='to_date', type=date.fromisoformat, help='End date (YYYY-MM-DD)')
+    return parser.parse_args()
+
+
+def main():
+    """Main function to run the refresh"""
+    args = parse_args()
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    refresher = RollupRefresher(db_config)
+
+    try:
+        refresher.connect()
+
+        if args.install:
+            refresher.install()
+
+        started = time.time()
+
+        if args.from_date or args.to_date:
+            from_date = args.from_date or args.to_date
+            to_date = args.to_date or args.from_date
+            total = refresher.refresh_range(from_date, to_date)
+        elif args.full:
+            total = refresher.refresh_months(refresher.all_months())
+        elif args.scan:
+            months, high_water = refresher.pending_months()
+            if not months:
+                logger.info("Rollups are up to date")
+                return
+            logger.info(f"Refreshing {len(months)} month(s) with new subject lines")
+            total = refresher.refresh_months(months)
+            refresher.save_high_water(high_water)
+        else:
+            if args.backfill:
+                refresher.backfill_watermarks()
+            total = refresher.apply_all_watermarks()
+
+        logger.info(f"✅ Rollup refresh completed: {total} rows in {time.time() - started:.2f}s")
+
+    except Exception as e:
+        logger.error(f"Rollup refresh failed: {e}")
+        sys.exit(1)
+    finally:
+        refresher.disconnect()
+
+
+if __name__ == "__main__":
+    main()
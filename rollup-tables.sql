@@ -0,0 +1,417 @@
+-- Rollup tables for volume and open-rate intent queries
+-- getVolumes()/getOpenRates() aggregate over raw subject_lines on every chat request.
+-- These tables keep pre-aggregated buckets by (grain, bucket_start, company, sub_industry,
+-- mailing_type) so the intent API can answer from a handful of index rows.
+-- Buckets are rebuilt for a date range by refresh_subject_line_rollups(), which is called
+-- by refresh-rollups.py after each import batch.
+
+-- Step 1: Rollup table (one row per bucket and dimension combination)
+-- Unknown dimensions are stored as '' so they can be part of the primary key.
+CREATE TABLE IF NOT EXISTS subject_line_rollups (
+  grain TEXT NOT NULL CHECK (grain IN ('day', 'week', 'month')),
+  bucket_start DATE NOT NULL,
+  company TEXT NOT NULL DEFAULT '',
+  sub_industry TEXT NOT NULL DEFAULT '',
+  mailing_type TEXT NOT NULL DEFAULT '',
+  line_count BIGINT NOT NULL DEFAULT 0,
+  volume_sum BIGINT NOT NULL DEFAULT 0,
+  volume_count BIGINT NOT NULL DEFAULT 0,
+  -- Plain sums for unweighted averages
+  open_rate_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  open_rate_count BIGINT NOT NULL DEFAULT 0,
+  read_rate_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  read_rate_count BIGINT NOT NULL DEFAULT 0,
+  -- Volume-weighted sums (rate * projected_volume) for weighted averages
+  open_rate_weighted_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  read_rate_weighted_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  inbox_rate_weighted_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  spam_rate_weighted_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+  rate_weight_sum BIGINT NOT NULL DEFAULT 0,
+  max_open_rate DECIMAL(5,4),
+  refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (grain, bucket_start, company, sub_industry, mailing_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_company ON subject_line_rollups (grain, company, bucket_start DESC);
+CREATE INDEX IF NOT EXISTS idx_rollups_sub_industry ON subject_line_rollups (grain, sub_industry, bucket_start DESC);
+
+-- Step 2: Bookkeeping for the refresh job (high-water mark on subject_lines.created_at)
+CREATE TABLE IF NOT EXISTS subject_line_rollup_state (
+  id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  last_created_at TIMESTAMP WITH TIME ZONE,
+  last_refreshed_at TIMESTAMP WITH TIME ZONE
+);
+
+INSERT INTO subject_line_rollup_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- Step 3: Map an intent timeframe to a [start_date, end_date) range
+-- Mirrors the CASE blocks in intent-database-functions.sql.
+CREATE OR REPLACE FUNCTION intent_timeframe_bounds(
+  timeframe_filter TEXT,
+  OUT start_date DATE,
+  OUT end_date DATE
+) AS $$
+BEGIN
+  end_date := NULL;
+  CASE timeframe_filter
+    WHEN 'recent' THEN start_date := CURRENT_DATE - INTERVAL '30 days';
+    WHEN 'last 3 months' THEN start_date := CURRENT_DATE - INTERVAL '3 months';
+    WHEN 'this year' THEN start_date := DATE_TRUNC('year', CURRENT_DATE);
+    WHEN 'this quarter' THEN start_date := DATE_TRUNC('quarter', CURRENT_DATE);
+    WHEN 'last quarter' THEN
+      start_date := DATE_TRUNC('quarter', CURRENT_DATE - INTERVAL '3 months');
+      end_date := DATE_TRUNC('quarter', CURRENT_DATE);
+    WHEN 'this month' THEN start_date := DATE_TRUNC('month', CURRENT_DATE);
+    WHEN 'last month' THEN
+      start_date := DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month');
+      end_date := DATE_TRUNC('month', CURRENT_DATE);
+    WHEN 'this week' THEN start_date := DATE_TRUNC('week', CURRENT_DATE);
+    ELSE start_date := NULL;
+  END CASE;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Step 4: Rebuild every bucket that overlaps [from_date, to_date]
+-- Each grain is widened to whole buckets so partially covered weeks/months are recomputed
+-- from all of their rows. Delete + insert run in the caller's transaction, so readers keep
+-- seeing the previous bucket contents until commit. Concurrent refreshes serialize on an
+-- advisory lock.
+CREATE OR REPLACE FUNCTION refresh_subject_line_rollups(
+  from_date DATE,
+  to_date DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+  g TEXT;
+  bucket_from DATE;
+  bucket_to DATE;
+  affected INTEGER := 0;
+  n INTEGER;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('subject_line_rollups'));
+
+  FOREACH g IN ARRAY ARRAY['day', 'week', 'month'] LOOP
+    bucket_from := DATE_TRUNC(g, from_date)::DATE;
+    bucket_to := (DATE_TRUNC(g, to_date) + ('1 ' || g)::INTERVAL)::DATE;
+
+    DELETE FROM subject_line_rollups r
+    WHERE r.grain = g
+      AND r.bucket_start >= bucket_from
+      AND r.bucket_start < bucket_to;
+
+    INSERT INTO subject_line_rollups (
+      grain, bucket_start, company, sub_industry, mailing_type,
+      line_count, volume_sum, volume_count,
+      open_rate_sum, open_rate_count, read_rate_sum, read_rate_count,
+      open_rate_weighted_sum, read_rate_weighted_sum, inbox_rate_weighted_sum,
+      spam_rate_weighted_sum, rate_weight_sum, max_open_rate, refreshed_at
+    )
+    SELECT
+      g,
+      DATE_TRUNC(g, sl.date_sent)::DATE,
+      COALESCE(sl.company, ''),
+      COALESCE(sl.sub_industry, ''),
+      COALESCE(sl.mailing_type, ''),
+      COUNT(*),
+      COALESCE(SUM(sl.projected_volume), 0),
+      COUNT(sl.projected_volume),
+      COALESCE(SUM(sl.open_rate), 0),
+      COUNT(sl.open_rate),
+      COALESCE(SUM(sl.read_rate), 0),
+      COUNT(sl.read_rate),
+      COALESCE(SUM(sl.open_rate * sl.projected_volume), 0),
+      COALESCE(SUM(sl.read_rate * sl.projected_volume), 0),
+      COALESCE(SUM(sl.inbox_rate * sl.projected_volume), 0),
+      COALESCE(SUM(sl.spam_rate * sl.projected_volume), 0),
+      COALESCE(SUM(sl.projected_volume) FILTER (WHERE sl.open_rate IS NOT NULL), 0),
+      MAX(sl.open_rate),
+      NOW()
+    FROM subject_lines sl
+    WHERE sl.date_sent >= bucket_from
+      AND sl.date_sent < bucket_to
+    GROUP BY 2, 3, 4, 5;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    affected := affected + n;
+  END LOOP;
+
+  RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 5: Rollup-backed volume summary for the intent API
+CREATE OR REPLACE FUNCTION getVolumeRollups(
+  company_filter text[] DEFAULT NULL,
+  industry_filter text[] DEFAULT NULL,
+  timeframe_filter text DEFAULT NULL,
+  grain_filter text DEFAULT 'month'
+)
+RETURNS TABLE(
+  company text,
+  sub_industry text,
+  bucket_start date,
+  total_volume bigint,
+  avg_volume_per_campaign float,
+  campaign_count bigint
+) AS $$
+DECLARE
+  bounds RECORD;
+BEGIN
+  SELECT * INTO bounds FROM intent_timeframe_bounds(timeframe_filter);
+
+  RETURN QUERY
+  SELECT
+    NULLIF(r.company, ''),
+    NULLIF(r.sub_industry, ''),
+    r.bucket_start,
+    SUM(r.volume_sum)::bigint as total_volume,
+    (SUM(r.volume_sum)::float / NULLIF(SUM(r.volume_count), 0)) as avg_volume_per_campaign,
+    SUM(r.line_count)::bigint as campaign_count
+  FROM subject_line_rollups r
+  WHERE r.grain = grain_filter
+    AND (company_filter IS NULL OR r.company = ANY(company_filter))
+    AND (industry_filter IS NULL OR r.sub_industry = ANY(industry_filter))
+    AND (bounds.start_date IS NULL OR r.bucket_start >= DATE_TRUNC(grain_filter, bounds.start_date)::DATE)
+    AND (bounds.end_date IS NULL OR r.bucket_start < bounds.end_date)
+  GROUP BY r.company, r.sub_industry, r.bucket_start
+  HAVING SUM(r.volume_count) > 0
+  ORDER BY r.bucket_start DESC, SUM(r.volume_sum) DESC
+  LIMIT 100;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Step 6: Rollup-backed open/read rate summary for the intent API
+CREATE OR REPLACE FUNCTION getOpenRateRollups(
+  company_filter text[] DEFAULT NULL,
+  industry_filter text[] DEFAULT NULL,
+  timeframe_filter text DEFAULT NULL,
+  grain_filter text DEFAULT 'month'
+)
+RETURNS TABLE(
+  company text,
+  sub_industry text,
+  mailing_type text,
+  bucket_start date,
+  campaign_count bigint,
+  avg_open_rate float,
+  weighted_open_rate float,
+  avg_read_rate float,
+  weighted_read_rate float,
+  weighted_inbox_rate float,
+  weighted_spam_rate float,
+  max_open_rate float
+) AS $$
+DECLARE
+  bounds RECORD;
+BEGIN
+  SELECT * INTO bounds FROM intent_timeframe_bounds(timeframe_filter);
+
+  RETURN QUERY
+  SELECT
+    NULLIF(r.company, ''),
+    NULLIF(r.sub_industry, ''),
+    NULLIF(r.mailing_type, ''),
+    r.bucket_start,
+    r.line_count,
+    r.open_rate_sum / NULLIF(r.open_rate_count, 0),
+    r.open_rate_weighted_sum / NULLIF(r.rate_weight_sum, 0),
+    r.read_rate_sum / NULLIF(r.read_rate_count, 0),
+    r.read_rate_weighted_sum / NULLIF(r.rate_weight_sum, 0),
+    r.inbox_rate_weighted_sum / NULLIF(r.rate_weight_sum, 0),
+    r.spam_rate_weighted_sum / NULLIF(r.rate_weight_sum, 0),
+    r.max_open_rate::float
+  FROM subject_line_rollups r
+  WHERE r.grain = grain_filter
+    AND (company_filter IS NULL OR r.company = ANY(company_filter))
+    AND (industry_filter IS NULL OR r.sub_industry = ANY(industry_filter))
+    AND (bounds.start_date IS NULL OR r.bucket_start >= DATE_TRUNC(grain_filter, bounds.start_date)::DATE)
+    AND (bounds.end_date IS NULL OR r.bucket_start < bounds.end_date)
+    AND r.open_rate_count > 0
+  ORDER BY r.bucket_start DESC, r.open_rate_sum / NULLIF(r.open_rate_count, 0) DESC
+  LIMIT 100;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Step 7: Per-run import watermarks
+-- Importers record every (date, company) they touched; the refresh job recomputes only
+-- those buckets instead of whole months.
+CREATE TABLE IF NOT EXISTS import_watermarks (
+  id BIGSERIAL PRIMARY KEY,
+  run_id TEXT NOT NULL,
+  source TEXT NOT NULL, -- importer script that recorded the watermark
+  target_table TEXT NOT NULL CHECK (target_table IN ('subject_lines', 'marketing_campaigns')),
+  affected_date DATE NOT NULL,
+  company TEXT NOT NULL DEFAULT '',
+  recorded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  refreshed_at TIMESTAMP WITH TIME ZONE,
+  UNIQUE (run_id, target_table, affected_date, company)
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_watermarks_pending
+ON import_watermarks (target_table, id) WHERE refreshed_at IS NULL;
+
+-- Step 8: Campaign rollups by marketing company and media channel
+CREATE TABLE IF NOT EXISTS marketing_campaign_rollups (
+  grain TEXT NOT NULL CHECK (grain IN ('day', 'week', 'month')),
+  bucket_start DATE NOT NULL,
+  marketing_company TEXT NOT NULL,
+  media_channel TEXT NOT NULL,
+  campaign_count BIGINT NOT NULL DEFAULT 0,
+  volume_sum BIGINT NOT NULL DEFAULT 0,
+  spend_sum DECIMAL(18,2) NOT NULL DEFAULT 0,
+  refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (grain, bucket_start, marketing_company, media_channel)
+);
+
+CREATE INDEX IF NOT EXISTS idx_campaign_rollups_company
+ON marketing_campaign_rollups (grain, marketing_company, bucket_start DESC);
+
+-- Step 9: Rebuild a single subject line bucket for one company
+CREATE OR REPLACE FUNCTION refresh_subject_line_rollup_bucket(
+  g TEXT,
+  p_bucket_start DATE,
+  p_company TEXT
+)
+RETURNS INTEGER AS $$
+DECLARE
+  n INTEGER;
+BEGIN
+  DELETE FROM subject_line_rollups r
+  WHERE r.grain = g
+    AND r.bucket_start = p_bucket_start
+    AND r.company = p_company;
+
+  INSERT INTO subject_line_rollups (
+    grain, bucket_start, company, sub_industry, mailing_type,
+    line_count, volume_sum, volume_count,
+    open_rate_sum, open_rate_count, read_rate_sum, read_rate_count,
+    open_rate_weighted_sum, read_rate_weighted_sum, inbox_rate_weighted_sum,
+    spam_rate_weighted_sum, rate_weight_sum, max_open_rate, refreshed_at
+  )
+  SELECT
+    g,
+    p_bucket_start,
+    p_company,
+    COALESCE(sl.sub_industry, ''),
+    COALESCE(sl.mailing_type, ''),
+    COUNT(*),
+    COALESCE(SUM(sl.projected_volume), 0),
+    COUNT(sl.projected_volume),
+    COALESCE(SUM(sl.open_rate), 0),
+    COUNT(sl.open_rate),
+    COALESCE(SUM(sl.read_rate), 0),
+    COUNT(sl.read_rate),
+    COALESCE(SUM(sl.open_rate * sl.projected_volume), 0),
+    COALESCE(SUM(sl.read_rate * sl.projected_volume), 0),
+    COALESCE(SUM(sl.inbox_rate * sl.projected_volume), 0),
+    COALESCE(SUM(sl.spam_rate * sl.projected_volume), 0),
+    COALESCE(SUM(sl.projected_volume) FILTER (WHERE sl.open_rate IS NOT NULL), 0),
+    MAX(sl.open_rate),
+    NOW()
+  FROM subject_lines sl
+  WHERE sl.date_sent >= p_bucket_start
+    AND sl.date_sent < (p_bucket_start + ('1 ' || g)::INTERVAL)::DATE
+    AND (sl.company = p_company OR (p_company = '' AND sl.company IS NULL))
+  GROUP BY 4, 5;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 10: Rebuild a single campaign bucket for one marketing company
+CREATE OR REPLACE FUNCTION refresh_marketing_campaign_rollup_bucket(
+  g TEXT,
+  p_bucket_start DATE,
+  p_company TEXT
+)
+RETURNS INTEGER AS $$
+DECLARE
+  n INTEGER;
+BEGIN
+  DELETE FROM marketing_campaign_rollups r
+  WHERE r.grain = g
+    AND r.bucket_start = p_bucket_start
+    AND r.marketing_company = p_company;
+
+  INSERT INTO marketing_campaign_rollups (
+    grain, bucket_start, marketing_company, media_channel,
+    campaign_count, volume_sum, spend_sum, refreshed_at
+  )
+  SELECT
+    g,
+    p_bucket_start,
+    p_company,
+    mc.media_channel,
+    COUNT(*),
+    COALESCE(SUM(mc.estimated_volume), 0),
+    COALESCE(SUM(mc.estimated_spend), 0),
+    NOW()
+  FROM marketing_campaigns mc
+  WHERE mc.campaign_observation_date >= p_bucket_start
+    AND mc.campaign_observation_date < (p_bucket_start + ('1 ' || g)::INTERVAL)::DATE
+    AND mc.marketing_company = p_company
+  GROUP BY mc.media_channel;
+
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Step 11: Claim pending watermarks and rebuild only the buckets they touch
+-- Watermarks are claimed with FOR UPDATE SKIP LOCKED and marked refreshed in the same
+-- transaction as the bucket rebuilds, so a crashed or concurrent run never loses or
+-- double-applies a watermark. Rebuilding a bucket is a pure function of the source rows,
+-- so re-running is idempotent. Bucket rebuilds serialize on one advisory lock; readers
+-- are never blocked and see the old bucket until commit.
+CREATE OR REPLACE FUNCTION apply_import_watermarks(
+  p_target_table TEXT,
+  max_watermarks INTEGER DEFAULT 10000
+)
+RETURNS TABLE(watermark_count INTEGER, bucket_count INTEGER, rollup_rows INTEGER) AS $$
+DECLARE
+  claimed_ids BIGINT[];
+  b RECORD;
+  buckets INTEGER := 0;
+  total_rows INTEGER := 0;
+BEGIN
+  SELECT array_agg(c.id) INTO claimed_ids
+  FROM (
+    SELECT w.id
+    FROM import_watermarks w
+    WHERE w.target_table = p_target_table
+      AND w.refreshed_at IS NULL
+    ORDER BY w.id
+    LIMIT max_watermarks
+    FOR UPDATE SKIP LOCKED
+  ) c;
+
+  IF claimed_ids IS NULL THEN
+    RETURN QUERY SELECT 0, 0, 0;
+    RETURN;
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtext('subject_line_rollups'));
+
+  FOR b IN
+    SELECT DISTINCT g.grain, DATE_TRUNC(g.grain, w.affected_date)::DATE AS bucket_start, w.company
+    FROM import_watermarks w
+    CROSS JOIN unnest(ARRAY['day', 'week', 'month']) AS g(grain)
+    WHERE w.id = ANY(claimed_ids)
+    ORDER BY 1, 2, 3
+  LOOP
+    IF p_target_table = 'subject_lines' THEN
+      total_rows := total_rows + refresh_subject_line_rollup_bucket(b.grain, b.bucket_start, b.company);
+    ELSE
+      total_rows := total_rows + refresh_marketing_campaign_rollup_bucket(b.grain, b.bucket_start, b.company);
+    END IF;
+    buckets := buckets + 1;
+  END LOOP;
+
+  UPDATE import_watermarks
+  SET refreshed_at = NOW()
+  WHERE id = ANY(claimed_ids);
+
+  RETURN QUERY SELECT array_length(claimed_ids, 1), buckets, total_rows;
+END;
+$$ LANGUAGE plpgsql;
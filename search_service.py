@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Hybrid retrieval service for /api/search.
+
+Each query runs two strategies concurrently on a thread pool:
+  - lexical: pg_trgm-style similarity from the in-memory trigram index (trigram_search.py),
+    with substring (ILIKE) matches ranked first as in search_subject_lines(), or BM25
+    (bm25_index.py) with --lexical bm25
+  - vector:  the query embedding (via the embedding_cache.py sidecar when EMBEDDING_CACHE_URL
+    is set) against the stored embeddings (batch_scorer.EmbeddingCorpus)
+
+The two top-k candidate lists are fused with reciprocal-rank fusion or a weighted sum of
+normalized scores. The fused list is then re-ranked with open rate blended in, the way
+search_subject_lines() weighs similarity against open_rate. Every response reports how long
+each stage took, and GET /stats summarizes recent latencies per stage.
+
+Endpoints:
+  GET /search?q=...&k=10&fusion=rrf|weighted&lexical_weight=0.5&rate_weight=0.3
+  GET /stats
+
+Usage:
+  python3 search_service.py                      # listen on 127.0.0.1:8789
+  python3 search_service.py "credit card"        # one query, with the stage breakdown
+Then set SEARCH_SERVICE_URL=http://127.0.0.1:8789 for the Next.js app.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from dotenv import load_dotenv
+from batch_scorer import EmbeddingCorpus, grade
+from bm25_index import BM25Index
+from embedding_cache import UpstreamError, fetch_embedding
+from embedding_models import active_model
+from hybrid_search import DEFAULT_CANDIDATE_K, DEFAULT_RRF_K, rrf_fuse
+from latency_stats import percentile
+from trigram_search import FUZZY_THRESHOLD, RESULT_FIELDS, TrigramIndex, TrigramSearchEngine, get_supabase
+
+# Load environment variables
+load_dotenv('.env.local')
+
+FUSION_METHODS = ('rrf', 'weighted')
+LEXICAL_STRATEGIES = ('trigram', 'bm25')
+
+# Share of the final score taken by open rate; search_subject_lines() uses 0.2-0.5
+DEFAULT_RATE_WEIGHT = 0.3
+
+# Substring matches outrank any trigram-only match in the lexical list
+SUBSTRING_BONUS = 1.0
+
+STAGES = ('lexical_ms', 'embed_ms', 'vector_ms', 'fusion_ms', 'total_ms')
+
+
+def lexical_candidates(index: TrigramIndex, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(row positions, scores) of the k best lexical matches, best first"""
+    scores = index.similarities(query)
+    scores[index.matches(query)] += SUBSTRING_BONUS
+    positions = np.flatnonzero(scores > FUZZY_THRESHOLD)
+    if len(positions) > k:
+        positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+    positions = positions[np.lexsort((positions, -index.open_rates[positions], -scores[positions]))]
+    return positions, scores[positions]
+
+
+def embed_via_sidecar(cache_url: str, text: str, timeout: float = 5.0) -> List[float]:
+    """POST /embed to embedding_cache.py"""
+    request = urllib.request.Request(
+        f"{cache_url.rstrip('/')}/embed",
+        data=json.dumps({'input': text}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())['embedding']
+
+
+class SearchService:
+    """Concurrent lexical + vector retrieval over one consistent snapshot"""
+
+    def __init__(self, embed: Callable[[str], List[float]], candidate_k: int = DEFAULT_CANDIDATE_K,
+                 workers: int = 8, corpus_cache: Optional[str] = None, lexical: str = 'trigram'):
+        if lexical not in LEXICAL_STRATEGIES:
+            raise ValueError(f"Unknown lexical strategy {lexical!r}; expected one of {LEXICAL_STRATEGIES}")
+        self.embed = embed
+        self.lexical = lexical
+        self.candidate_k = candidate_k
+        self.corpus_cache = corpus_cache
+        self.engine = TrigramSearchEngine()
+        # (trigram index, subject_lines.id -> index position, embedding corpus, BM25 index or None),
+        # set by reload()
+        self._snapshot: Optional[Tuple[TrigramIndex, Dict[int, int], EmbeddingCorpus, Optional[BM25Index]]] = None
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.recent: deque = deque(maxlen=1000)
+        self._reload_lock = threading.Lock()
+
+    def reload(self, supabase):
+        """Rebuild the trigram index and refresh the embedding corpus, then swap both in"""
+        with self._reload_lock:
+            self.engine.reload(supabase)
+            index = self.engine.index
+            corpus = EmbeddingCorpus.load(supabase, active_model()['name'], self.corpus_cache)
+            positions = {int(row['id']): i for i, row in enumerate(index.rows)}
+            bm25 = BM25Index.build(index.rows) if self.lexical == 'bm25' else None
+            # One assignment, so queries never mix a new index with an old id map
+            self._snapshot = (index, positions, corpus, bm25)
+
+    def start_auto_reload(self, supabase, interval_seconds: int = 300):
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.reload(supabase)
+                except Exception as e:
+                    print(f"Error reloading search service: {e}")
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def _lexical(self, index: TrigramIndex, bm25: Optional[BM25Index],
+                 query: str) -> Tuple[List[int], Dict[int, float], float]:
+        started = time.perf_counter()
+        if bm25 is not None:
+            hits = bm25.search(query, self.candidate_k)
+            ids = [int(bm25.row_ids[doc]) for doc, _ in hits]
+            scores = [score for _, score in hits]
+        else:
+            positions, scores = lexical_candidates(index, query, self.candidate_k)
+            ids = [int(index.rows[p]['id']) for p in positions]
+            scores = scores.tolist()
+        return ids, dict(zip(ids, scores)), (time.perf_counter() - started) * 1000
+
+    def _vector(self, corpus: EmbeddingCorpus, query: str) -> Tuple[List[int], Dict[int, float], float, float]:
+        started = time.perf_counter()
+        embedding = np.asarray(self.embed(query), dtype=np.float32)
+        embedded = time.perf_counter()
+        rows, sims = corpus.top_k(embedding[None, :], self.candidate_k)
+        ids = [int(corpus.subject_line_ids[r]) for r in rows[0]]
+        return (ids, dict(zip(ids, sims[0].tolist())),
+                (embedded - started) * 1000, (time.perf_counter() - embedded) * 1000)
+
+    def search(self, query: str, max_results: int = 10, fusion: str = 'rrf', rrf_k: int = DEFAULT_RRF_K,
+               lexical_weight: float = 0.5, rate_weight: float = DEFAULT_RATE_WEIGHT) -> Dict[str, Any]:
+        """Fused, open-rate re-ranked results plus per-stage timings"""
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion {fusion!r}; expected one of {FUSION_METHODS}")
+        started = time.perf_counter()
+        index, positions, corpus, bm25 = self._snapshot
+
+        lexical_future = self.pool.submit(self._lexical, index, bm25, query)
+        vector_future = self.pool.submit(self._vector, corpus, query)
+        lexical_ids, lexical_scores, lexical_ms = lexical_future.result()
+        timings = {'lexical_ms': lexical_ms}
+        degraded = None
+        try:
+            vector_ids, similarities, timings['embed_ms'], timings['vector_ms'] = vector_future.result()
+        except (UpstreamError, OSError, KeyError, ValueError) as e:
+            # Without an embedding the lexical list alone is still a useful answer
+            print(f"Vector strategy failed for {query!r}: {e}")
+            vector_ids, similarities, degraded = [], {}, 'vector'
+
+        fusion_started = time.perf_counter()
+        open_rates = {}
+        for row_id in set(lexical_ids) | set(vector_ids):
+            position = positions.get(row_id)
+            open_rates[row_id] = float(index.open_rates[position]) if position is not None else 0.0
+
+        if fusion == 'rrf':
+            # Normalized so a row ranked first in both lists scores 1
+            best = 2.0 / (rrf_k + 1)
+            fused = {row_id: score / best for row_id, score in rrf_fuse(lexical_ids, vector_ids, open_rates, rrf_k)}
+        else:
+            top_lexical = max(lexical_scores.values(), default=0.0) or 1.0
+            fused = {
+                row_id: lexical_weight * lexical_scores.get(row_id, 0.0) / top_lexical
+                + (1 - lexical_weight) * max(similarities.get(row_id, 0.0), 0.0)
+                for row_id in open_rates
+            }
+
+        final = {row_id: (1 - rate_weight) * score + rate_weight * open_rates[row_id]
+                 for row_id, score in fused.items()}
+        ranked = sorted(final, key=lambda row_id: (-final[row_id], -open_rates[row_id], row_id))[:max_results]
+
+        lexical_rank = {row_id: rank for rank, row_id in enumerate(lexical_ids, start=1)}
+        vector_rank = {row_id: rank for rank, row_id in enumerate(vector_ids, start=1)}
+        results = []
+        for row_id in ranked:
+            position = positions.get(row_id)
+            row = index.rows[position] if position is not None else {}
+            in_lexical, in_vector = row_id in lexical_rank, row_id in vector_rank
+            result = {
+                'id': row_id,
+                'subject_line': row.get('subject_line') or self._corpus_line(corpus, row_id),
+                'open_rate': open_rates[row_id],
+                'similarity': similarities.get(row_id, 0.0),
+                'score': final[row_id],
+                'fused_score': fused[row_id],
+                'lexical_rank': lexical_rank.get(row_id),
+                'vector_rank': vector_rank.get(row_id),
+                'match_type': 'hybrid' if in_lexical and in_vector else ('lexical' if in_lexical else 'semantic'),
+                'grade': grade(open_rates[row_id]),
+            }
+            for field in RESULT_FIELDS:
+                result[field] = row.get(field)
+            results.append(result)
+
+        timings['fusion_ms'] = (time.perf_counter() - fusion_started) * 1000
+        timings['total_ms'] = (time.perf_counter() - started) * 1000
+        self.recent.append(timings)
+        response = {
+            'results': results,
+            'fusion': fusion,
+            'timings': {stage: round(ms, 2) for stage, ms in timings.items()},
+        }
+        if degraded:
+            response['degraded'] = degraded
+        return response
+
+    @staticmethod
+    def _corpus_line(corpus: EmbeddingCorpus, row_id: int) -> Optional[str]:
+        """Subject line of a vector hit added after the trigram index was built"""
+        matches = np.flatnonzero(corpus.subject_line_ids == row_id)
+        return corpus.subject_lines[matches[0]] if len(matches) else None
+
+    def stats(self) -> Dict[str, Any]:
+        """p50/p95 per stage over the most recent requests"""
+        recent = list(self.recent)
+        stats: Dict[str, Any] = {'requests': len(recent)}
+        for stage in STAGES:
+            values = [t[stage] for t in recent if stage in t]
+            stats[stage] = {'p50': round(percentile(values, 50), 2), 'p95': round(percentile(values, 95), 2)}
+        return stats
+
+
+def make_handler(service: SearchService, default_fusion: str = 'rrf'):
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                self._send_json(200, service.stats())
+                return
+            if url.path != '/search':
+                self.send_error(404)
+                return
+
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            query = params.get('q', '').strip()
+            if len(query) < 2:
+                self._send_json(200, {'results': []})
+                return
+            try:
+                response = service.search(
+                    query,
+                    max_results=min(int(params.get('k', 10)), 50),
+                    fusion=params.get('fusion', default_fusion),
+                    rrf_k=int(params.get('rrf_k', DEFAULT_RRF_K)),
+                    lexical_weight=float(params.get('lexical_weight', 0.5)),
+                    rate_weight=float(params.get('rate_weight', DEFAULT_RATE_WEIGHT)),
+                )
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hybrid lexical + vector search service')
+    parser.add_argument('query', nargs='?', help='Run one query and print the stage breakdown')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8789)
+    parser.add_argument('--fusion', choices=FUSION_METHODS, default='rrf')
+    parser.add_argument('--lexical', choices=LEXICAL_STRATEGIES, default='trigram')
+    parser.add_argument('--candidate-k', type=int, default=DEFAULT_CANDIDATE_K, help='Candidates per strategy')
+    parser.add_argument('--corpus-cache', default='embedding-corpus.npz', help='Local copy of stored embeddings')
+    parser.add_argument('--reload-interval', type=int, default=300, help='Seconds between snapshot reloads')
+    args = parser.parse_args()
+
+    cache_url = os.getenv('EMBEDDING_CACHE_URL')
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not cache_url and not api_key:
+        print("Error: Set EMBEDDING_CACHE_URL or OPENAI_API_KEY")
+        sys.exit(1)
+
+    if cache_url:
+        embed = lambda text: embed_via_sidecar(cache_url, text)
+    else:
+        model = active_model()['name']
+        embed = lambda text: fetch_embedding(api_key, model, text)
+
+    supabase = get_supabase()
+    service = SearchService(embed, candidate_k=args.candidate_k, corpus_cache=args.corpus_cache,
+                            lexical=args.lexical)
+    service.reload(supabase)
+
+    if args.query:
+        response = service.search(args.query, fusion=args.fusion)
+        for r in response['results']:
+            print(f"{r['score']:.4f}  {r['open_rate']:.4f}  {r['match_type']:<8} {r['subject_line']}")
+        print('  '.join(f"{stage}={ms}" for stage, ms in response['timings'].items()))
+        return
+
+    service.start_auto_reload(supabase, args.reload_interval)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, args.fusion))
+
+    def shutdown(signum, frame):
+        # serve_forever() must be stopped from another thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"Search service listening on http://{args.host}:{args.port}/search?q=...")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Snapshot subject_lines and subject_line_embeddings to Parquet, and restore a snapshot.
+
+Export reads both tables in one REPEATABLE READ transaction, so the embeddings match the
+lines they belong to. Each table is paged by id (keyset, never OFFSET) and every page is
+written as one Parquet row group. Embeddings are stored as fixed-size float32 lists of the
+active model's dimension (embedding_models.py). Generated columns (subject_key,
+subject_tsv) are left out; the database recomputes them on restore.
+
+Restore loads subject_lines first, then the embeddings that reference them. Each table's row
+groups are spread over parallel COPY connections. Sequences are reset and both tables
+analyzed afterwards. COPY bypasses the importers' dimension and rollup bookkeeping, so the
+filter dimensions (rebuild_dimensions()) and every subject line rollup bucket are then
+rebuilt, and a dev or analysis copy is usable without re-importing or re-embedding.
+
+Usage:
+  python3 snapshot-subject-lines.py export snapshots/2025-09-30 [--page-size 5000]
+  python3 snapshot-subject-lines.py restore snapshots/2025-09-30 [--workers 4] [--truncate]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+import logging
+from embedding_models import active_model
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Restore order: embeddings reference subject_lines
+TABLES = ['subject_lines', 'subject_line_embeddings']
+
+MANIFEST = 'manifest.json'
+
+# information_schema data_type -> Arrow type
+ARROW_TYPES = {
+    'smallint': pa.int16(),
+    'integer': pa.int32(),
+    'bigint': pa.int64(),
+    'real': pa.float32(),
+    'double precision': pa.float64(),
+    'boolean': pa.bool_(),
+    'date': pa.date32(),
+    'text': pa.string(),
+    'character varying': pa.string(),
+    'character': pa.string(),
+    'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+    'timestamp without time zone': pa.timestamp('us'),
+}
+
+
+def column_spec(name: str, data_type: str, udt_name: str, precision: Optional[int], scale: Optional[int],
+                dimensions: Optional[int]) -> Tuple[str, pa.DataType]:
+    """(SELECT expression, Arrow type) for one column"""
+    if udt_name == 'vector':
+        return f"{name}::real[]", pa.list_(pa.float32(), dimensions)
+    if data_type == 'numeric':
+        if precision:
+            return name, pa.decimal128(precision, scale or 0)
+        return f"{name}::float8", pa.float64()
+    if data_type in ARROW_TYPES:
+        return name, ARROW_TYPES[data_type]
+    # Anything else (json, arrays, enums) round-trips through its text form
+    return f"{name}::text", pa.string()
+
+
+def vector_text(column: pa.Array, dimensions: int) -> pa.Array:
+    """Fixed-size float lists -> pgvector literals '[0.1,0.2,...]' for COPY"""
+    values = pc.cast(column.flatten(), pa.string()).to_pylist()
+    literals = []
+    offset = 0
+    for valid in column.is_valid().to_pylist():
+        if valid:
+            literals.append('[' + ','.join(values[offset:offset + dimensions]) + ']')
+            offset += dimensions
+        else:
+            literals.append(None)
+    return pa.array(literals, pa.string())
+
+
+class SubjectLineSnapshot:
+    def __init__(self, db_config: Dict[str, str]):
+        self.db_config = db_config
+        self.connection = None
+
+    def connect(self):
+        """Connect to the database"""
+        try:
+            self.connection = psycopg2.connect(**self.db_config)
+            logger.info("Connected to database successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to database: {e}")
+            sys.exit(1)
+
+    def disconnect(self):
+        """Disconnect from the database"""
+        if self.connection:
+            self.connection.close()
+            logger.info("Disconnected from database")
+
+    def table_columns(self, cursor, table: str) -> List[Tuple[str, str, str, int, int]]:
+        """Stored (non-generated) columns in table order"""
+        cursor.execute(
+            """
+            SELECT column_name, data_type, udt_name, numeric_precision, numeric_scale
+            FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+            ORDER BY ordinal_position
+            """,
+            (table,)
+        )
+        return cursor.fetchall()
+
+    def vector_dimensions(self, cursor, table: str, column: str, model: Dict[str, Any]) -> int:
+        """Declared size of a vector(n) column; the active model's size if undeclared"""
+        cursor.execute("SELECT atttypmod FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s",
+                       (table, column))
+        typmod = cursor.fetchone()[0]
+        return typmod if typmod and typmod > 0 else model['dimensions']
+
+    def export(self, out_dir: str, page_size: int):
+        """Write <table>.parquet for each table plus manifest.json"""
+        os.makedirs(out_dir, exist_ok=True)
+        model = active_model()
+        manifest: Dict[str, Any] = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'embedding_model': model,
+            'tables': {}
+        }
+
+        # One snapshot of both tables
+        self.connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = self.connection.cursor()
+        try:
+            for table in TABLES:
+                specs = []
+                for column in self.table_columns(cursor, table):
+                    dimensions = self.vector_dimensions(cursor, table, column[0], model) if column[2] == 'vector' else None
+                    specs.append((column[0], *column_spec(*column, dimensions)))
+                manifest['tables'][table] = self._export_table(cursor, table, specs, out_dir, page_size, model)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            self.connection.set_session(isolation_level='DEFAULT', readonly=False)
+
+        with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        logger.info(f"✅ Snapshot written to {out_dir}")
+
+    def _export_table(self, cursor, table: str, specs: List[Tuple[str, str, pa.DataType]], out_dir: str,
+                      page_size: int, model: Dict[str, Any]) -> Dict[str, Any]:
+        names = [name for name, _, _ in specs]
+        schema = pa.schema([pa.field(name, arrow_type) for name, _, arrow_type in specs])
+        schema = schema.with_metadata({'table': table, 'embedding_model': json.dumps(model)})
+        path = os.path.join(out_dir, f"{table}.parquet")
+        select = f"SELECT {', '.join(expression for _, expression, _ in specs)} FROM {table} " \
+                 f"WHERE id > %s ORDER BY id LIMIT %s"
+
+        started = time.time()
+        rows = 0
+        last_id = 0
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            while True:
+                cursor.execute(select, (last_id, page_size))
+                page = cursor.fetchall()
+                if not page:
+                    break
+                columns = list(zip(*page))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, arrow_type) for values, (_, _, arrow_type) in zip(columns, specs)],
+                    schema=schema
+                ))
+                rows += len(page)
+                last_id = page[-1][names.index('id')]
+                if rows % (page_size * 20) == 0:
+                    logger.info(f"{table}: {rows} rows exported...")
+
+        logger.info(f"{table}: {rows} rows in {time.time() - started:.1f}s -> {path} "
+                    f"({os.path.getsize(path) / 1e6:.1f} MB)")
+        return {'file': f"{table}.parquet", 'rows': rows, 'columns': names}
+
+    def restore(self, in_dir: str, workers: int, truncate: bool):
+        """COPY a snapshot back in, subject_lines first"""
+        with open(os.path.join(in_dir, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+
+        model = active_model()
+        snapshot_model = manifest.get('embedding_model', {})
+        if snapshot_model.get('name') != model['name']:
+            logger.warning(f"Snapshot embeddings come from {snapshot_model.get('name')}, but the active model "
+                           f"is {model['name']}; vector search will compare different embedding spaces")
+
+        cursor = self.connection.cursor()
+        try:
+            if truncate:
+                cursor.execute(f"TRUNCATE {', '.join(reversed(TABLES))} RESTART IDENTITY")
+                self.connection.commit()
+                logger.info(f"Truncated {', '.join(TABLES)}")
+            for table in TABLES:
+                cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table})")
+                if cursor.fetchone()[0]:
+                    raise RuntimeError(f"{table} is not empty; restore into empty tables or pass --truncate")
+            targets = {table: {column[0] for column in self.table_columns(cursor, table)} for table in TABLES}
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+        for table in TABLES:
+            self._restore_table(os.path.join(in_dir, manifest['tables'][table]['file']), table,
+                                targets[table], workers)
+
+        cursor = self.connection.cursor()
+        try:
+            for table in TABLES:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+                    f"FROM {table}"
+                )
+            self.connection.commit()
+            self.connection.autocommit = True
+            for table in TABLES:
+                cursor.execute(f"ANALYZE {table}")
+        finally:
+            self.connection.autocommit = False
+            cursor.close()
+
+        self.refresh_derived()
+        logger.info(f"✅ Snapshot {in_dir} restored")
+
+    def refresh_derived(self):
+        """Rebuild the filter dimensions and subject line rollups from the restored rows"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT to_regprocedure('rebuild_dimensions()') IS NOT NULL")
+            if cursor.fetchone()[0]:
+                cursor.execute("SELECT rebuild_dimensions()")
+                self.connection.commit()
+                logger.info("Rebuilt dimension tables")
+            else:
+                logger.info("Dimension tables not installed; skipped")
+
+            cursor.execute("SELECT to_regclass('subject_line_rollups') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                logger.info("Rollup tables not installed; skipped")
+                self.connection.rollback()
+                return
+            # Cover the buckets of truncated rows too, so none are left stale
+            cursor.execute("""
+                SELECT MIN(lo), MAX(hi) FROM (
+                  SELECT MIN(date_sent) AS lo, MAX(date_sent) AS hi FROM subject_lines
+                  UNION ALL
+                  SELECT MIN(bucket_start), MAX(bucket_start) FROM subject_line_rollups
+                ) bounds
+            """)
+            from_date, to_date = cursor.fetchone()
+            if from_date is None:
+                self.connection.rollback()
+                return
+            started = time.time()
+            cursor.execute("SELECT refresh_subject_line_rollups(%s, %s)", (from_date, to_date))
+            affected = cursor.fetchone()[0]
+            self.connection.commit()
+            logger.info(f"Rebuilt subject line rollups {from_date} to {to_date}: {affected} rows "
+                        f"in {time.time() - started:.1f}s")
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _restore_table(self, path: str, table: str, target_columns: set, workers: int):
+        parquet = pq.ParquetFile(path)
+        names = [name for name in parquet.schema_arrow.names if name in target_columns]
+        skipped = [name for name in parquet.schema_arrow.names if name not in target_columns]
+        if skipped:
+            logger.warning(f"{table}: the target table has no {', '.join(skipped)} column(s); not restored")
+        copy_sql = f"COPY {table} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv, HEADER true)"
+        row_groups = list(range(parquet.num_row_groups))
+
+        def load(indexes: List[int]) -> int:
+            # One connection per worker; each row group is its own COPY and commit
+            connection = psycopg2.connect(**self.db_config)
+            reader = pq.ParquetFile(path)
+            loaded = 0
+            try:
+                cursor = connection.cursor()
+                for index in indexes:
+                    batch = reader.read_row_group(index, columns=names)
+                    for i, field in enumerate(batch.schema):
+                        if pa.types.is_fixed_size_list(field.type):
+                            batch = batch.set_column(i, field.name, vector_text(batch.column(i).combine_chunks(),
+                                                                                field.type.list_size))
+                    buffer = io.BytesIO()
+                    pyarrow.csv.write_csv(batch, buffer)
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+                    connection.commit()
+                    loaded += batch.num_rows
+                cursor.close()
+            finally:
+                connection.close()
+            return loaded
+
+        started = time.time()
+        # Round-robin, so every worker gets early and late (similar-sized) row groups
+        shares = [row_groups[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            loaded = sum(pool.map(load, [share for share in shares if share]))
+        elapsed = time.time() - started
+        logger.info(f"{table}: {loaded} rows restored in {elapsed:.1f}s "
+                    f"({loaded / max(elapsed, 1e-9):,.0f} rows/sec, {workers} workers)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot subject_lines and their embeddings to Parquet')
+    parser.add_argument('action', choices=['export', 'restore'])
+    parser.add_argument('directory', help='Snapshot directory')
+    parser.add_argument('--page-size', type=int, default=5000, help='Rows per keyset page / row group (export)')
+    parser.add_argument('--workers', type=int, default=4, help='Parallel COPY connections (restore)')
+    parser.add_argument('--truncate', action='store_true', help='Empty both tables before restoring')
+    args = parser.parse_args()
+
+    db_config = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'database': os.getenv('DB_NAME', 'your_database_name'),
+        'user': os.getenv('DB_USER', 'your_username'),
+        'password': os.getenv('DB_PASSWORD', 'your_password'),
+        'port': os.getenv('DB_PORT', '5432')
+    }
+
+    snapshot = SubjectLineSnapshot(db_config)
+    snapshot.connect()
+    try:
+        if args.action == 'export':
+            snapshot.export(args.directory, args.page_size)
+        else:
+            snapshot.restore(args.directory, max(1, args.workers), args.truncate)
+    except Exception as e:
+        logger.error(f"Snapshot {args.action} failed: {e}")
+        sys.exit(1)
+    finally:
+        snapshot.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,213 @@
 import { createClient } from '@supabase/supabase-js';
 import { NextRequest, NextResponse } from 'next/server';
+import { getDimensions } from '@/lib/dimensions';
 
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
 const supabaseKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
 const supabase = createClient(supabaseUrl, supabaseKey);
 
+// Columns list_campaigns_keyset() can sort by (campaigns-listing-functions.sql)
+const SORT_FIELDS = [
+  'campaign_id',
+  'campaign_observation_date',
+  'media_channel',
+  'marketing_company',
+  'industry',
+  'estimated_volume',
+  'estimated_spend'
+];
+
+// Columns the grid renders (marketing_campaigns_list); the detail modal loads the full row
+// from /api/campaigns/[campaignId]
+const LIST_COLUMNS = 'id,campaign_id,campaign_observation_date,media_channel,marketing_company,industry,estimated_volume,estimated_spend,thumbnail_url';
+
+// count_campaigns() counts exactly below this many estimated rows
+const COUNT_EXACT_BELOW = 10000;
+
+interface ListingParams {
+  page: number;
+  limit: number;
+  search: string;
+  mediaChannel: string;
+  marketingCompany: string;
+  sortField: string;
+  sortDirection: string;
+  after: string | null;
+  before: string | null;
+}
+
+type CampaignRow = Record<string, unknown> & { id: number };
+
+// A cursor is the sort value and id of a row, base64url-encoded JSON
+function encodeCursor(row: CampaignRow, sortField: string): string {
+  return Buffer.from(JSON.stringify([row[sortField] ?? null, row.id])).toString('base64url');
+}
+
+function decodeCursor(cursor: string | null): [string | null, number] | null {
+  if (!cursor) return null;
+  try {
+    const [value, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+    if (!Number.isInteger(id)) return null;
+    return [value === null ? null : String(value), id];
+  } catch {
+    return null;
+  }
+}
+
+async function getCampaignFilters() {
+  const dimensions = await getDimensions(supabase);
+  if (dimensions) {
+    return {
+      mediaChannels: dimensions.mediaChannels,
+      marketingCompanies: dimensions.campaignCompanies
+    };
+  }
+
+  // Dimension tables not installed: scan marketing_campaigns
+  const { data: mediaChannels } = await supabase
+    .from('marketing_campaigns')
+    .select('media_channel')
+    .not('media_channel', 'is', null);
+
+  const { data: marketingCompanies } = await supabase
+    .from('marketing_campaigns')
+    .select('marketing_company')
+    .not('marketing_company', 'is', null);
+
+  return {
+    mediaChannels: [...new Set(mediaChannels?.map(item => item.media_channel) || [])],
+    marketingCompanies: [...new Set(marketingCompanies?.map(item => item.marketing_company) || [])]
+  };
+}
+
+// Keyset page plus a planner-estimated count; null if the listing functions are not deployed
+async function listViaKeyset(params: ListingParams) {
+  const cursor = decodeCursor(params.before ?? params.after);
+  const direction = params.before && cursor ? 'prev' : 'next';
+  const filters = {
+    p_search: params.search || null,
+    p_media_channel: params.mediaChannel || null,
+    p_marketing_company: params.marketingCompany || null
+  };
+
+  const [listing, count] = await Promise.all([
+    supabase.rpc('list_campaigns_keyset', {
+      p_sort_field: params.sortField,
+      p_sort_direction: params.sortDirection,
+      p_cursor_value: cursor ? cursor[0] : null,
+      p_cursor_id: cursor ? cursor[1] : null,
+      p_direction: direction,
+      // One extra row tells us whether there is another page in this direction
+      p_limit: params.limit + 1,
+      ...filters
+    }),
+    supabase.rpc('count_campaigns', { ...filters, p_exact_below: COUNT_EXACT_BELOW })
+  ]);
+
+  if (listing.error || count.error) {
+    console.error('Keyset listing unavailable, using offset paging:', (listing.error || count.error)?.message);
+    return null;
+  }
+
+  const rows = (listing.data as CampaignRow[]).slice(0, params.limit);
+  const hasMore = listing.data.length > params.limit;
+  if (direction === 'prev') rows.reverse();
+
+  const hasNextPage = direction === 'prev' || hasMore;
+  const hasPrevPage = direction === 'prev' ? hasMore : cursor !== null;
+  const { total, estimated } = count.data?.[0] ?? { total: 0, estimated: false };
+
+  return {
+    campaigns: rows,
+    totalCount: Number(total),
+    countEstimated: estimated,
+    currentPage: params.page,
+    totalPages: Math.ceil(Number(total) / params.limit),
+    hasNextPage,
+    nextCursor: hasNextPage && rows.length ? encodeCursor(rows[rows.length - 1], params.sortField) : null,
+    prevCursor: hasPrevPage && rows.length ? encodeCursor(rows[0], params.sortField) : null
+  };
+}
+
+async function listViaOffset(params: ListingParams) {
+  // Calculate offset for pagination
+  const offset = (params.page - 1) * params.limit;
+
+  // Build the query
+  let query = supabase
+    .from('marketing_campaigns')
+    .select(LIST_COLUMNS, { count: 'exact' });
+
+  // Apply search filter
+  if (params.search) {
+    query = query.or(`campaign_id.ilike.%${params.search}%,marketing_company.ilike.%${params.search}%,industry.ilike.%${params.search}%`);
+  }
+
+  // Apply media channel filter
+  if (params.mediaChannel) {
+    query = query.eq('media_channel', params.mediaChannel);
+  }
+
+  // Apply marketing company filter
+  if (params.marketingCompany) {
+    query = query.eq('marketing_company', params.marketingCompany);
+  }
+
+  // Apply sorting
+  query = query.order(params.sortField, { ascending: params.sortDirection === 'asc' });
+
+  // Apply pagination
+  query = query.range(offset, offset + params.limit - 1);
+
+  const { data, error, count } = await query;
+
+  if (error) {
+    console.error('Database error:', error);
+    return null;
+  }
+
+  const totalPages = Math.ceil((count || 0) / params.limit);
+  return {
+    campaigns: data || [],
+    totalCount: count || 0,
+    countEstimated: false,
+    currentPage: params.page,
+    totalPages,
+    hasNextPage: params.page < totalPages,
+    nextCursor: null,
+    prevCursor: null
+  };
+}
+
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
-    
+
     // Get query parameters
-    const page = parseInt(searchParams.get('page') || '1');
-    const limit = parseInt(searchParams.get('limit') || '10');
-    const search = searchParams.get('search') || '';
-    const mediaChannel = searchParams.get('mediaChannel') || '';
-    const marketingCompany = searchParams.get('marketingCompany') || '';
     const sortField = searchParams.get('sortField') || 'campaign_observation_date';
-    const sortDirection = searchParams.get('sortDirection') || 'desc';
-    
-    // Calculate offset for pagination
-    const offset = (page - 1) * limit;
-    
-    // Build the query
-    let query = supabase
-      .from('marketing_campaigns')
-      .select('*', { count: 'exact' });
-    
-    // Apply search filter
-    if (search) {
-      query = query.or(`campaign_id.ilike.%${search}%,marketing_company.ilike.%${search}%,industry.ilike.%${search}%`);
-    }
-    
-    // Apply media channel filter
-    if (mediaChannel) {
-      query = query.eq('media_channel', mediaChannel);
-    }
-    
-    // Apply marketing company filter
-    if (marketingCompany) {
-      query = query.eq('marketing_company', marketingCompany);
-    }
-    
-    // Apply sorting
-    query = query.order(sortField, { ascending: sortDirection === 'asc' });
-    
-    // Apply pagination
-    query = query.range(offset, offset + limit - 1);
-    
-    const { data, error, count } = await query;
-    
-    if (error) {
-      console.error('Database error:', error);
+    const params: ListingParams = {
+      page: Math.max(1, parseInt(searchParams.get('page') || '1') || 1),
+      limit: Math.min(100, Math.max(1, parseInt(searchParams.get('limit') || '10') || 10)),
+      search: searchParams.get('search') || '',
+      mediaChannel: searchParams.get('mediaChannel') || '',
+      marketingCompany: searchParams.get('marketingCompany') || '',
+      sortField: SORT_FIELDS.includes(sortField) ? sortField : 'campaign_observation_date',
+      sortDirection: searchParams.get('sortDirection') === 'asc' ? 'asc' : 'desc',
+      // Cursors from the previous response; without one the first page is returned
+      after: searchParams.get('after'),
+      before: searchParams.get('before')
+    };
+
+    const listing = (await listViaKeyset(params)) ?? (await listViaOffset(params));
+    if (!listing) {
       return NextResponse.json({ error: 'Failed to fetch campaigns' }, { status: 500 });
     }
-    
+
     // Get unique values for filters
-    const { data: mediaChannels } = await supabase
-      .from('marketing_campaigns')
-      .select('media_channel')
-      .not('media_channel', 'is', null);
-    
-    const { data: marketingCompanies } = await supabase
-      .from('marketing_campaigns')
-      .select('marketing_company')
-      .not('marketing_company', 'is', null);
-    
-    // Get unique values
-    const uniqueMediaChannels = [...new Set(mediaChannels?.map(item => item.media_channel) || [])];
-    const uniqueMarketingCompanies = [...new Set(marketingCompanies?.map(item => item.marketing_company) || [])];
-    
-    return NextResponse.json({
-      campaigns: data || [],
-      totalCount: count || 0,
-      currentPage: page,
-      totalPages: Math.ceil((count || 0) / limit),
-      filters: {
-        mediaChannels: uniqueMediaChannels,
-        marketingCompanies: uniqueMarketingCompanies
-      }
-    });
-    
+    const filters = await getCampaignFilters();
+
+    return NextResponse.json({ ...listing, filters });
+
   } catch (error) {
     console.error('API error:', error);
     return NextResponse.json({ error: 'Internal server error' }, { status: 500 });
@@ -61,6 +61,18 @@ Table: subject_line_embeddings
 - subject_line_id (int): Foreign key to subject_lines.id
 - embedding (vector): 1536-dimensional vector embedding for similarity search
 
+Table: subject_line_rollups (pre-aggregated, refreshed after each import)
+- grain (text): 'day', 'week' or 'month'
+- bucket_start (date): First day of the bucket
+- company (text), sub_industry (text), mailing_type (text): '' when unknown
+- line_count (int): Number of subject lines in the bucket
+- volume_sum (bigint): Sum of projected_volume
+- open_rate_sum, open_rate_count: Average open rate = open_rate_sum / open_rate_count
+- read_rate_sum, read_rate_count: Average read rate = read_rate_sum / read_rate_count
+- open_rate_weighted_sum, read_rate_weighted_sum, inbox_rate_weighted_sum, spam_rate_weighted_sum, rate_weight_sum: Volume-weighted rate = *_weighted_sum / rate_weight_sum
+
+IMPORTANT: For volume and open_rates facets that ask for totals, averages or comparisons over time (e.g., "How much did Chase send in August?", "Average open rate by month"), query subject_line_rollups with a grain filter instead of aggregating subject_lines. Only use subject_lines when individual subject lines are needed.
+
 Return JSON with this EXACT structure:
 {
   "intent": "Clear description of what the user is trying to determine",
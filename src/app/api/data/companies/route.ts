@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { createClient } from '@supabase/supabase-js';
+import { dimensionsETag, getDimensions, isNotModified } from '@/lib/dimensions';
 
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
 const supabaseKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
@@ -12,7 +13,7 @@ const supabase = supabaseUrl && supabaseKey
   ? createClient(supabaseUrl, supabaseKey)
   : null;
 
-export async function GET() {
+export async function GET(request: Request) {
   try {
     if (!supabase) {
       return NextResponse.json(
@@ -21,6 +22,16 @@ export async function GET() {
       );
     }
 
+    const dimensions = await getDimensions(supabase);
+    if (dimensions) {
+      const headers = { ETag: dimensionsETag(dimensions), 'Cache-Control': 'no-cache' };
+      if (isNotModified(request, dimensions)) {
+        return new NextResponse(null, { status: 304, headers });
+      }
+      return NextResponse.json({ companies: dimensions.companies }, { headers });
+    }
+
+    // Dimension tables not installed: scan subject_lines
     console.log('Fetching all companies...');
 
     const { data, error } = await supabase
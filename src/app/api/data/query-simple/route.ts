@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@supabase/supabase-js';
+import { getQueryEmbedding, SIMILARITY_THRESHOLD } from '@/lib/query-embedding';
 
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
 const supabaseKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
@@ -37,21 +38,12 @@ export async function POST(request: NextRequest) {
         console.log('Searching for similar subject lines to:', subjectLine);
         
         // Generate embedding for the subject line
-        const OpenAI = (await import('openai')).default;
-        const openai = new OpenAI({
-          apiKey: process.env.OPENAI_API_KEY,
-        });
-        
-        const embeddingResponse = await openai.embeddings.create({
-          model: 'text-embedding-ada-002',
-          input: subjectLine,
-        });
-        const queryEmbedding = embeddingResponse.data[0].embedding;
+        const queryEmbedding = await getQueryEmbedding(subjectLine);
         
         // Call the vector similarity search
         const { data, error } = await supabase.rpc('find_similar_subject_lines', {
           query_embedding: queryEmbedding,
-          similarity_threshold: 0.3,
+          similarity_threshold: SIMILARITY_THRESHOLD,
           max_results: 10
         });
         
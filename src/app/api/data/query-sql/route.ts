@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@supabase/supabase-js';
+import { getQueryEmbedding, SIMILARITY_THRESHOLD } from '@/lib/query-embedding';
 
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
 const supabaseKey = process.env.SUPABASE_SERVICE_ROLE_KEY;
@@ -90,30 +91,13 @@ export async function POST(request: NextRequest) {
       console.log('✅ VECTOR SEARCH TRIGGERED - subjectLineParam:', subjectLineParam);
       
       try {
-        // Generate embedding for the subject line
-        const embeddingResponse = await fetch('https://api.openai.com/v1/embeddings', {
-          method: 'POST',
-          headers: {
-            'Authorization': `Bearer ${process.env.OPENAI_API_KEY}`,
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            input: subjectLineParam,
-            model: 'text-embedding-3-small'
-          })
-        });
-        
-        if (!embeddingResponse.ok) {
-          throw new Error('Failed to generate embedding');
-        }
-        
-        const embeddingData = await embeddingResponse.json();
-        const embedding = embeddingData.data[0].embedding;
+        // Generate embedding for the subject line (served from the embedding cache when configured)
+        const embedding = await getQueryEmbedding(subjectLineParam);
         
                 // Perform vector similarity search
                 const { data: vectorData, error: vectorError } = await supabase.rpc('find_similar_subject_lines', {
                   query_embedding: embedding,
-                  similarity_threshold: 0.0, // Zero threshold to get all results
+                  similarity_threshold: SIMILARITY_THRESHOLD, // Same model as the stored vectors, so no need to open up to 0.0
                   max_results: 10
                 });
         
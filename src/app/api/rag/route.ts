@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { createClient } from '@supabase/supabase-js';
 import OpenAI from 'openai';
+import { getQueryEmbedding, SIMILARITY_THRESHOLD } from '@/lib/query-embedding';
 
 interface ContextSubjectLine {
   subject_line_id: number;
@@ -67,13 +68,8 @@ export async function POST(request: NextRequest) {
       }
     }
 
-    // Generate embedding for the subject line only
-    const embeddingResponse = await openai.embeddings.create({
-      model: 'text-embedding-ada-002',
-      input: subjectLineForSearch,
-    });
-
-    const queryEmbedding = embeddingResponse.data[0].embedding;
+    // Generate embedding for the subject line only (served from the embedding cache when configured)
+    const queryEmbedding = await getQueryEmbedding(subjectLineForSearch);
 
       // Find similar subject lines using vector similarity
       let contextSubjectLines = [];
@@ -84,7 +80,7 @@ export async function POST(request: NextRequest) {
           'find_similar_subject_lines',
           {
             query_embedding: queryEmbedding,
-            similarity_threshold: 0.3, // Lower threshold for vector similarity
+            similarity_threshold: SIMILARITY_THRESHOLD,
             max_results: 20 // Get more results for filtering
           }
         );
@@ -12,6 +12,31 @@ const supabase = supabaseUrl && supabaseKey
   ? createClient(supabaseUrl, supabaseKey)
   : null;
 
+// When SEARCH_SERVICE_URL is set, results come from search_service.py (lexical + vector
+// retrieval fused by rank); if it is unreachable we fall back to the SQL function.
+const SEARCH_SERVICE_TIMEOUT_MS = 3000;
+
+async function searchViaService(query: string) {
+  const serviceUrl = process.env.SEARCH_SERVICE_URL;
+  if (!serviceUrl) return null;
+
+  try {
+    const response = await fetch(
+      `${serviceUrl.replace(/\/$/, '')}/search?q=${encodeURIComponent(query)}`,
+      { signal: AbortSignal.timeout(SEARCH_SERVICE_TIMEOUT_MS) }
+    );
+    if (response.ok) {
+      const data = await response.json();
+      console.log(`Search service timings for "${query}":`, data.timings);
+      return data.results;
+    }
+    console.error('Search service error:', response.status);
+  } catch (error) {
+    console.error('Search service unavailable, using search_subject_lines_advanced:', error);
+  }
+  return null;
+}
+
 // Function to convert open rate to letter grade
 function getOpenRateGrade(openRate: number): string {
   if (openRate >= 0.15) return 'A';
@@ -30,24 +55,29 @@ export async function GET(request: NextRequest) {
       return NextResponse.json({ results: [] });
     }
 
-    if (!supabase) {
-      return NextResponse.json(
-        { error: 'Database not configured' },
-        { status: 500 }
-      );
-    }
+    let data = await searchViaService(query);
+
+    if (!data) {
+      if (!supabase) {
+        return NextResponse.json(
+          { error: 'Database not configured' },
+          { status: 500 }
+        );
+      }
+
+      // Use the new advanced search function with word-by-word matching
+      const { data: rows, error } = await supabase.rpc('search_subject_lines_advanced', {
+        query: query
+      });
 
-    // Use the new advanced search function with word-by-word matching
-    const { data, error } = await supabase.rpc('search_subject_lines_advanced', {
-      query: query
-    });
-
-    if (error) {
-      console.error('Database error:', error);
-      return NextResponse.json(
-        { error: 'Failed to search subject lines' },
-        { status: 500 }
-      );
+      if (error) {
+        console.error('Database error:', error);
+        return NextResponse.json(
+          { error: 'Failed to search subject lines' },
+          { status: 500 }
+        );
+      }
+      data = rows;
     }
 
     console.log(`Search for "${query}" returned ${data?.length || 0} results`);
@@ -65,6 +65,12 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
   const [sortDirection, setSortDirection] = useState<SortDirection>('desc');
   const [totalCount, setTotalCount] = useState(0);
   const [totalPages, setTotalPages] = useState(0);
+  const [countEstimated, setCountEstimated] = useState(false);
+  // Keyset cursors: the API pages from the row before/after the current page
+  const [pageCursor, setPageCursor] = useState<{ after?: string; before?: string }>({});
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [prevCursor, setPrevCursor] = useState<string | null>(null);
+  const [hasNextPage, setHasNextPage] = useState(false);
   const [availableFilters, setAvailableFilters] = useState({
     mediaChannels: [] as string[],
     marketingCompanies: [] as string[]
@@ -96,7 +102,8 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
         mediaChannel: mediaChannelFilter,
         marketingCompany: marketingCompanyFilter,
         sortField: sortField,
-        sortDirection: sortDirection
+        sortDirection: sortDirection,
+        ...pageCursor
       });
 
       const response = await fetch(`/api/campaigns?${params}`);
@@ -106,6 +113,10 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
         setCampaigns(data.campaigns);
         setTotalCount(data.totalCount);
         setTotalPages(data.totalPages);
+        setCountEstimated(Boolean(data.countEstimated));
+        setNextCursor(data.nextCursor ?? null);
+        setPrevCursor(data.prevCursor ?? null);
+        setHasNextPage(Boolean(data.hasNextPage));
         setAvailableFilters(data.filters);
       } else {
         console.error('Failed to fetch campaigns:', data.error);
@@ -116,7 +127,7 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
       setLoading(false);
       setIsRefreshing(false);
     }
-  }, [currentPage, itemsPerPage, debouncedSearchTerm, mediaChannelFilter, marketingCompanyFilter, sortField, sortDirection, campaigns.length]);
+  }, [currentPage, pageCursor, itemsPerPage, debouncedSearchTerm, mediaChannelFilter, marketingCompanyFilter, sortField, sortDirection, campaigns.length]);
 
   // Debounce search input
   useEffect(() => {
@@ -148,30 +159,55 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
       setSortDirection('asc');
     }
     setCurrentPage(1); // Reset to first page when sorting
+    setPageCursor({});
   };
 
   const handleSearch = (value: string) => {
     setSearchTerm(value);
     setCurrentPage(1); // Reset to first page when searching
+    setPageCursor({});
   };
 
   const handleMediaChannelFilter = (value: string) => {
     setMediaChannelFilter(value);
     setCurrentPage(1); // Reset to first page when filtering
+    setPageCursor({});
   };
 
   const handleMarketingCompanyFilter = (value: string) => {
     setMarketingCompanyFilter(value);
     setCurrentPage(1); // Reset to first page when filtering
+    setPageCursor({});
   };
 
   const handlePageChange = (page: number) => {
+    if (page > currentPage && nextCursor) {
+      setPageCursor({ after: nextCursor });
+    } else if (page < currentPage) {
+      setPageCursor(page > 1 && prevCursor ? { before: prevCursor } : {});
+    }
     setCurrentPage(page);
   };
 
-  const handleRowClick = (campaign: Campaign) => {
+  const handleRowClick = async (campaign: Campaign) => {
+    // List rows only carry the grid columns; show them now and fill in the rest
     setSelectedCampaign(campaign);
     setIsModalOpen(true);
+
+    try {
+      const response = await fetch(`/api/campaigns/${encodeURIComponent(campaign.campaign_id)}`);
+      const data = await response.json();
+
+      if (response.ok) {
+        setSelectedCampaign(current =>
+          current?.campaign_id === campaign.campaign_id ? { ...current, ...data.campaign } : current
+        );
+      } else {
+        console.error('Failed to fetch campaign details:', data.error);
+      }
+    } catch (error) {
+      console.error('Error fetching campaign details:', error);
+    }
   };
 
   const handleCloseModal = () => {
@@ -325,7 +361,7 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
             {/* Results Count */}
             <div className="flex items-end">
               <div className="text-[#ECECF1]">
-                Showing {campaigns.length} of {totalCount} campaigns
+                Showing {campaigns.length} of {countEstimated ? 'about ' : ''}{totalCount} campaigns
               </div>
             </div>
           </div>
@@ -455,7 +491,7 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
         {totalPages > 1 && (
           <div className="flex items-center justify-between mt-6">
             <div className="text-[#ECECF1]">
-              Page {currentPage} of {totalPages} ({totalCount} total campaigns)
+              Page {currentPage} of {countEstimated ? 'about ' : ''}{totalPages} ({totalCount} total campaigns)
             </div>
             <div className="flex space-x-2">
               <button
@@ -466,8 +502,8 @@ export default function CampaignsView({ onViewChange }: CampaignsViewProps) {
                 Previous
               </button>
               <button
-                onClick={() => handlePageChange(Math.min(totalPages, currentPage + 1))}
-                disabled={currentPage === totalPages || isRefreshing}
+                onClick={() => handlePageChange(currentPage + 1)}
+                disabled={!hasNextPage || isRefreshing}
                 className="px-3 py-2 bg-[#343541] text-[#ECECF1] rounded-lg hover:bg-[#4A4A4A] disabled:opacity-50 disabled:cursor-not-allowed"
               >
                 Next
@@ -0,0 +1,57 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+
+// Filter lists (companies, industries, media channels) from the dimension tables in
+// dimension-tables.sql. The importers keep those tables current and bump a version on every
+// change, so a request costs one single-row read of dimension_version(); the full snapshot is
+// only fetched again when the version moves. Routes send the version as an ETag.
+// getDimensions() returns null if the tables are not installed, so callers can fall back
+// to their old queries.
+
+export interface DimensionSnapshot {
+  version: number;
+  companies: string[];
+  industries: string[];
+  campaignCompanies: string[];
+  campaignIndustries: string[];
+  mediaChannels: string[];
+}
+
+let cached: DimensionSnapshot | null = null;
+
+export async function getDimensions(supabase: SupabaseClient): Promise<DimensionSnapshot | null> {
+  try {
+    const { data: version, error } = await supabase.rpc('dimension_version');
+    if (error || version == null) {
+      if (error) console.error('Dimension version unavailable:', error.message);
+      return null;
+    }
+
+    if (cached && cached.version === Number(version)) {
+      return cached;
+    }
+
+    const { data: snapshot, error: snapshotError } = await supabase.rpc('dimension_snapshot');
+    if (snapshotError || !snapshot) {
+      if (snapshotError) console.error('Dimension snapshot unavailable:', snapshotError.message);
+      return null;
+    }
+
+    cached = { ...snapshot, version: Number(snapshot.version) } as DimensionSnapshot;
+    return cached;
+  } catch (error) {
+    console.error('Dimension lookup failed:', error);
+    return null;
+  }
+}
+
+export function dimensionsETag(snapshot: DimensionSnapshot): string {
+  return `"dims-${snapshot.version}"`;
+}
+
+// True when the client's cached copy (If-None-Match) is still the current snapshot
+export function isNotModified(request: Request, snapshot: DimensionSnapshot): boolean {
+  const ifNoneMatch = request.headers.get('if-none-match');
+  if (!ifNoneMatch) return false;
+  const etag = dimensionsETag(snapshot);
+  return ifNoneMatch.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag);
+}
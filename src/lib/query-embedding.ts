@@ -0,0 +1,63 @@
+import registry from './embedding-model.json';
+
+// Query embeddings for the RAG and query-sql routes.
+// When EMBEDDING_CACHE_URL is set, requests go through the embedding_cache.py sidecar,
+// which serves repeated subject lines from its LRU store and coalesces concurrent
+// identical requests. If the sidecar is down we fall back to calling OpenAI directly.
+// The model comes from embedding-model.json, which generate-embeddings.py also reads, so
+// query vectors and stored vectors share one embedding space.
+
+const CACHE_TIMEOUT_MS = 5000;
+
+type ModelName = keyof typeof registry.models;
+
+export const QUERY_EMBEDDING_MODEL = registry.active as ModelName;
+
+// Cosine similarity cutoff for find_similar_subject_lines and friends under the active model
+export const SIMILARITY_THRESHOLD = registry.models[QUERY_EMBEDDING_MODEL].similarity_threshold;
+
+async function embedDirect(input: string, model: string): Promise<number[]> {
+  const response = await fetch('https://api.openai.com/v1/embeddings', {
+    method: 'POST',
+    headers: {
+      'Authorization': `Bearer ${process.env.OPENAI_API_KEY}`,
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ input, model })
+  });
+
+  if (!response.ok) {
+    throw new Error('Failed to generate embedding');
+  }
+
+  const data = await response.json();
+  return data.data[0].embedding;
+}
+
+export async function getQueryEmbedding(
+  input: string,
+  model: string = QUERY_EMBEDDING_MODEL
+): Promise<number[]> {
+  const cacheUrl = process.env.EMBEDDING_CACHE_URL;
+
+  if (cacheUrl) {
+    try {
+      const response = await fetch(`${cacheUrl.replace(/\/$/, '')}/embed`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ input, model }),
+        signal: AbortSignal.timeout(CACHE_TIMEOUT_MS)
+      });
+
+      if (response.ok) {
+        const data = await response.json();
+        return data.embedding;
+      }
+      console.error('Embedding cache error:', response.status);
+    } catch (error) {
+      console.error('Embedding cache unavailable, calling OpenAI directly:', error);
+    }
+  }
+
+  return embedDirect(input, model);
+}
@@ -0,0 +1,15 @@
+-- Normalized subject key for import-time de-duplication
+-- deduplicate-database.sql partitions the whole table by LOWER(TRIM(subject_line)) after every
+-- import. Storing that key (hashed, so it indexes compactly) lets import-subject-lines.py look
+-- up only the incoming lines and merge duplicates as they arrive.
+
+-- Step 1: Generated key column
+-- Same normalization as deduplicate-database.sql; subject_dedup.subject_key() computes the
+-- identical value client-side. Adding a stored column rewrites the table once.
+ALTER TABLE subject_lines ADD COLUMN IF NOT EXISTS subject_key TEXT
+  GENERATED ALWAYS AS (md5(lower(trim(subject_line)))) STORED;
+
+-- Step 2: Lookup index
+-- Not UNIQUE so it can be created before existing duplicates are cleaned up; run
+-- deduplicate-database.sql once, and imports keep the table duplicate-free from then on.
+CREATE INDEX IF NOT EXISTS idx_subject_lines_subject_key ON subject_lines(subject_key);
@@ -0,0 +1,161 @@
+"""
+Import-time de-duplication for subject_lines.
+
+Rows are keyed by md5(lower(trim(subject_line))), the same value as the generated
+subject_lines.subject_key column (subject-line-dedup-key.sql). A Bloom filter over the keys
+already in the table is preloaded at the start of a run, so most incoming lines are known to
+be new without a database lookup; only Bloom hits are checked against the table, a batch at a
+time. Keys inserted or matched during the run are kept in a dict, so repeats later in the
+same file resolve locally.
+"""
+
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# What to do when an incoming line duplicates one already stored (or seen earlier in the run)
+MERGE_POLICIES = ('keep-best', 'keep-existing', 'keep-new')
+
+_UINT64_MASK = (1 << 64) - 1
+
+
+def subject_key(subject_line: str) -> str:
+    """md5(lower(trim(subject_line))) as Postgres computes it (trim() only strips spaces)"""
+    return hashlib.md5(subject_line.strip(' ').lower().encode('utf-8')).hexdigest()
+
+
+def prefer_incoming(policy: str, existing_open_rate: Optional[float], incoming_open_rate: Optional[float]) -> bool:
+    """Whether the incoming row should replace the existing one under policy"""
+    if policy == 'keep-new':
+        return True
+    if policy == 'keep-existing':
+        return False
+    # keep-best: highest open_rate wins; on a tie the newer row wins, as in deduplicate-database.sql
+    return (incoming_open_rate or 0.0) >= (existing_open_rate or 0.0)
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over hex md5 keys, using double hashing on the digest's two halves"""
+
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.01):
+        expected_items = max(expected_items, 1)
+        self.size = int(-expected_items * np.log(false_positive_rate) / (np.log(2) ** 2)) + 1
+        self.hash_count = max(1, round(self.size / expected_items * np.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, key: str) -> List[int]:
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:], 16) | 1
+        # Wrap at 64 bits so add_many()'s vectorized arithmetic lands on the same bits
+        return [((h1 + i * h2) & _UINT64_MASK) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def add_many(self, keys: Iterable[str]):
+        keys = list(keys)
+        if not keys:
+            return
+        digests = np.frombuffer(bytes.fromhex(''.join(keys)), dtype='>u8').reshape(-1, 2).astype(np.uint64)
+        h1, h2 = digests[:, 0], digests[:, 1] | np.uint64(1)
+        for i in range(self.hash_count):
+            positions = (h1 + np.uint64(i) * h2) % np.uint64(self.size)
+            np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                             (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class SubjectLineDeduplicator:
+    """Splits batches of cleaned rows into inserts and updates of existing rows"""
+
+    def __init__(self, supabase, policy: str = 'keep-best', page_size: int = 1000):
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"Unknown merge policy {policy!r}; expected one of {MERGE_POLICIES}")
+        self.supabase = supabase
+        self.policy = policy
+        self.page_size = page_size
+        self.bloom: Optional[BloomFilter] = None
+        # subject_key -> stored row (id, open_rate, date_sent, company) for keys touched this run
+        self.known: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'preloaded': 0, 'bloom_hits': 0, 'db_lookups': 0, 'in_batch_duplicates': 0,
+                      'merged': 0, 'skipped': 0}
+
+    def preload(self):
+        """Build the Bloom filter from every subject_key in the table (keyset-paged)"""
+        total = self.supabase.table('subject_lines').select('id', count='exact').limit(1).execute().count or 0
+        # Leave room for this run's inserts
+        self.bloom = BloomFilter(total * 2 + 100000)
+
+        last_id = 0
+        while True:
+            response = self.supabase.table('subject_lines').select('id, subject_key').gt(
+                'id', last_id
+            ).order('id').limit(self.page_size).execute()
+            if not response.data:
+                break
+            self.bloom.add_many(row['subject_key'] for row in response.data if row.get('subject_key'))
+            self.stats['preloaded'] += len(response.data)
+            last_id = response.data[-1]['id']
+            if len(response.data) < self.page_size:
+                break
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored rows for keys the Bloom filter might contain, best row per key"""
+        found: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(keys), 200):
+            response = self.supabase.table('subject_lines').select(
+                'id, subject_key, open_rate, date_sent, company'
+            ).in_('subject_key', keys[i:i + 200]).execute()
+            self.stats['db_lookups'] += 1
+            for row in response.data:
+                current = found.get(row['subject_key'])
+                if current is None or (row['open_rate'] or 0) > (current['open_rate'] or 0):
+                    found[row['subject_key']] = row
+        return found
+
+    def plan(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+        """(rows to insert, (stored row, replacement) pairs to update) for one batch"""
+        # In-batch merge first, so each key reaches the database at most once
+        incoming: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            key = subject_key(row['subject_line'])
+            current = incoming.get(key)
+            if current is not None:
+                self.stats['in_batch_duplicates'] += 1
+                if not prefer_incoming(self.policy, current['open_rate'], row['open_rate']):
+                    continue
+            incoming[key] = row
+
+        unresolved = [k for k in incoming if k not in self.known and self.bloom is not None and k in self.bloom]
+        self.stats['bloom_hits'] += len(unresolved)
+        if unresolved:
+            self.known.update(self._lookup(unresolved))
+
+        inserts, updates = [], []
+        for key, row in incoming.items():
+            stored = self.known.get(key)
+            if stored is None:
+                inserts.append(row)
+            elif prefer_incoming(self.policy, stored['open_rate'], row['open_rate']):
+                updates.append((stored, row))
+                self.stats['merged'] += 1
+            else:
+                self.stats['skipped'] += 1
+        return inserts, updates
+
+    def remember(self, stored_rows: List[Dict[str, Any]]):
+        """Record rows written this run so later duplicates resolve without the database"""
+        for row in stored_rows:
+            key = row.get('subject_key') or subject_key(row['subject_line'])
+            self.known[key] = {
+                'id': row['id'],
+                'subject_key': key,
+                'open_rate': row.get('open_rate'),
+                'date_sent': row.get('date_sent'),
+                'company': row.get('company'),
+            }
+            if self.bloom is not None:
+                self.bloom.add(key)
@@ -0,0 +1,152 @@
+-- Single-pass trigram search for subject lines
+-- search_subject_lines() runs five separate queries filtered with ILIKE '%...%' and
+-- similarity(...) > 0.1, none of which can use the to_tsvector GIN index, so each strategy
+-- is a sequential scan. This variant adds a gin_trgm_ops index, finds every candidate in one
+-- bitmap scan (ILIKE for the exact and singular/plural forms, the % operator for fuzzy
+-- matches) and assigns each row to its highest-priority strategy, so no row is returned twice.
+
+-- Step 1: Enable pg_trgm and add the trigram index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Serves both ILIKE '%q%' and the % similarity operator
+CREATE INDEX IF NOT EXISTS idx_subject_line_trgm ON subject_lines USING gin (subject_line gin_trgm_ops);
+
+-- Step 2: Single-pass search function
+-- Same columns as search_subject_lines() plus match_strategy (1-5, as numbered there).
+-- fuzzy_threshold replaces the fixed 0.1 of strategy 4; it is applied through
+-- pg_trgm.similarity_threshold so the % operator can use the index. At 0.1 nearly every row
+-- is a candidate, which defeats the index; see deploy-trigram-search.py --tune.
+CREATE OR REPLACE FUNCTION search_subject_lines_trgm(
+  query TEXT,
+  fuzzy_threshold REAL DEFAULT 0.3,
+  max_per_strategy INTEGER DEFAULT 5
+)
+RETURNS TABLE (
+  subject_line TEXT,
+  open_rate DECIMAL(5,4),
+  similarity REAL,
+  score REAL,
+  company TEXT,
+  sub_industry TEXT,
+  mailing_type TEXT,
+  read_rate DECIMAL(5,4),
+  inbox_rate DECIMAL(5,4),
+  match_strategy INTEGER
+) AS $$
+DECLARE
+  variant_query TEXT;
+  variant_strategy INTEGER;
+BEGIN
+  -- Scope the threshold to this transaction so other sessions keep their setting
+  PERFORM set_config('pg_trgm.similarity_threshold', fuzzy_threshold::TEXT, true);
+
+  -- Strategy 2 (singular) if query ends with 's', otherwise strategy 3 (plural)
+  IF query ~ 's$' THEN
+    variant_query := regexp_replace(lower(trim(query)), 's$', '');
+    variant_strategy := 2;
+  ELSE
+    variant_query := lower(trim(query)) || 's';
+    variant_strategy := 3;
+  END IF;
+
+  RETURN QUERY
+  WITH matched AS (
+    -- One BitmapOr over idx_subject_line_trgm instead of five sequential scans
+    SELECT
+      sl.id,
+      sl.subject_line,
+      sl.open_rate,
+      sl.company,
+      sl.sub_industry,
+      sl.mailing_type,
+      sl.read_rate,
+      sl.inbox_rate,
+      sl.subject_line ILIKE '%' || query || '%' AS is_exact,
+      sl.subject_line ILIKE '%' || variant_query || '%' AS is_variant,
+      similarity(sl.subject_line, query) AS sim
+    FROM subject_lines sl
+    WHERE sl.subject_line ILIKE '%' || query || '%'
+       OR sl.subject_line ILIKE '%' || variant_query || '%'
+       OR sl.subject_line % query
+  ),
+  scored AS (
+    SELECT
+      m.*,
+      CASE
+        WHEN m.is_exact THEN 1
+        WHEN m.is_variant THEN variant_strategy
+        ELSE 4
+      END AS strategy,
+      CASE
+        WHEN m.is_exact THEN m.sim
+        WHEN m.is_variant THEN similarity(m.subject_line, variant_query)
+        ELSE m.sim
+      END AS strategy_sim
+    FROM matched m
+  ),
+  weighted AS (
+    SELECT
+      s.*,
+      CASE s.strategy
+        WHEN 1 THEN 0.8 * s.strategy_sim + 0.2 * s.open_rate
+        WHEN 4 THEN 0.5 * s.strategy_sim + 0.5 * s.open_rate
+        ELSE 0.7 * s.strategy_sim + 0.3 * s.open_rate
+      END::REAL AS strategy_score
+    FROM scored s
+  ),
+  ranked AS (
+    SELECT
+      w.*,
+      ROW_NUMBER() OVER (PARTITION BY w.strategy ORDER BY w.strategy_score DESC, w.id) AS rn
+    FROM weighted w
+  ),
+  top_matches AS (
+    SELECT r.* FROM ranked r WHERE r.rn <= max_per_strategy
+  ),
+  fallback AS (
+    -- Strategy 5: High open rate fallback (uses idx_open_rate)
+    SELECT
+      sl.id,
+      sl.subject_line,
+      sl.open_rate,
+      sl.company,
+      sl.sub_industry,
+      sl.mailing_type,
+      sl.read_rate,
+      sl.inbox_rate,
+      similarity(sl.subject_line, query)::REAL AS sim,
+      (0.3 * similarity(sl.subject_line, query) + 0.7 * sl.open_rate)::REAL AS fallback_score
+    FROM subject_lines sl
+    WHERE (SELECT COUNT(*) FROM matched m WHERE m.is_exact) < 3
+      AND sl.id NOT IN (SELECT t.id FROM top_matches t)
+    ORDER BY sl.open_rate DESC
+    LIMIT 3
+  )
+  SELECT
+    t.subject_line,
+    t.open_rate,
+    t.strategy_sim::REAL,
+    t.strategy_score,
+    t.company,
+    t.sub_industry,
+    t.mailing_type,
+    t.read_rate,
+    t.inbox_rate,
+    t.strategy
+  FROM top_matches t
+  UNION ALL
+  SELECT
+    f.subject_line,
+    f.open_rate,
+    f.sim,
+    f.fallback_score,
+    f.company,
+    f.sub_industry,
+    f.mailing_type,
+    f.read_rate,
+    f.inbox_rate,
+    5
+  FROM fallback f
+  ORDER BY 10, 4 DESC;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+In-process trigram search engine mirroring search_subject_lines() from database-schema.sql.
+
+Subject lines are loaded once into two inverted indexes with compact uint32 postings:
+- pg_trgm-style word trigrams (lowercase, each word padded as '  word ') for similarity()
+- raw character trigrams of the lowercased text, used to find ILIKE '%q%' candidates
+
+A query is answered in one pass over the postings of its own trigrams, and the five SQL
+strategies (exact, singular, plural, fuzzy, high open-rate fallback) are reproduced with
+the same scores and ordering.
+
+Usage:
+  python3 trigram_search.py "credit card"
+  python3 trigram_search.py --benchmark queries.txt [--compare-sql]
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from latency_stats import percentile
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Columns returned by search_subject_lines()
+RESULT_FIELDS = ['company', 'sub_industry', 'mailing_type', 'read_rate', 'inbox_rate']
+
+# pg_trgm treats runs of alphanumeric characters as words
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# similarity() threshold used by strategy 4
+FUZZY_THRESHOLD = 0.1
+
+# Above this many trigram candidates, substring matches are found by scanning all text at once
+VERIFY_SCAN_THRESHOLD = 2048
+
+ROW_SEPARATOR = '\x00'
+
+
+def pg_trigrams(text: str) -> Set[str]:
+    """Return the trigram set pg_trgm's similarity() would use for text"""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = '  ' + word + ' '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def raw_trigrams(text: str) -> Set[str]:
+    """Return every 3-character window of the lowercased text (for substring candidates)"""
+    lowered = text.lower()
+    return {lowered[i:i + 3] for i in range(len(lowered) - 2)}
+
+
+def _build_postings(docs: Iterable[Set[str]]) -> Tuple[Dict[str, int], List[np.ndarray]]:
+    """Build a vocabulary and one sorted uint32 postings array per term"""
+    vocab: Dict[str, int] = {}
+    lists: List[List[int]] = []
+    for doc_id, terms in enumerate(docs):
+        for term in terms:
+            term_id = vocab.get(term)
+            if term_id is None:
+                term_id = len(lists)
+                vocab[term] = term_id
+                lists.append([])
+            lists[term_id].append(doc_id)
+    return vocab, [np.asarray(p, dtype=np.uint32) for p in lists]
+
+
+class TrigramIndex:
+    """Immutable snapshot of the subject lines and their trigram postings"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.size = len(rows)
+        self.lowered = [row['subject_line'].lower() for row in rows]
+        self.open_rates = np.asarray(
+            [float(row.get('open_rate') or 0.0) for row in rows], dtype=np.float64
+        )
+
+        word_grams = [pg_trigrams(row['subject_line']) for row in rows]
+        self.gram_counts = np.asarray([len(g) for g in word_grams], dtype=np.int32)
+        self.word_vocab, self.word_postings = _build_postings(word_grams)
+        self.raw_vocab, self.raw_postings = _build_postings(raw_trigrams(t) for t in self.lowered)
+
+        # Strategy 5 always returns the top open rates, so sort once
+        self.by_open_rate = np.argsort(-self.open_rates, kind='stable')
+
+        # All lowercased lines in one string, for scanning when too many rows share trigrams
+        self.joined = ROW_SEPARATOR.join(self.lowered)
+        lengths = np.asarray([len(t) + 1 for t in self.lowered], dtype=np.int64)
+        self.row_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if self.size else lengths
+
+    def similarities(self, query: str) -> np.ndarray:
+        """Vectorized pg_trgm similarity(subject_line, query) for every row"""
+        grams = pg_trigrams(query)
+        postings = [self.word_postings[self.word_vocab[g]] for g in grams if g in self.word_vocab]
+        if not grams or not postings:
+            return np.zeros(self.size, dtype=np.float64)
+
+        shared = np.bincount(np.concatenate(postings), minlength=self.size).astype(np.float64)
+        union = len(grams) + self.gram_counts - shared
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sims = np.where(union > 0, shared / union, 0.0)
+        # similarity() returns float4
+        return sims.astype(np.float32).astype(np.float64)
+
+    def candidates(self, needle: str) -> np.ndarray:
+        """Row ids that may contain needle (a superset of ILIKE '%needle%' matches)"""
+        grams = raw_trigrams(needle)
+        if not grams:
+            # Needles shorter than three characters cannot be filtered by the index
+            return np.arange(self.size, dtype=np.uint32)
+
+        postings = []
+        for g in grams:
+            term_id = self.raw_vocab.get(g)
+            if term_id is None:
+                return np.empty(0, dtype=np.uint32)
+            postings.append(self.raw_postings[term_id])
+
+        # Intersect smallest lists first
+        postings.sort(key=len)
+        result = postings[0]
+        for p in postings[1:]:
+            result = np.intersect1d(result, p, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def matches(self, needle: str) -> np.ndarray:
+        """Sorted row ids whose subject line contains needle (ILIKE '%needle%')"""
+        needle = needle.lower()
+        if not needle:
+            return np.arange(self.size, dtype=np.int64)
+
+        candidates = self.candidates(needle)
+        if len(candidates) <= VERIFY_SCAN_THRESHOLD:
+            lowered = self.lowered
+            return np.asarray([i for i in candidates if needle in lowered[i]], dtype=np.int64)
+
+        # Each match consumes the rest of its row, so every row is reported at most once
+        pattern = re.compile(re.escape(needle) + '[^' + ROW_SEPARATOR + ']*')
+        offsets = np.fromiter((m.start() for m in pattern.finditer(self.joined)), dtype=np.int64)
+        return np.searchsorted(self.row_starts, offsets, side='right') - 1
+
+
+class TrigramSearchEngine:
+    """Search engine with hot reload; queries always run against a consistent snapshot"""
+
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None, max_results: int = 5):
+        self.max_results = max_results
+        self.index = TrigramIndex(rows or [])
+        self.loaded_at = time.time()
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+
+    @staticmethod
+    def fetch_rows(supabase, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Page through subject_lines with the columns search_subject_lines() returns"""
+        columns = 'id, subject_line, open_rate, ' + ', '.join(RESULT_FIELDS)
+        rows = []
+        offset = 0
+        while True:
+            response = supabase.table('subject_lines').select(columns).order('id').range(
+                offset, offset + page_size - 1
+            ).execute()
+            if not response.data:
+                break
+            rows.extend(response.data)
+            if len(response.data) < page_size:
+                break
+            offset += page_size
+        return rows
+
+    def reload(self, supabase) -> int:
+        """Rebuild the index from the database and swap it in atomically"""
+        with self._reload_lock:
+            started = time.time()
+            index = TrigramIndex(self.fetch_rows(supabase))
+            # Single reference assignment: in-flight queries keep the old snapshot
+            self.index = index
+            self.loaded_at = time.time()
+            print(f"Loaded {index.size} subject lines in {self.loaded_at - started:.2f}s")
+            return index.size
+
+    def start_auto_reload(self, supabase, interval_seconds: int = 300):
+        """Reload in a background thread every interval_seconds"""
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.reload(supabase)
+                except Exception as e:
+                    print(f"Error reloading trigram index: {e}")
+
+        self._reload_thread = threading.Thread(target=loop, daemon=True)
+        self._reload_thread.start()
+
+    def _strategy(self, index: TrigramIndex, ids: np.ndarray, sims: np.ndarray,
+                  sim_weight: float, rate_weight: float, limit: int) -> List[Dict[str, Any]]:
+        """Score candidate ids like one RETURN QUERY block and keep the top `limit`"""
+        if not len(ids):
+            return []
+        # Scores are cast to REAL in SQL
+        scores = (sim_weight * sims[ids] + rate_weight * index.open_rates[ids]).astype(np.float32)
+        if len(ids) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(ids))
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return [self._result(index, int(ids[i]), float(sims[ids[i]]), float(scores[i])) for i in top]
+
+    @staticmethod
+    def _result(index: TrigramIndex, row_id: int, similarity: float, score: float) -> Dict[str, Any]:
+        row = index.rows[row_id]
+        result = {
+            'subject_line': row['subject_line'],
+            'open_rate': row.get('open_rate'),
+            'similarity': similarity,
+            'score': score,
+        }
+        for field in RESULT_FIELDS:
+            result[field] = row.get(field)
+        return result
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Return the same rows, scores and ordering as search_subject_lines(query)"""
+        index = self.index
+        limit = self.max_results
+        if not index.size:
+            return []
+
+        results = []
+        sims = index.similarities(query)
+        exact_ids = index.matches(query)
+        exact_mask = np.zeros(index.size, dtype=bool)
+        exact_mask[exact_ids] = True
+
+        # Strategy 1: Exact phrase matching (highest priority)
+        results.extend(self._strategy(index, exact_ids, sims, 0.8, 0.2, limit))
+
+        # Strategy 2/3: Singular form if query ends with 's', plural form otherwise
+        if query.endswith('s'):
+            variant = re.sub(r's$', '', query.strip().lower())
+        else:
+            variant = query.strip().lower() + 's'
+        variant_ids = index.matches(variant)
+        variant_ids = variant_ids[~exact_mask[variant_ids]]
+        if len(variant_ids):
+            results.extend(self._strategy(index, variant_ids, index.similarities(variant), 0.7, 0.3, limit))
+
+        # Strategy 4: Fuzzy matching with lower threshold
+        fuzzy_ids = np.flatnonzero((sims > FUZZY_THRESHOLD) & ~exact_mask)
+        results.extend(self._strategy(index, fuzzy_ids, sims, 0.5, 0.5, limit))
+
+        # Strategy 5: High open rate fallback
+        if len(exact_ids) < 3:
+            for row_id in index.by_open_rate[:3]:
+                row_id = int(row_id)
+                score = float(np.float32(0.3 * sims[row_id] + 0.7 * index.open_rates[row_id]))
+                results.append(self._result(index, row_id, float(sims[row_id]), score))
+
+        return results
+
+
+def get_supabase():
+    """Create a Supabase client from .env.local, or exit"""
+    from supabase import create_client
+
+    supabase_url = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
+    supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+    if not supabase_url or not supabase_key:
+        print("Error: Missing Supabase environment variables")
+        print("Please set NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
+        sys.exit(1)
+
+    return create_client(supabase_url, supabase_key)
+
+
+def benchmark(engine: TrigramSearchEngine, queries: List[str], supabase=None):
+    """Time the in-process engine and, optionally, the SQL function on the same queries"""
+    engine_ms = []
+    for query in queries:
+        started = time.perf_counter()
+        engine.search(query)
+        engine_ms.append((time.perf_counter() - started) * 1000)
+
+    print(f"In-process engine ({len(queries)} queries): "
+          f"p50={percentile(engine_ms, 50):.2f}ms p95={percentile(engine_ms, 95):.2f}ms")
+
+    if supabase is None:
+        return
+
+    sql_ms = []
+    for query in queries:
+        started = time.perf_counter()
+        supabase.rpc('search_subject_lines', {'query': query}).execute()
+        sql_ms.append((time.perf_counter() - started) * 1000)
+
+    print(f"search_subject_lines RPC ({len(queries)} queries): "
+          f"p50={percentile(sql_ms, 50):.2f}ms p95={percentile(sql_ms, 95):.2f}ms")
+    if percentile(engine_ms, 95) > 0:
+        print(f"p95 speedup: {percentile(sql_ms, 95) / percentile(engine_ms, 95):.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-memory trigram search over subject lines')
+    parser.add_argument('query', nargs='?', help='Query to run')
+    parser.add_argument('--benchmark', metavar='FILE', help='File with one query per line')
+    parser.add_argument('--compare-sql', action='store_true', help='Also time the search_subject_lines RPC')
+    args = parser.parse_args()
+
+    if not args.query and not args.benchmark:
+        parser.print_help()
+        sys.exit(1)
+
+    supabase = get_supabase()
+    engine = TrigramSearchEngine()
+    engine.reload(supabase)
+
+    if args.benchmark:
+        with open(args.benchmark, 'r', encoding='utf-8') as f:
+            queries = [line.strip() for line in f if line.strip()]
+        benchmark(engine, queries, supabase if args.compare_sql else None)
+        return
+
+    for result in engine.search(args.query):
+        print(f"{result['score']:.4f}  {float(result['open_rate'] or 0):.4f}  {result['subject_line']}")
+
+
+if __name__ == "__main__":
+    main()